@@ -6,7 +6,7 @@ from django.contrib.auth import get_user_model
 from django.utils.text import slugify
 from rest_framework.exceptions import ValidationError
 
-from .models import Cart, CartItem
+from .guest_carts import get_guest_cart_store
 
 
 User = get_user_model()
@@ -53,39 +53,13 @@ def merge_session_cart_to_user(request, user):
     if not request:
         return
 
-    if not request.session.session_key:
-        request.session.create()
-
+    # Sin sesión el invitado nunca agregó productos: no hay nada que unir
     session_key = request.session.session_key
     if not session_key:
         return
 
-    session_cart = Cart.objects.filter(
-        session_key=session_key,
-        user__isnull=True,
-    ).first()
-
-    if not session_cart:
-        return
-
-    user_cart, _ = Cart.objects.get_or_create(user=user)
-
-    for item in session_cart.cartitem_set.all():
-        existing = CartItem.objects.filter(
-            cart=user_cart,
-            product=item.product,
-        ).first()
-
-        if existing:
-            existing.quantity += item.quantity
-            existing.save(update_fields=["quantity", "updated_at"])
-            continue
-
-        item.cart = user_cart
-        item.save(update_fields=["cart"])
-
-    user_cart.save(update_fields=["updated_at"])
-    session_cart.delete()
+    # El carrito invitado (cache o filas con session_key) pasa a SQL aquí
+    get_guest_cart_store().merge_into(session_key, user)
 
 
 def verify_google_credential(credential):
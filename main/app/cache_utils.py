@@ -0,0 +1,233 @@
+# app/cache_utils.py
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import cache, caches
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+from rest_framework.response import Response
+
+
+def get_cache_version(name):
+    """
+    Versión actual de un grupo de datos cacheados. Se inicializa con la
+    hora para no reutilizar claves viejas si el contador se pierde.
+    """
+    return cache.get_or_set(f"cache-version:{name}", time.time_ns, None)
+
+
+def bump_cache_version(*names):
+    for name in names:
+        key = f"cache-version:{name}"
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, time.time_ns(), None)
+
+
+def queryset_cache_key(prefix, queryset, *versions):
+    sql, params = queryset.query.sql_with_params()
+    digest = hashlib.md5(
+        repr((sql, params)).encode("utf-8"), usedforsecurity=False
+    ).hexdigest()
+    version = ":".join(str(get_cache_version(name)) for name in versions)
+    return f"{prefix}:{version}:{digest}"
+
+
+def cached_count(queryset, *versions):
+    """
+    COUNT(*) cacheado por consulta. Se invalida al cambiar la versión de
+    los modelos indicados y expira tras CATALOG_COUNT_CACHE_TIMEOUT.
+    """
+    if queryset.query.is_empty():
+        # .none() no genera SQL (EmptyResultSet)
+        return 0
+
+    key = queryset_cache_key("count", queryset, *versions)
+    count = cache.get(key)
+
+    if count is None:
+        count = queryset.count()
+        cache.set(key, count, settings.CATALOG_COUNT_CACHE_TIMEOUT)
+
+    return count
+
+
+# ======================
+# CACHE DE RESPUESTAS
+# ======================
+def response_cache():
+    return caches[settings.RESPONSE_CACHE_ALIAS]
+
+
+def _increment_counter(key):
+    store = response_cache()
+    if store.add(key, 1, None):
+        return
+    try:
+        store.incr(key)
+    except ValueError:
+        store.set(key, 1, None)
+
+
+def response_cache_stats():
+    hits, misses = (
+        response_cache().get(f"response-cache:{name}", 0)
+        for name in ("hits", "misses")
+    )
+    total = hits + misses
+    return {
+        "hits": hits,
+        "misses": misses,
+        "hit_rate": round(hits / total, 4) if total else 0,
+    }
+
+
+def normalized_query_params(query_params):
+    return sorted(
+        (key, sorted(value for value in values if value != ""))
+        for key, values in query_params.lists()
+        if any(value != "" for value in values)
+    )
+
+
+class CachedResponseMixin:
+    """
+    Cachea list/retrieve de endpoints públicos de solo lectura.
+
+    La clave combina la URL (host, ruta y parámetros normalizados) con las
+    versiones de ``cache_versions``; los signals las incrementan al
+    guardar o eliminar esos modelos, invalidando las respuestas viejas.
+    """
+
+    cache_versions = ()
+
+    def get_cache_key_parts(self, request):
+        return []
+
+    def get_response_cache_key(self, request):
+        parts = [
+            request.scheme,
+            request.get_host(),
+            request.path,
+            normalized_query_params(request.query_params),
+            *self.get_cache_key_parts(request),
+        ]
+        digest = hashlib.md5(
+            repr(parts).encode("utf-8"), usedforsecurity=False
+        ).hexdigest()
+        version = ":".join(
+            str(get_cache_version(name)) for name in self.cache_versions
+        )
+        return f"response:{self.basename}:{version}:{digest}"
+
+    def cached_response(self, request, handler, *args, **kwargs):
+        key = self.get_response_cache_key(request)
+        data = response_cache().get(key)
+
+        if data is not None:
+            _increment_counter("response-cache:hits")
+            response = Response(data)
+            response["X-Cache"] = "HIT"
+            return response
+
+        _increment_counter("response-cache:misses")
+        response = handler(request, *args, **kwargs)
+
+        if response.status_code == 200:
+            response_cache().set(key, response.data, settings.RESPONSE_CACHE_TIMEOUT)
+        response["X-Cache"] = "MISS"
+        return response
+
+    def list(self, request, *args, **kwargs):
+        return self.cached_response(request, super().list, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.cached_response(request, super().retrieve, *args, **kwargs)
+
+
+# ======================
+# GET CONDICIONAL
+# ======================
+def build_etag(*parts, versions=()):
+    values = [*parts, *(get_cache_version(name) for name in versions)]
+    digest = hashlib.md5(
+        repr(values).encode("utf-8"), usedforsecurity=False
+    ).hexdigest()
+    return f'"{digest}"'
+
+
+class ConditionalResponseMixin:
+    """
+    Agrega ETag / Last-Modified a list/retrieve y responde 304 cuando el
+    cliente ya tiene la versión actual, sin serializar nada.
+
+    Las vistas implementan ``get_list_validators`` y
+    ``get_detail_validators``, que devuelven ``(etag, last_modified)`` o
+    ``None`` si no aplica; ``last_modified`` puede ser None para enviar
+    solo el ETag. Junto a CachedResponseMixin, los validadores se
+    cachean con la misma clave que la respuesta.
+    """
+
+    def get_list_validators(self, request):
+        return None
+
+    def get_detail_validators(self, request, **kwargs):
+        return None
+
+    def get_cached_validators(self, request, compute):
+        if not hasattr(self, "get_response_cache_key"):
+            return compute()
+
+        key = f"{self.get_response_cache_key(request)}:validators"
+        validators = response_cache().get(key)
+        if validators is None:
+            validators = compute()
+            if validators is not None:
+                response_cache().set(
+                    key, validators, settings.RESPONSE_CACHE_TIMEOUT
+                )
+        return validators
+
+    def conditional_response(self, request, validators, handler, *args, **kwargs):
+        if validators is None:
+            return handler(request, *args, **kwargs)
+
+        etag, last_modified = validators
+        headers = HttpResponse()
+        headers["ETag"] = etag
+        timestamp = None
+        if last_modified:
+            timestamp = int(last_modified.timestamp())
+            headers["Last-Modified"] = http_date(timestamp)
+
+        conditional = get_conditional_response(
+            request, etag=etag, last_modified=timestamp, response=headers
+        )
+        if conditional is not headers:
+            return conditional
+
+        response = handler(request, *args, **kwargs)
+        if response.status_code == 200:
+            for header in ("ETag", "Last-Modified"):
+                if header in headers:
+                    response[header] = headers[header]
+        return response
+
+    def list(self, request, *args, **kwargs):
+        validators = self.get_cached_validators(
+            request, lambda: self.get_list_validators(request)
+        )
+        return self.conditional_response(
+            request, validators, super().list, *args, **kwargs
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        validators = self.get_cached_validators(
+            request, lambda: self.get_detail_validators(request, **kwargs)
+        )
+        return self.conditional_response(
+            request, validators, super().retrieve, *args, **kwargs
+        )
@@ -0,0 +1,63 @@
+# app/categories.py
+from collections import defaultdict
+
+from django.core.cache import cache
+
+from .cache_utils import get_cache_version
+from .models import Category
+from .serializers import CategoryPublicTreeSerializer
+
+
+def build_category_tree(categories, root_id=None):
+    """
+    Arma el árbol en memoria a partir de una lista plana de categorías.
+    Cada nodo recibe ``tree_children``; devuelve las raíces (o solo
+    ``root_id`` si se indica). Conserva el orden de la lista recibida.
+    Los nodos cuyo padre no está en la lista quedan fuera del árbol.
+    """
+    categories = list(categories)
+    children = defaultdict(list)
+
+    for category in categories:
+        children[category.parent_id].append(category)
+
+    for category in categories:
+        category.tree_children = children.get(category.id, [])
+
+    if root_id is not None:
+        return [category for category in categories if category.id == root_id]
+
+    return children[None]
+
+
+def rollup_products_count(nodes):
+    """
+    Suma ``products_count`` (productos directos) de cada subárbol en
+    ``subtree_products_count``. Devuelve el total de los nodos recibidos.
+    """
+    total = 0
+    for node in nodes:
+        node.subtree_products_count = (
+            node.products_count + rollup_products_count(node.tree_children)
+        )
+        total += node.subtree_products_count
+    return total
+
+
+def get_public_category_tree():
+    """
+    Árbol de categorías activas ya serializado. Se arma con una sola
+    consulta y se guarda en cache hasta que cambie alguna categoría.
+    """
+    key = f"public-category-tree:{get_cache_version('category')}"
+    tree = cache.get(key)
+
+    if tree is None:
+        categories = Category.objects.filter(is_active=True).only(
+            "id", "name", "slug", "parent_id"
+        )
+        roots = build_category_tree(categories)
+        tree = list(CategoryPublicTreeSerializer(roots, many=True).data)
+        cache.set(key, tree, None)
+
+    return tree
@@ -0,0 +1,96 @@
+# app/deletions.py
+"""
+Eliminación masiva por conjuntos para las acciones del panel.
+
+En lugar de borrar fila por fila, se decide con un solo SELECT qué IDs
+están protegidos y el resto se borra por bloques con DELETE ... WHERE id
+IN (...), dentro de una transacción.
+
+Los productos se borran con el Collector de Django por bloque, que
+respeta el on_delete de cada relación sin mantener aquí la lista de
+tablas hijas. Los receptores por fila (índice de búsqueda y versiones de
+cache) se silencian: el índice se actualiza una vez por bloque y la
+cache una vez al final.
+"""
+from django.db import transaction
+from django.db.models import Exists, OuterRef
+
+from .cache_utils import bump_cache_version
+from .models import Cart, CartItem, OrderItem, Product
+from .search import get_product_search
+from .signals import per_row_receivers_muted
+
+
+DELETE_CHUNK_SIZE = 500
+
+
+def chunks(values, size=DELETE_CHUNK_SIZE):
+    for start in range(0, len(values), size):
+        yield values[start:start + size]
+
+
+def delete_products(ids):
+    """
+    Elimina los productos que no están en carritos ni pedidos.
+
+    Devuelve (eliminados, protegidos como [(id, nombre)], IDs inexistentes),
+    respetando el orden recibido.
+    """
+    ids = list(dict.fromkeys(str(value) for value in ids))
+
+    with transaction.atomic():
+        # FOR UPDATE: un carrito o pedido nuevo espera a que termine el borrado
+        rows = (
+            Product.objects.filter(id__in=ids)
+            .select_for_update()
+            .annotate(
+                in_carts=Exists(CartItem.objects.filter(product=OuterRef("pk"))),
+                in_orders=Exists(OrderItem.objects.filter(product=OuterRef("pk"))),
+            )
+            .values_list("id", "name", "in_carts", "in_orders")
+        )
+        found = {
+            str(product_id): (name, in_carts or in_orders)
+            for product_id, name, in_carts, in_orders in rows
+        }
+
+        deletable = [
+            product_id for product_id in ids
+            if product_id in found and not found[product_id][1]
+        ]
+        for chunk in chunks(deletable):
+            with per_row_receivers_muted():
+                Product.objects.filter(id__in=chunk).delete()
+            get_product_search().remove(chunk)
+
+    if deletable:
+        bump_cache_version("product", "productimage")
+
+    protected = [
+        (product_id, found[product_id][0])
+        for product_id in ids
+        if product_id in found and found[product_id][1]
+    ]
+    missing = [product_id for product_id in ids if product_id not in found]
+    return len(deletable), protected, missing
+
+
+def delete_carts(ids):
+    """
+    Elimina carritos con sus ítems. Devuelve (eliminados, IDs inexistentes).
+    """
+    ids = list(dict.fromkeys(str(value) for value in ids))
+
+    with transaction.atomic():
+        found = {
+            str(cart_id)
+            for cart_id in Cart.objects.filter(id__in=ids).values_list("id", flat=True)
+        }
+        existing = [cart_id for cart_id in ids if cart_id in found]
+
+        for chunk in chunks(existing):
+            # Cart y CartItem no tienen receptores: el collector borra los
+            # ítems con un solo DELETE por bloque, sin cargarlos
+            Cart.objects.filter(id__in=chunk).delete()
+
+    return len(existing), [cart_id for cart_id in ids if cart_id not in found]
@@ -0,0 +1,400 @@
+# app/guest_carts.py
+"""
+Almacenamiento de carritos invitados.
+
+- ``cache``: el carrito vive en la cache (GUEST_CART_CACHE_ALIAS) bajo la
+  clave de sesión y expira tras GUEST_CART_TIMEOUT segundos sin cambios.
+  No crea filas en app_cart; pasa a SQL recién al iniciar sesión, en
+  ``merge_session_cart_to_user``. Los carritos SQL creados antes de
+  cambiar a ``cache`` se siguen leyendo y pasan a la cache en su primera
+  modificación.
+- ``database``: filas Cart/CartItem con ``session_key``. Para despliegues
+  con varios procesos y sin cache compartida.
+
+Ambos devuelven CartItem (sin guardar, en el caso de la cache) para que
+los carritos invitados se serialicen igual que los de usuarios.
+"""
+import time
+import uuid
+from contextlib import contextmanager
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .models import Cart, CartItem, Product
+
+
+# Relaciones que ProductSerializer necesita al anidar el producto
+PRODUCT_SELECT_RELATED = ("category", "vendor")
+PRODUCT_PREFETCH_RELATED = ("productimage_set",)
+
+
+class GuestCart:
+    """
+    Carrito invitado listo para GuestCartSerializer.
+    """
+
+    user = None
+
+    def __init__(self, id=None, created_at=None, items=()):
+        self.id = id
+        self.created_at = created_at
+        self.items = list(items)
+
+    def get_item(self, item_id):
+        return next((item for item in self.items if str(item.id) == str(item_id)), None)
+
+
+class GuestCartStore:
+    """
+    Interfaz común. ``session_key`` identifica al invitado; los métodos de
+    lectura devuelven None si todavía no tiene carrito.
+    """
+
+    def get(self, session_key):
+        raise NotImplementedError
+
+    def add(self, session_key, product, quantity):
+        raise NotImplementedError
+
+    def update_item(self, session_key, item_id, quantity):
+        raise NotImplementedError
+
+    def remove_item(self, session_key, item_id):
+        raise NotImplementedError
+
+    def merge_into(self, session_key, user):
+        raise NotImplementedError
+
+
+def add_to_user_cart(user, quantities, prices):
+    """
+    Suma ``quantities`` (product_id -> cantidad) al carrito del usuario con
+    un INSERT y un UPDATE en lote.
+    """
+    user_cart, _ = Cart.objects.get_or_create(user=user)
+    existing = {
+        str(item.product_id): item
+        for item in user_cart.cartitem_set.filter(product_id__in=list(quantities))
+    }
+
+    now = timezone.now()
+    updated = []
+    created = []
+    for product_id, quantity in quantities.items():
+        item = existing.get(product_id)
+        if item:
+            item.quantity += quantity
+            item.updated_at = now
+            updated.append(item)
+        else:
+            created.append(CartItem(
+                cart=user_cart,
+                product_id=product_id,
+                quantity=quantity,
+                price_snapshot=prices[product_id],
+            ))
+
+    CartItem.objects.bulk_update(updated, ["quantity", "updated_at"])
+    CartItem.objects.bulk_create(created)
+    user_cart.save(update_fields=["updated_at"])
+    return user_cart
+
+
+# ======================
+# CACHE
+# ======================
+class CacheGuestCartStore(GuestCartStore):
+    """
+    Guarda por sesión:
+
+        {"created_at": "...", "next_id": 3,
+         "items": [{"id": 1, "product_id": "...", "quantity": 2,
+                    "price_snapshot": "15.00", "created_at": "..."}]}
+
+    Cada escritura renueva el TTL. Los ids de ítem son enteros propios del
+    carrito, como los de CartItem, para que el cliente use las mismas rutas.
+
+    Las escrituras leen, modifican y guardan el dict completo, así que se
+    serializan por sesión con un lock en la misma cache (``cache.add``);
+    el lock expira solo tras ``lock_timeout`` si un proceso muere con él.
+    """
+
+    lock_timeout = 5
+    lock_poll = 0.05
+
+    def __init__(self, alias=None, timeout=None):
+        self.cache = caches[alias or settings.GUEST_CART_CACHE_ALIAS]
+        self.timeout = timeout or settings.GUEST_CART_TIMEOUT
+
+    def key(self, session_key):
+        return f"guest-cart:{session_key}"
+
+    @contextmanager
+    def locked(self, session_key):
+        lock_key = f"{self.key(session_key)}:lock"
+        token = uuid.uuid4().hex
+        while not self.cache.add(lock_key, token, self.lock_timeout):
+            time.sleep(self.lock_poll)
+        try:
+            yield
+        finally:
+            # Si expiró y otro proceso lo tomó, no se le quita
+            if self.cache.get(lock_key) == token:
+                self.cache.delete(lock_key)
+
+    def load(self, session_key):
+        return self.cache.get(self.key(session_key))
+
+    def save(self, session_key, data):
+        self.cache.set(self.key(session_key), data, self.timeout)
+
+    def legacy_data(self, session_key):
+        """
+        Carrito SQL de la sesión en el formato de la cache, conservando los
+        ids de ítem que el cliente ya conoce. None si no hay.
+        """
+        cart = DatabaseGuestCartStore().carts(session_key).first()
+        if cart is None:
+            return None
+
+        items = list(cart.cartitem_set.order_by("id"))
+        return {
+            "created_at": cart.created_at.isoformat(),
+            "next_id": max((item.id for item in items), default=0) + 1,
+            "items": [
+                {
+                    "id": item.id,
+                    "product_id": str(item.product_id),
+                    "quantity": item.quantity,
+                    "price_snapshot": str(item.price_snapshot),
+                    "created_at": item.created_at.isoformat(),
+                }
+                for item in items
+            ],
+        }
+
+    def load_for_update(self, session_key):
+        """
+        Igual que ``load``, pero mueve a la cache el carrito SQL de la
+        sesión si solo existe ahí. Se llama con el lock tomado.
+        """
+        data = self.load(session_key)
+        if data is None:
+            data = self.legacy_data(session_key)
+            if data is not None:
+                self.save(session_key, data)
+                DatabaseGuestCartStore().carts(session_key).delete()
+        return data
+
+    def build(self, data):
+        product_ids = [entry["product_id"] for entry in data["items"]]
+        products = {
+            str(product.id): product
+            for product in Product.objects.filter(id__in=product_ids)
+            .select_related(*PRODUCT_SELECT_RELATED)
+            .prefetch_related(*PRODUCT_PREFETCH_RELATED)
+        }
+
+        # Los productos eliminados desde que se agregaron se omiten
+        items = [
+            CartItem(
+                id=entry["id"],
+                product=products[entry["product_id"]],
+                quantity=entry["quantity"],
+                price_snapshot=Decimal(entry["price_snapshot"]),
+                created_at=parse_datetime(entry["created_at"]),
+            )
+            for entry in data["items"]
+            if entry["product_id"] in products
+        ]
+        return GuestCart(created_at=parse_datetime(data["created_at"]), items=items)
+
+    def get(self, session_key):
+        data = self.load(session_key)
+        if data:
+            return self.build(data)
+        return DatabaseGuestCartStore().get(session_key)
+
+    def add(self, session_key, product, quantity):
+        now = timezone.now().isoformat()
+        with self.locked(session_key):
+            data = self.load_for_update(session_key) or {
+                "created_at": now, "next_id": 1, "items": [],
+            }
+
+            product_id = str(product.id)
+            entry = next(
+                (entry for entry in data["items"] if entry["product_id"] == product_id),
+                None,
+            )
+            if entry:
+                entry["quantity"] += quantity
+            else:
+                data["items"].append({
+                    "id": data["next_id"],
+                    "product_id": product_id,
+                    "quantity": quantity,
+                    "price_snapshot": str(product.effective_price),
+                    "created_at": now,
+                })
+                data["next_id"] += 1
+
+            self.save(session_key, data)
+        return self.build(data)
+
+    def find_entry(self, data, item_id):
+        return next(
+            (entry for entry in data["items"] if str(entry["id"]) == str(item_id)),
+            None,
+        )
+
+    def update_item(self, session_key, item_id, quantity):
+        with self.locked(session_key):
+            data = self.load_for_update(session_key)
+            entry = self.find_entry(data, item_id) if data else None
+            if entry is None:
+                return None
+
+            entry["quantity"] = quantity
+            self.save(session_key, data)
+        return self.build(data).get_item(item_id)
+
+    def remove_item(self, session_key, item_id):
+        with self.locked(session_key):
+            data = self.load_for_update(session_key)
+            entry = self.find_entry(data, item_id) if data else None
+            if entry is None:
+                return False
+
+            data["items"].remove(entry)
+            self.save(session_key, data)
+        return True
+
+    def merge_into(self, session_key, user):
+        with self.locked(session_key):
+            data = self.load(session_key)
+            if not data:
+                # Carrito SQL de antes de cambiar a la cache
+                return DatabaseGuestCartStore().merge_into(session_key, user)
+
+            quantities = {}
+            prices = {}
+            for entry in data["items"]:
+                quantities[entry["product_id"]] = quantities.get(entry["product_id"], 0) + entry["quantity"]
+                prices[entry["product_id"]] = entry["price_snapshot"]
+
+            # Solo productos que siguen existiendo (CartItem.product es PROTECT)
+            existing = {
+                str(product_id)
+                for product_id in Product.objects.filter(id__in=list(quantities))
+                .values_list("id", flat=True)
+            }
+            quantities = {
+                product_id: quantity
+                for product_id, quantity in quantities.items()
+                if product_id in existing
+            }
+
+            user_cart = None
+            if quantities:
+                with transaction.atomic():
+                    user_cart = add_to_user_cart(user, quantities, prices)
+
+            self.cache.delete(self.key(session_key))
+        return user_cart
+
+
+# ======================
+# BASE DE DATOS
+# ======================
+class DatabaseGuestCartStore(GuestCartStore):
+    def carts(self, session_key):
+        return Cart.objects.filter(session_key=session_key, user__isnull=True)
+
+    def items(self, session_key):
+        return CartItem.objects.filter(
+            cart__session_key=session_key, cart__user__isnull=True
+        ).select_related(
+            *(f"product__{field}" for field in PRODUCT_SELECT_RELATED)
+        ).prefetch_related(
+            *(f"product__{field}" for field in PRODUCT_PREFETCH_RELATED)
+        )
+
+    def get(self, session_key):
+        cart = self.carts(session_key).first()
+        if cart is None:
+            return None
+        return GuestCart(
+            id=cart.id,
+            created_at=cart.created_at,
+            items=self.items(session_key).filter(cart=cart),
+        )
+
+    def add(self, session_key, product, quantity):
+        cart, _ = Cart.objects.get_or_create(session_key=session_key, user=None)
+
+        item, created = CartItem.objects.get_or_create(
+            cart=cart,
+            product=product,
+            defaults={
+                "quantity": quantity,
+                "price_snapshot": product.effective_price,
+            },
+        )
+        if not created:
+            item.quantity += quantity
+            item.save()
+
+        cart.save(update_fields=["updated_at"])
+        return self.get(session_key)
+
+    def update_item(self, session_key, item_id, quantity):
+        item = self.items(session_key).select_related("cart").filter(id=item_id).first()
+        if item is None:
+            return None
+
+        item.quantity = quantity
+        item.save()
+        item.cart.save(update_fields=["updated_at"])
+        return item
+
+    def remove_item(self, session_key, item_id):
+        item = self.items(session_key).select_related("cart").filter(id=item_id).first()
+        if item is None:
+            return False
+
+        item.delete()
+        item.cart.save(update_fields=["updated_at"])
+        return True
+
+    def merge_into(self, session_key, user):
+        session_cart = self.carts(session_key).first()
+        if not session_cart:
+            return None
+
+        quantities = {}
+        prices = {}
+        for item in session_cart.cartitem_set.all():
+            product_id = str(item.product_id)
+            quantities[product_id] = quantities.get(product_id, 0) + item.quantity
+            prices[product_id] = item.price_snapshot
+
+        with transaction.atomic():
+            user_cart = add_to_user_cart(user, quantities, prices)
+            session_cart.delete()
+        return user_cart
+
+
+GUEST_CART_STORES = {
+    "cache": CacheGuestCartStore,
+    "database": DatabaseGuestCartStore,
+}
+
+
+def get_guest_cart_store():
+    return GUEST_CART_STORES[settings.GUEST_CART_BACKEND]()
@@ -0,0 +1,60 @@
+# app/image_dedup.py
+"""
+Deduplicación de imágenes de producto por contenido.
+
+Cada ProductImage guarda el SHA-256 de su archivo (``content_hash``). Si
+se sube un archivo cuyos bytes ya están guardados, la fila apunta al
+mismo archivo y reutiliza sus variantes, sin volver a subirlo.
+"""
+import hashlib
+
+from .image_variants import VARIANT_FORMATS
+
+
+def hash_bytes(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+def hash_file(file):
+    digest = hashlib.sha256()
+    for chunk in file.chunks():
+        digest.update(chunk)
+    file.seek(0)
+    return digest.hexdigest()
+
+
+def stored_images(queryset, hashes):
+    """
+    content_hash -> (nombre del archivo, variantes) de las imágenes ya
+    guardadas, con una sola consulta.
+    """
+    hashes = [value for value in hashes if value]
+    if not hashes:
+        return {}
+
+    stored = {}
+    rows = (
+        queryset.filter(content_hash__in=hashes)
+        .order_by("content_hash", "id")
+        .values_list("content_hash", "image", "variants")
+    )
+    for content_hash, name, variants in rows:
+        stored.setdefault(content_hash, (name, variants))
+    return stored
+
+
+def blob_size(storage, name, variants):
+    """
+    Bytes del archivo original más sus variantes.
+    """
+    names = [name]
+    for key in VARIANT_FORMATS:
+        names.extend((variants or {}).get(key, {}).values())
+
+    total = 0
+    for value in names:
+        try:
+            total += storage.size(value)
+        except OSError:
+            continue
+    return total
@@ -0,0 +1,260 @@
+# app/image_imports.py
+"""
+Carga masiva de imágenes de producto desde un ZIP.
+
+El nombre de cada archivo indica el SKU: ``SKU123.jpg``, ``SKU123_2.jpg``
+o ``SKU123_main.jpg`` (imagen principal). Las imágenes se validan y se
+guardan en paralelo (ThreadPoolExecutor: el trabajo es sobre todo E/S
+hacia el storage) y las filas de ProductImage se crean con bulk_create.
+"""
+import os
+import re
+import zipfile
+from concurrent.futures import Future, ThreadPoolExecutor
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import transaction
+from django.db.models.functions import Lower
+from PIL import Image, UnidentifiedImageError
+
+from .cache_utils import bump_cache_version
+from .image_dedup import hash_bytes, stored_images
+from .image_variants import build_variants, delete_variants
+from .models import Product, ProductImage
+
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".webp")
+IMAGE_FORMATS = ("JPEG", "PNG", "WEBP")
+
+# SKU123_main / SKU123_2 -> ("SKU123", "main" | "2")
+SUFFIX_PATTERN = re.compile(r"^(.+)_(main|\d+)$", re.IGNORECASE)
+
+
+def parse_image_name(filename):
+    """
+    Devuelve las lecturas posibles del nombre como (sku, principal, orden):
+    primero el nombre completo, por si el SKU lleva "_", y luego el SKU
+    sin el sufijo.
+    """
+    stem = os.path.splitext(os.path.basename(filename))[0].strip()
+    candidates = [(stem, False, 0)]
+
+    match = SUFFIX_PATTERN.match(stem)
+    if match:
+        suffix = match.group(2).lower()
+        is_main = suffix == "main"
+        candidates.append((match.group(1), is_main, 0 if is_main else int(suffix)))
+
+    return candidates
+
+
+def is_hidden_entry(info):
+    # Carpetas y archivos que agregan macOS/Windows al comprimir
+    name = os.path.basename(info.filename)
+    return (
+        info.is_dir()
+        or info.filename.startswith("__MACOSX/")
+        or name.startswith(".")
+        or name.lower() == "thumbs.db"
+    )
+
+
+def store_image(filename, data):
+    """
+    Valida y guarda una imagen con sus variantes. Corre en el pool de
+    hilos; devuelve (nombre, variantes) o lanza ValueError con el motivo.
+    """
+    try:
+        with Image.open(BytesIO(data)) as image:
+            image_format = image.format
+            image.verify()
+    except (UnidentifiedImageError, OSError, SyntaxError):
+        raise ValueError("Imagen inválida o dañada")
+
+    if image_format not in IMAGE_FORMATS:
+        raise ValueError(f"Formato no soportado: {image_format}")
+
+    field = ProductImage._meta.get_field("image")
+    name = field.generate_filename(None, os.path.basename(filename))
+    name = field.storage.save(name, ContentFile(data))
+
+    # bulk_create no dispara post_save: las variantes se generan aquí
+    try:
+        variants = build_variants(field.storage, name, data)
+    except (OSError, ValueError):
+        variants = {"source": name}
+    return name, variants
+
+
+class ProductImageZipImporter:
+    """
+    Procesa el ZIP y arma el reporte de archivos asociados y no asociados.
+    """
+
+    def __init__(self, archive, workers=None, max_file_size=None):
+        self.archive = archive
+        self.workers = workers or settings.IMAGE_IMPORT_WORKERS
+        self.max_file_size = max_file_size or settings.IMAGE_IMPORT_MAX_FILE_SIZE
+        self.matched = []
+        self.unmatched = []
+        self.new_blobs = []
+
+    def reject(self, filename, reason):
+        self.unmatched.append({"file": filename, "reason": reason})
+
+    def match_products(self, entries):
+        """
+        SKU (sin distinguir mayúsculas) -> producto, con una sola consulta.
+        """
+        candidates = {
+            sku.lower()
+            for info in entries
+            for sku, *_ in parse_image_name(info.filename)
+        }
+        products = (
+            Product.objects
+            .annotate(sku_lower=Lower("sku"))
+            .filter(sku_lower__in=candidates)
+            .only("id", "sku")
+        )
+        return {product.sku_lower: product for product in products}
+
+    def run(self):
+        with zipfile.ZipFile(self.archive) as archive:
+            entries = []
+            for info in archive.infolist():
+                if is_hidden_entry(info):
+                    continue
+                if not info.filename.lower().endswith(IMAGE_EXTENSIONS):
+                    self.reject(info.filename, "No es una imagen (JPG, PNG o WEBP)")
+                elif info.file_size > self.max_file_size:
+                    self.reject(info.filename, "Archivo demasiado grande")
+                else:
+                    entries.append(info)
+
+            products = self.match_products(entries)
+            pending = []
+            for info in entries:
+                match = next(
+                    (
+                        (products[sku.lower()], is_main, order)
+                        for sku, is_main, order in parse_image_name(info.filename)
+                        if sku.lower() in products
+                    ),
+                    None,
+                )
+                if match is None:
+                    self.reject(info.filename, "SKU no encontrado")
+                    continue
+                pending.append((info, *match))
+
+            stored = self.store_all(archive, pending)
+
+        return self.save_rows(stored)
+
+    def store_all(self, archive, pending):
+        """
+        Lee los archivos en este hilo y valida/guarda en el pool, por
+        tandas para no tener todo el ZIP descomprimido en memoria. Los
+        archivos cuyo contenido ya está guardado (en la base o antes en el
+        mismo ZIP) reutilizan ese archivo sin volver a subirlo.
+        """
+        stored = []
+        blobs = {}
+        batch_size = self.workers * 4
+
+        with ThreadPoolExecutor(
+            max_workers=self.workers, thread_name_prefix="image-import"
+        ) as executor:
+            for start in range(0, len(pending), batch_size):
+                batch = []
+                for info, *match in pending[start:start + batch_size]:
+                    data = archive.read(info)
+                    batch.append((info, match, hash_bytes(data), data))
+
+                existing = stored_images(
+                    ProductImage.objects.all(),
+                    {content_hash for _, _, content_hash, _ in batch} - set(blobs),
+                )
+                blobs.update(existing)
+
+                for info, _, content_hash, data in batch:
+                    if content_hash not in blobs:
+                        blobs[content_hash] = executor.submit(store_image, info.filename, data)
+                        self.new_blobs.append(blobs[content_hash])
+
+                for info, (product, is_main, order), content_hash, _ in batch:
+                    blob = blobs[content_hash]
+                    try:
+                        name, variants = blob.result() if isinstance(blob, Future) else blob
+                    except ValueError as error:
+                        self.reject(info.filename, str(error))
+                        continue
+                    stored.append((
+                        info.filename, product, is_main, order,
+                        (name, variants, content_hash),
+                    ))
+
+        return stored
+
+    def save_rows(self, stored):
+        """
+        Crea las filas y deja una sola imagen principal por producto: la
+        marcada con ``_main`` o, si el producto no tenía principal, la
+        primera según su número.
+        """
+        stored.sort(key=lambda item: (item[1].pk, not item[2], item[3], item[0]))
+        product_ids = {product.pk for _, product, *_ in stored}
+        with_main = set(
+            ProductImage.objects.filter(product_id__in=product_ids, is_main=True)
+            .values_list("product_id", flat=True)
+        )
+
+        rows = []
+        replaced_main = set()
+        chosen_main = set()
+        for filename, product, is_main, order, (name, variants, content_hash) in stored:
+            main = product.pk not in chosen_main and (
+                is_main or product.pk not in with_main
+            )
+            if main:
+                chosen_main.add(product.pk)
+                if product.pk in with_main:
+                    replaced_main.add(product.pk)
+
+            rows.append(ProductImage(
+                product_id=product.pk, image=name, variants=variants,
+                content_hash=content_hash, is_main=main,
+            ))
+            self.matched.append({"file": filename, "sku": product.sku, "is_main": main})
+
+        try:
+            with transaction.atomic():
+                ProductImage.objects.filter(
+                    product_id__in=replaced_main, is_main=True
+                ).update(is_main=False)
+                ProductImage.objects.bulk_create(rows, batch_size=500)
+        except Exception:
+            # Solo se borran los archivos subidos por esta importación
+            storage = ProductImage._meta.get_field("image").storage
+            for blob in self.new_blobs:
+                if blob.exception() is None:
+                    name, variants = blob.result()
+                    storage.delete(name)
+                    delete_variants(storage, variants)
+            raise
+
+        if rows:
+            bump_cache_version("productimage", "product")
+
+        return rows
+
+    def report(self):
+        return {
+            "created": len(self.matched),
+            "uploaded": len([blob for blob in self.new_blobs if blob.exception() is None]),
+            "matched": self.matched,
+            "unmatched": self.unmatched,
+        }
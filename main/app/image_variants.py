@@ -0,0 +1,182 @@
+# app/image_variants.py
+"""
+Variantes redimensionadas (WebP y JPEG) de las imágenes subidas.
+
+Se generan al subir la imagen y se guardan junto al original
+(``products/foto.jpg`` -> ``products/foto_w640.webp``). Los nombres se
+registran en un JSONField del modelo:
+
+    {"source": "products/foto.jpg",
+     "webp": {"320": "products/foto_w320.webp", ...},
+     "jpeg": {"320": "products/foto_w320.jpg", ...}}
+
+``source`` indica de qué archivo salieron, para regenerarlas solo cuando
+cambia la imagen.
+"""
+import os
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from PIL import Image, ImageOps
+
+
+VARIANT_FORMATS = {
+    "webp": ("WEBP", ".webp"),
+    "jpeg": ("JPEG", ".jpg"),
+}
+
+# Modelo -> (campo de imagen, campo con las variantes)
+VARIANT_FIELDS = {
+    "productimage": ("image", "variants"),
+    "banner": ("image", "variants"),
+    "vendor": ("logo", "logo_variants"),
+}
+
+
+def variant_widths(original_width):
+    # Nunca se amplía: los anchos mayores al original se recortan a él
+    return sorted({min(width, original_width) for width in settings.IMAGE_VARIANT_WIDTHS})
+
+
+def build_variants(storage, name, data):
+    """
+    Genera y guarda las variantes de ``data`` (bytes del archivo ``name``).
+    Devuelve el dict de nombres guardados.
+    """
+    with Image.open(BytesIO(data)) as image:
+        image = ImageOps.exif_transpose(image)
+        if image.mode not in ("RGB", "RGBA"):
+            has_alpha = image.mode in ("LA", "PA") or "transparency" in image.info
+            image = image.convert("RGBA" if has_alpha else "RGB")
+
+        root = os.path.splitext(name)[0]
+        variants = {"source": name, **{key: {} for key in VARIANT_FORMATS}}
+
+        for width in variant_widths(image.width):
+            height = max(1, round(image.height * width / image.width))
+            resized = image.resize((width, height), Image.LANCZOS)
+
+            for key, (image_format, extension) in VARIANT_FORMATS.items():
+                frame = resized
+                if image_format == "JPEG" and frame.mode != "RGB":
+                    # JPEG no admite transparencia: se apoya sobre blanco
+                    frame = Image.new("RGB", resized.size, "white")
+                    frame.paste(resized, mask=resized.getchannel("A"))
+
+                buffer = BytesIO()
+                frame.save(
+                    buffer,
+                    format=image_format,
+                    quality=settings.IMAGE_VARIANT_QUALITY,
+                    optimize=True,
+                )
+                variants[key][str(width)] = storage.save(
+                    f"{root}_w{width}{extension}", ContentFile(buffer.getvalue())
+                )
+
+    return variants
+
+
+def delete_variants(storage, variants):
+    for key in VARIANT_FORMATS:
+        for name in (variants or {}).get(key, {}).values():
+            storage.delete(name)
+
+
+def delete_unshared_variants(instance, variants, exclude=()):
+    """
+    Borra ``variants`` salvo que otra fila del modelo (fuera de
+    ``instance`` y de los pks de ``exclude``) las use: las imágenes
+    deduplicadas comparten archivo y variantes.
+    """
+    image_field, variants_field = VARIANT_FIELDS[instance._meta.model_name]
+    source = (variants or {}).get("source")
+    if not source:
+        return
+
+    shared = type(instance)._default_manager.filter(
+        **{f"{variants_field}__source": source}
+    ).exclude(pk__in=[instance.pk, *exclude]).exists()
+    if not shared:
+        delete_variants(getattr(instance, image_field).storage, variants)
+
+
+def render_variants(file):
+    """
+    Genera las variantes de ``file`` y devuelve el dict a guardar.
+    """
+    name = file.name if file else ""
+    if not name:
+        return {}
+
+    try:
+        with file.open("rb") as source:
+            return build_variants(file.storage, name, source.read())
+    except (OSError, ValueError):
+        # Archivo ausente o que Pillow no puede procesar: se sirve el original
+        return {"source": name}
+
+
+def sync_variants(instance, force=False):
+    """
+    Regenera las variantes si la imagen del modelo cambió (o siempre, con
+    ``force``). Devuelve True si se actualizaron.
+    """
+    image_field, variants_field = VARIANT_FIELDS[instance._meta.model_name]
+    file = getattr(instance, image_field)
+    current = getattr(instance, variants_field) or {}
+
+    name = file.name if file else ""
+    if not force and current.get("source", "") == name:
+        return False
+
+    variants = render_variants(file)
+    delete_unshared_variants(instance, current)
+    type(instance)._default_manager.filter(pk=instance.pk).update(**{variants_field: variants})
+    setattr(instance, variants_field, variants)
+    return True
+
+
+# ======================
+# SERIALIZACIÓN
+# ======================
+def wants_original(request):
+    return request is not None and request.query_params.get("original", "").lower() in ("1", "true")
+
+
+def variant_srcset(file, variants, url=None):
+    """
+    {"webp": {"320w": url, ...}, "jpeg": {...}} o None si no hay variantes
+    (imágenes anteriores a las variantes o que Pillow no pudo procesar).
+    """
+    url = url or (lambda value: value)
+    if not file or not variants or variants.get("source") != file.name:
+        return None
+
+    srcset = {
+        key: {
+            f"{width}w": url(file.storage.url(name))
+            for width, name in sorted(variants.get(key, {}).items(), key=lambda item: int(item[0]))
+        }
+        for key in VARIANT_FORMATS
+    }
+    return srcset if any(srcset.values()) else None
+
+
+def display_url(file, variants, original=False):
+    """
+    URL a mostrar por defecto: la variante JPEG más grande que no supere
+    IMAGE_VARIANT_DEFAULT_WIDTH. El original solo se entrega si no hay
+    variantes o si se pide explícitamente.
+    """
+    if not file:
+        return None
+
+    jpeg = (variants or {}).get("jpeg", {})
+    if original or not jpeg or variants.get("source") != file.name:
+        return file.url
+
+    widths = sorted(int(width) for width in jpeg)
+    fitting = [width for width in widths if width <= settings.IMAGE_VARIANT_DEFAULT_WIDTH]
+    return file.storage.url(jpeg[str(fitting[-1] if fitting else widths[0])])
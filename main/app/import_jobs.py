@@ -0,0 +1,123 @@
+# app/import_jobs.py
+"""
+Importaciones en segundo plano.
+
+Los trabajos corren en un ThreadPoolExecutor del mismo proceso, sin
+broker externo. Cada bloque del archivo se confirma en la misma
+transacción que el avance del trabajo (``chunks_done`` y conteos), así
+un trabajo fallido se reanuda desde el primer bloque sin confirmar.
+
+Los cambios de estado se reclaman con un UPDATE condicionado al estado
+actual, de modo que dos procesos nunca ejecutan el mismo trabajo. Un
+trabajo RUNNING cuyo ``updated_at`` no avanza en IMPORT_JOB_STALE_AFTER
+segundos se considera abandonado (el proceso que lo ejecutaba se detuvo)
+y se puede reanudar.
+"""
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .importers import ProductImporter, read_frames
+from .models import ImportJob
+
+
+executor = ThreadPoolExecutor(
+    max_workers=settings.IMPORT_JOB_WORKERS,
+    thread_name_prefix="import-job",
+)
+
+
+def submit_import_job(job):
+    """
+    Encola el trabajo cuando se confirme la transacción que lo creó.
+    """
+    transaction.on_commit(lambda: executor.submit(run_in_worker, job.pk))
+
+
+def resumable_jobs():
+    """
+    Trabajos fallidos o en proceso sin avance reciente.
+    """
+    stale = timezone.now() - timedelta(seconds=settings.IMPORT_JOB_STALE_AFTER)
+    return ImportJob.objects.filter(
+        Q(status=ImportJob.Status.FAILED)
+        | Q(status=ImportJob.Status.RUNNING, updated_at__lt=stale)
+    )
+
+
+def resume_import_job(job):
+    """
+    Vuelve el trabajo a PENDING y lo encola, solo si esta llamada lo
+    reclamó. Devuelve False si no era reanudable (por ejemplo, si sigue en
+    cola, corre en otro proceso o ya lo reanudó otra petición).
+    """
+    claimed = resumable_jobs().filter(pk=job.pk).update(
+        status=ImportJob.Status.PENDING,
+        finished_at=None,
+        updated_at=timezone.now(),
+    )
+    if not claimed:
+        return False
+
+    submit_import_job(job)
+    return True
+
+
+def run_in_worker(job_id):
+    try:
+        run_import_job(job_id)
+    finally:
+        # Cada hilo abre su propia conexión; se cierra al terminar
+        connection.close()
+
+
+def run_import_job(job_id):
+    claimed = ImportJob.objects.filter(
+        pk=job_id, status=ImportJob.Status.PENDING
+    ).update(
+        status=ImportJob.Status.RUNNING,
+        error="",
+        updated_at=timezone.now(),
+    )
+    if not claimed:
+        # Otro worker ya lo tomó
+        return
+
+    job = ImportJob.objects.select_related("user").get(pk=job_id)
+
+    try:
+        importer = ProductImporter(job.mapping, job.user)
+        importer.created = job.created
+        importer.updated = job.updated
+        importer.skipped = job.skipped
+
+        with job.file.open("rb") as file:
+            for index, frame in enumerate(read_frames(file)):
+                if index < job.chunks_done:
+                    continue
+
+                with transaction.atomic():
+                    importer.import_frame(frame)
+
+                    job.chunks_done = index + 1
+                    job.rows_processed += len(frame)
+                    job.created = importer.created
+                    job.updated = importer.updated
+                    job.skipped = importer.skipped
+                    job.save(update_fields=[
+                        "chunks_done", "rows_processed",
+                        "created", "updated", "skipped", "updated_at",
+                    ])
+
+        job.status = ImportJob.Status.COMPLETED
+        job.file.delete(save=False)
+    except Exception as error:
+        job.status = ImportJob.Status.FAILED
+        job.error = str(getattr(error, "detail", error))
+
+    job.finished_at = timezone.now()
+    job.save(update_fields=["status", "error", "file", "finished_at", "updated_at"])
@@ -1,22 +1,27 @@
 # app/import_view.py
 
 import json
-import pandas as pd
-from decimal import Decimal
+import zipfile
 from django.db import transaction
+from rest_framework.exceptions import ParseError
+from rest_framework.decorators import action
 from rest_framework.views import APIView
+from rest_framework.viewsets import ReadOnlyModelViewSet
 from .permissions import IsStaff
 from rest_framework.response import Response
 from rest_framework.parsers import MultiPartParser, FormParser
-from app.models import Product, Category, Vendor
-import unicodedata
-
-def normalize(text):
-    text = str(text).strip().lower()
-    return ''.join(
-        c for c in unicodedata.normalize('NFD', text)
-        if unicodedata.category(c) != 'Mn'
-    )
+from app.models import ImportJob
+from .image_imports import ProductImageZipImporter
+from .import_jobs import resume_import_job, submit_import_job
+from .importers import (
+    IMPORT_FORMATS,
+    CategoryImporter,
+    ProductImporter,
+    ProductImportValidator,
+    VendorImporter,
+    read_frames,
+)
+from .serializers import ImportJobSerializer
 
 
 class AdminImportView(APIView):
@@ -43,29 +48,31 @@ class AdminImportView(APIView):
         # ======================
         # Leer archivo
         # ======================
-        try:
-            if file.name.endswith(".csv"):
-                df = pd.read_csv(file)
-            elif file.name.endswith(".xlsx"):
-                df = pd.read_excel(file)
-            else:
-                return Response(
-                    {"detail": "Formato no soportado. Use CSV o XLSX"},
-                    status=400
-                )
-            
-            df.columns = df.columns.str.strip()
-        except Exception as e:
-            return Response({"detail": str(e)}, status=400)
+        if not file.name.endswith(IMPORT_FORMATS):
+            return Response(
+                {"detail": "Formato no soportado. Use CSV o XLSX"},
+                status=400
+            )
 
         if model == "product":
-            return self.import_products(df, mapping, request.user)
+            error = self.validate_product_mapping(mapping)
+            if error:
+                return error
+
+            if str(request.data.get("dry_run", "")).lower() == "true":
+                return self.validate_products(read_frames(file), mapping)
+
+            if str(request.data.get("background", "")).lower() == "true":
+                return self.start_import_job(file, model, mapping, request.user)
+
+            # Por bloques: la memoria no depende del tamaño del archivo
+            return self.import_products(read_frames(file), mapping, request.user)
 
         if model == "category":
-            return self.import_categories(df, mapping)
+            return self.import_categories(read_frames(file), mapping)
 
         if model == "vendor":
-            return self.import_vendors(df, mapping)
+            return self.import_vendors(read_frames(file), mapping)
 
         return Response({"detail": "Modelo no válido"}, status=400)
 
@@ -73,8 +80,7 @@ class AdminImportView(APIView):
     # PRODUCT
     # ====================================================
 
-    @transaction.atomic
-    def import_products(self, df, mapping, user):
+    def validate_product_mapping(self, mapping):
         sku_column = mapping.get("sku")
         if not sku_column or not str(sku_column).strip():
             return Response(
@@ -86,125 +92,63 @@ class AdminImportView(APIView):
                 },
                 status=400
             )
+        return None
 
-        created = 0
-        updated = 0
-        skipped = 0
+    def validate_products(self, frames, mapping):
+        # Sólo lectura: no escribe productos, categorías ni proveedores
+        validator = ProductImportValidator(mapping)
+        for frame in frames:
+            validator.validate_frame(frame)
 
-        for _, row in df.iterrows():
+        report = validator.report()
+        return Response({
+            "detail": (
+                "Validación completada"
+                if report["valid"]
+                else "El archivo tiene valores inválidos"
+            ),
+            **report,
+            "reference_field": "sku",
+            "reference_label": "SKU",
+        })
 
-            def has_mapping(field):
-                column = mapping.get(field)
-                return bool(column and str(column).strip())
-
-            def get_value(field):
-                column = mapping.get(field)
-                if not column:
-                    return None
-
-                column = column.strip()
-
-                # Buscar columna ignorando mayúsculas/minúsculas
-                real_column = next(
-                    (c for c in df.columns if c.strip().lower() == column.lower()),
-                    None
-                )
-
-                if not real_column:
-                    return None
-
-                value = row[real_column]
-                return None if pd.isna(value) else str(value).strip()
-
-            sku = get_value("sku")
-            if not sku:
-                skipped += 1
-                continue
-
-            name = get_value("name")
-
-            # ------------------
-            # Relaciones por NAME
-            # ------------------
-
-            category_name = get_value("category") if has_mapping("category") else None
-            vendor_name = get_value("vendor") if has_mapping("vendor") else None
-
-            category = None
-            if category_name:
-                category, _ = Category.objects.get_or_create(
-                    name=category_name
-                )
-
-            vendor = None
-            if vendor_name:
-                vendor, _ = Vendor.objects.get_or_create(
-                    name=vendor_name
-                )
-
-            product_data = {}
-
-            if has_mapping("name") and name:
-                product_data["name"] = name
-
-            if has_mapping("sku"):
-                product_data["sku"] = sku
-
-            if has_mapping("description"):
-                product_data["description"] = get_value("description") or ""
-
-            if has_mapping("technical_specs"):
-                product_data["technical_specs"] = get_value("technical_specs") or None
-
-            if has_mapping("price"):
-                product_data["price"] = Decimal(get_value("price") or 0)
-
-            if has_mapping("promo_price"):
-                promo_price = get_value("promo_price")
-                product_data["promo_price"] = (
-                    Decimal(promo_price) if promo_price else None
-                )
-
-            if has_mapping("category"):
-                product_data["category"] = category
-
-            if has_mapping("vendor"):
-                product_data["vendor"] = vendor
-
-            product = Product.objects.filter(sku=sku).first()
-
-            if product:
-                for key, value in product_data.items():
-                    setattr(product, key, value)
-                product.save()
-                updated += 1
-            else:
-                if not name:
-                    skipped += 1
-                    continue
-
-                create_data = {
-                    "name": name,
-                    "description": "",
-                    "price": Decimal("0"),
-                    "promo_price": None,
-                    "technical_specs": None,
-                    "category": None,
-                    "vendor": None,
-                    "is_active": True,
-                }
-                create_data.update(product_data)
-                Product.objects.create(
-                    created_by=user,
-                    **create_data
-                )
-                created += 1
+    @transaction.atomic
+    def start_import_job(self, file, model, mapping, user):
+        job = ImportJob.objects.create(
+            user=user,
+            model=model,
+            file=file,
+            filename=file.name,
+            mapping=mapping,
+        )
+        submit_import_job(job)
+
+        return Response(
+            {
+                "detail": "Importación en proceso",
+                "job_id": str(job.id),
+                "status": job.status,
+            },
+            status=202
+        )
+
+    def import_products(self, frames, mapping, user):
+        importer = ProductImporter(mapping, user)
+        try:
+            for frame in frames:
+                # Cada bloque se confirma por separado
+                with transaction.atomic():
+                    importer.import_frame(frame)
+        except ParseError as error:
+            # Los bloques anteriores ya quedaron guardados
+            return Response(
+                {"detail": error.detail, **importer.result()},
+                status=400
+            )
 
         return Response({
             "detail": "Importación completada",
-            "created": created,
-            "updated": updated,
-            "skipped": skipped,
+            **importer.result(),
             "reference_field": "sku",
             "reference_label": "SKU",
         })
@@ -214,50 +158,21 @@ class AdminImportView(APIView):
     # ====================================================
 
     @transaction.atomic
-    def import_categories(self, df, mapping):
-
-        created = 0
-
-        column = mapping.get("name")
-
-        if not column:
+    def import_categories(self, frames, mapping):
+        if not mapping.get("name") and not mapping.get("path"):
             return Response(
-                {"detail": "Debe mapear un campo como 'name'"},
+                {"detail": "Debe mapear un campo como 'name' o 'path'"},
                 status=400
             )
 
-        # Buscar columna real en el archivo
-        real_column = next(
-            (
-                c for c in df.columns
-                if normalize(c) == normalize(column)
-            ),
-            None
-        )
-
-        if not real_column:
-            return Response(
-                {
-                    "detail": f"La columna '{column}' no existe en el archivo. "
-                            f"Columnas disponibles: {list(df.columns)}"
-                },
-                status=400
-            )
-
-        for _, row in df.iterrows():
-            value = row[real_column]
-
-            if pd.isna(value):
-                continue
-
-            Category.objects.get_or_create(
-                name=str(value).strip()
-            )
-            created += 1
+        importer = CategoryImporter(mapping)
+        for frame in frames:
+            importer.add_frame(frame)
+        importer.save()
 
         return Response({
             "detail": "Categorías importadas correctamente",
-            "created": created
+            **importer.result(),
         })
 
     # ====================================================
@@ -265,77 +180,73 @@ class AdminImportView(APIView):
     # ====================================================
 
     @transaction.atomic
-    def import_vendors(self, df, mapping):
+    def import_vendors(self, frames, mapping):
+        if not mapping.get("name"):
+            return Response({"detail": "Debe mapear el campo 'name'"}, status=400)
 
-        created = 0
-        updated = 0
+        importer = VendorImporter(mapping)
+        for frame in frames:
+            importer.import_frame(frame)
 
-        def get_real_column(column_name):
-            return next(
-                (c for c in df.columns if c.strip().lower() == column_name.strip().lower()),
-                None
-            )
+        return Response({
+            "detail": "Proveedores importados correctamente",
+            **importer.result(),
+        })
 
-        name_column = mapping.get("name")
-        if not name_column:
-            return Response({"detail": "Debe mapear el campo 'name'"}, status=400)
 
-        name_column = get_real_column(name_column)
-        if not name_column:
-            return Response({"detail": "Columna name no encontrada"}, status=400)
+# ====================================================
+# IMPORTACIONES EN SEGUNDO PLANO
+# ====================================================
+
+class ImportJobViewSet(ReadOnlyModelViewSet):
+    """
+    Estado de las importaciones en segundo plano.
+    """
+
+    permission_classes = [IsStaff]
+    serializer_class = ImportJobSerializer
+    queryset = ImportJob.objects.order_by("-created_at")
+
+    @action(detail=True, methods=["post"])
+    def resume(self, request, pk=None):
+        job = self.get_object()
 
-        email_column = mapping.get("contact_email")
-        phone_column = mapping.get("phone")
-        active_column = mapping.get("is_active")
+        if not resume_import_job(job):
+            return Response(
+                {"detail": "La importación no se puede reanudar"},
+                status=400
+            )
 
-        email_column = get_real_column(email_column) if email_column else None
-        phone_column = get_real_column(phone_column) if phone_column else None
-        active_column = get_real_column(active_column) if active_column else None
+        job.refresh_from_db()
+        return Response(self.get_serializer(job).data, status=202)
 
-        for _, row in df.iterrows():
 
-            name_value = row[name_column]
-            if pd.isna(name_value):
-                continue
+# ====================================================
+# IMÁGENES DESDE ZIP
+# ====================================================
 
-            name = str(name_value).strip()
+class AdminImageImportView(APIView):
+    """
+    Recibe un ZIP cuyos nombres de archivo indican el SKU
+    (SKU123.jpg, SKU123_2.jpg, SKU123_main.jpg).
+    """
 
-            contact_email = (
-                str(row[email_column]).strip()
-                if email_column and not pd.isna(row[email_column])
-                else None
-            )
+    permission_classes = [IsStaff]
+    parser_classes = [MultiPartParser, FormParser]
 
-            phone = (
-                str(row[phone_column]).strip()
-                if phone_column and not pd.isna(row[phone_column])
-                else None
-            )
+    def post(self, request):
+        file = request.FILES.get("file")
 
-            is_active = True
-            if active_column and not pd.isna(row[active_column]):
-                value = str(row[active_column]).strip().lower()
-                is_active = value in ["1", "true", "si", "sí", "yes"]
-
-            vendor = Vendor.objects.filter(name=name).first()
-
-            if vendor:
-                vendor.contact_email = contact_email
-                vendor.phone = phone
-                vendor.is_active = is_active
-                vendor.save()
-                updated += 1
-            else:
-                Vendor.objects.create(
-                    name=name,
-                    contact_email=contact_email,
-                    phone=phone,
-                    is_active=is_active,
-                )
-                created += 1
+        if not file:
+            return Response({"detail": "Archivo requerido"}, status=400)
+
+        if not file.name.lower().endswith(".zip") or not zipfile.is_zipfile(file):
+            return Response({"detail": "Debe subir un archivo ZIP"}, status=400)
+
+        importer = ProductImageZipImporter(file)
+        importer.run()
 
         return Response({
-            "detail": "Proveedores importados correctamente",
-            "created": created,
-            "updated": updated
+            "detail": "Imágenes importadas",
+            **importer.report(),
         })
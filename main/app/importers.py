@@ -0,0 +1,800 @@
+# app/importers.py
+"""
+Importación masiva desde CSV/XLSX.
+
+Cada importador recibe un DataFrame, resuelve las columnas del mapping
+una sola vez, limpia los valores con operaciones de pandas por columna y
+resuelve las relaciones con pocas consultas ``IN``. La escritura se hace
+con ``bulk_create`` y ``update_rows`` por bloques.
+
+Las operaciones masivas no disparan señales: el índice de búsqueda y las
+versiones de cache se actualizan aquí mismo.
+
+Los archivos se leen por bloques (``read_frames``) para que la memoria
+no crezca con el tamaño del archivo.
+"""
+from collections import defaultdict
+from decimal import Decimal
+from itertools import islice
+
+import numpy as np
+import pandas as pd
+from django.conf import settings
+from django.db import connection
+from django.utils import timezone
+from openpyxl import load_workbook
+from rest_framework.exceptions import ParseError
+
+from .cache_utils import bump_cache_version
+from .models import Category, CategoryClosure, Product, Vendor
+from .search import get_product_search
+from .slugs import allocate_slugs
+from .text_utils import normalize
+
+
+IMPORT_BATCH_SIZE = 1000
+IMPORT_FORMATS = (".csv", ".xlsx")
+
+
+# ======================
+# LECTURA
+# ======================
+def read_frames(file, chunk_size=None):
+    """
+    Lee un CSV o XLSX en DataFrames de hasta ``chunk_size`` filas. El
+    índice sigue la posición de la fila en el archivo entre bloques.
+    """
+    chunk_size = chunk_size or settings.IMPORT_CHUNK_SIZE
+    try:
+        if file.name.endswith(".csv"):
+            yield from csv_frames(file, chunk_size)
+        elif file.name.endswith(".xlsx"):
+            yield from xlsx_frames(file, chunk_size)
+        else:
+            raise ParseError("Formato no soportado. Use CSV o XLSX")
+    except ParseError:
+        raise
+    except Exception as error:
+        raise ParseError(str(error))
+
+
+def csv_frames(file, chunk_size):
+    # Todo como texto: evita que SKUs o teléfonos pasen por float ("222.0")
+    for frame in pd.read_csv(file, chunksize=chunk_size, dtype=str):
+        frame.columns = frame.columns.str.strip()
+        yield frame
+
+
+def xlsx_frames(file, chunk_size):
+    # read_only recorre la hoja sin cargarla completa en memoria
+    workbook = load_workbook(file, read_only=True, data_only=True)
+    try:
+        rows = workbook.active.iter_rows(values_only=True)
+        header = next(rows, None)
+        if header is None:
+            return
+
+        columns = [
+            str(column).strip() if column is not None else f"Unnamed: {index}"
+            for index, column in enumerate(header)
+        ]
+        width = len(columns)
+        numbered = (
+            (position, row)
+            for position, row in enumerate(rows)
+            if any(value is not None for value in row)
+        )
+
+        while True:
+            chunk = list(islice(numbered, chunk_size))
+            if not chunk:
+                break
+            yield pd.DataFrame(
+                [(tuple(row) + (None,) * width)[:width] for _, row in chunk],
+                columns=columns,
+                index=[position for position, _ in chunk],
+            )
+    finally:
+        workbook.close()
+
+
+def in_batches(values, size=IMPORT_BATCH_SIZE):
+    values = list(values)
+    for start in range(0, len(values), size):
+        yield values[start:start + size]
+
+
+def update_rows(model, objs, fields, batch_size=IMPORT_BATCH_SIZE):
+    """
+    UPDATE por fila con una sola sentencia preparada (executemany).
+
+    QuerySet.bulk_update arma un CASE WHEN por campo y por fila, cuyo
+    costo en Python es similar a guardar fila por fila. Igual que
+    bulk_update, no envía señales ni completa campos auto_now.
+    """
+    meta = model._meta
+    fields = [meta.get_field(name) for name in fields]
+    quote = connection.ops.quote_name
+    assignments = ", ".join(f"{quote(field.column)} = %s" for field in fields)
+    sql = (
+        f"UPDATE {quote(meta.db_table)} SET {assignments} "
+        f"WHERE {quote(meta.pk.column)} = %s"
+    )
+
+    with connection.cursor() as cursor:
+        for chunk in in_batches(objs, batch_size):
+            cursor.executemany(sql, [
+                [
+                    field.get_db_prep_save(getattr(obj, field.attname), connection)
+                    for field in fields
+                ] + [meta.pk.get_db_prep_value(obj.pk, connection)]
+                for obj in chunk
+            ])
+
+
+def create_categories(categories, batch_size=IMPORT_BATCH_SIZE):
+    """
+    Crea categorías nuevas de un mismo nivel: slugs asignados en lote, un
+    bulk_create y una consulta para CategoryClosure. Los padres ya deben
+    estar guardados.
+    """
+    slugs = allocate_slugs(Category, [category.name for category in categories])
+    for category, slug in zip(categories, slugs):
+        category.slug = slug
+
+    Category.objects.bulk_create(categories, batch_size=batch_size)
+    CategoryClosure.insert_nodes(categories)
+    return categories
+
+
+def mapped_fields(mapping):
+    return {
+        field for field, column in mapping.items()
+        if column and str(column).strip()
+    }
+
+
+def resolve_columns(columns, mapping):
+    """
+    Campo -> columna real del archivo, sin distinguir mayúsculas. Un
+    campo mapeado a una columna inexistente queda con ``None``.
+    """
+    lookup = {}
+    for column in columns:
+        lookup.setdefault(str(column).strip().lower(), column)
+
+    return {
+        field: lookup.get(str(mapping[field]).strip().lower())
+        for field in mapped_fields(mapping)
+    }
+
+
+def clean_column(df, column):
+    """
+    Valores como texto sin espacios; las celdas vacías quedan en ``None``.
+    """
+    if column is None:
+        return pd.Series(None, index=df.index, dtype=object)
+
+    values = df[column]
+    cleaned = values.astype(str).str.strip().astype(object)
+    return cleaned.where(values.notna(), None)
+
+
+def has_text(values):
+    return values.notna() & values.ne("")
+
+
+def invalid_decimals(values):
+    """
+    Máscara de celdas con texto que no es un número finito.
+    """
+    numeric = pd.to_numeric(values, errors="coerce")
+    return has_text(values) & ~np.isfinite(numeric.astype(float))
+
+
+def row_numbers(mask):
+    # +2: encabezado y filas numeradas desde 1, como en la hoja de cálculo
+    return [int(index) + 2 for index in mask[mask].index]
+
+
+class ProductImporter:
+    """
+    Crea o actualiza productos por SKU.
+
+    Conserva el comportamiento fila a fila: las filas sin SKU se omiten,
+    un SKU nuevo sólo se crea desde la primera fila que trae nombre y las
+    filas repetidas del mismo SKU cuentan como actualizaciones, quedando
+    los valores de la última.
+    """
+
+    fields = (
+        "name", "sku", "description", "technical_specs",
+        "price", "promo_price", "category", "vendor",
+    )
+    decimal_fields = ("price", "promo_price")
+
+    def __init__(self, mapping, user, batch_size=IMPORT_BATCH_SIZE):
+        self.mapping = mapping
+        self.user = user
+        self.batch_size = batch_size
+        self.mapped = mapped_fields(mapping) & set(self.fields)
+
+        self.created = 0
+        self.updated = 0
+        self.skipped = 0
+
+    def result(self):
+        return {
+            "created": self.created,
+            "updated": self.updated,
+            "skipped": self.skipped,
+        }
+
+    # ======================
+    # PREPARACIÓN
+    # ======================
+    def clean(self, df):
+        columns = resolve_columns(df.columns, self.mapping)
+        data = pd.DataFrame(
+            {
+                field: clean_column(df, columns.get(field))
+                for field in self.fields
+            },
+            index=df.index,
+        )
+        return data
+
+    def check_decimals(self, data):
+        for field in self.decimal_fields:
+            if field not in self.mapped:
+                continue
+            invalid = invalid_decimals(data[field])
+            if invalid.any():
+                raise ParseError(
+                    f"Valor numérico inválido en '{field}', "
+                    f"filas: {row_numbers(invalid)[:20]}"
+                )
+
+    def to_decimal(self, field, value):
+        if value:
+            return Decimal(value)
+        return Decimal("0") if field == "price" else None
+
+    # ======================
+    # RELACIONES
+    # ======================
+    def resolve_categories(self, names):
+        categories = {}
+        for chunk in in_batches(names):
+            for category in Category.objects.filter(name__in=chunk):
+                categories.setdefault(category.name, category)
+
+        missing = [
+            Category(name=name)
+            for name in dict.fromkeys(names)
+            if name not in categories
+        ]
+        if missing:
+            create_categories(missing, self.batch_size)
+            categories.update((category.name, category) for category in missing)
+            bump_cache_version("category")
+        return categories
+
+    def resolve_vendors(self, names):
+        vendors = {}
+        for chunk in in_batches(names):
+            for vendor in Vendor.objects.filter(name__in=chunk):
+                vendors.setdefault(vendor.name, vendor)
+
+        missing = [name for name in names if name not in vendors]
+        if missing:
+            created = Vendor.objects.bulk_create(
+                [Vendor(name=name) for name in missing],
+                batch_size=self.batch_size,
+            )
+            vendors.update((vendor.name, vendor) for vendor in created)
+            bump_cache_version("vendor")
+        return vendors
+
+    def fetch_existing(self, skus):
+        existing = {}
+        for chunk in in_batches(skus):
+            existing.update(
+                (product.sku, product)
+                for product in Product.objects
+                .filter(sku__in=chunk)
+                .select_related("vendor")
+            )
+        return existing
+
+    # ======================
+    # IMPORTACIÓN
+    # ======================
+    def plan(self, data, existing_skus):
+        """
+        Conteos equivalentes a procesar el bloque fila por fila. ``data``
+        trae sólo filas con SKU y queda con la columna ``position`` (orden
+        de la fila dentro de su SKU).
+        """
+        data["position"] = data.groupby("sku").cumcount()
+        group_size = data.groupby("sku").size()
+
+        named = data[has_text(data["name"])]
+        first_named = named.groupby("sku")["position"].min()
+
+        is_existing = group_size.index.isin(list(existing_skus))
+        new_size = group_size[~is_existing]
+        new_first = first_named.reindex(new_size.index)
+        creatable = new_first.notna()
+
+        return {
+            "created": int(creatable.sum()),
+            "updated": int(
+                group_size[is_existing].sum()
+                + (new_size[creatable] - new_first[creatable] - 1).sum()
+            ),
+            "skipped": int(new_first[creatable].sum() + new_size[~creatable].sum()),
+            "named": named,
+            "first_named": first_named,
+        }
+
+    def import_frame(self, df):
+        """
+        Importa un bloque. Los conteos se suman recién cuando el bloque
+        terminó de escribirse, para que coincidan con lo confirmado.
+        """
+        data = self.clean(df)
+        self.check_decimals(data)
+
+        with_sku = has_text(data["sku"])
+        skipped = int((~with_sku).sum())
+        data = data[with_sku].copy()
+        if data.empty:
+            self.skipped += skipped
+            return
+
+        existing = self.fetch_existing(data["sku"].unique())
+        plan = self.plan(data, existing)
+        first_named = plan["first_named"]
+        last_name = (
+            plan["named"].drop_duplicates("sku", keep="last").set_index("sku")["name"]
+        )
+        final = data.drop_duplicates("sku", keep="last").set_index("sku")
+
+        categories = {}
+        if "category" in self.mapped:
+            names = data.loc[has_text(data["category"]), "category"].unique()
+            categories = self.resolve_categories(list(names))
+
+        vendors = {}
+        if "vendor" in self.mapped:
+            names = data.loc[has_text(data["vendor"]), "vendor"].unique()
+            vendors = self.resolve_vendors(list(names))
+
+        for field in self.decimal_fields:
+            if field in self.mapped:
+                final[field] = [self.to_decimal(field, value) for value in final[field]]
+
+        to_create = []
+        to_update = []
+        now = timezone.now()
+
+        for sku, row in zip(final.index, final.to_dict("records")):
+            product_data = self.product_data(sku, row, last_name.get(sku), categories, vendors)
+            product = existing.get(sku)
+
+            if product:
+                # Las filas idénticas a lo guardado se cuentan pero no se escriben
+                if self.apply(product, product_data):
+                    product.refresh_effective_price()
+                    product.updated_at = now
+                    to_update.append(product)
+            elif sku in first_named.index:
+                create_data = {
+                    "description": "",
+                    "price": Decimal("0"),
+                    "promo_price": None,
+                    "technical_specs": None,
+                    "category": None,
+                    "vendor": None,
+                    "is_active": True,
+                }
+                create_data.update(product_data)
+                to_create.append(Product(created_by=self.user, **create_data))
+
+        if to_update:
+            update_rows(
+                Product, to_update,
+                [*sorted(self.mapped), "effective_price", "updated_at"],
+                batch_size=self.batch_size,
+            )
+        if to_create:
+            Product.objects.bulk_create(to_create, batch_size=self.batch_size)
+
+        get_product_search().index(to_update + to_create)
+        bump_cache_version("product")
+
+        self.created += plan["created"]
+        self.updated += plan["updated"]
+        self.skipped += skipped + plan["skipped"]
+
+    def apply(self, product, product_data):
+        """
+        Asigna los valores al producto y devuelve si alguno cambió.
+        """
+        changed = False
+        for key, value in product_data.items():
+            field = Product._meta.get_field(key)
+            new_value = value.pk if field.is_relation and value is not None else value
+            if getattr(product, field.attname) != new_value:
+                changed = True
+            setattr(product, key, value)
+        return changed
+
+    def product_data(self, sku, row, name, categories, vendors):
+        product_data = {"sku": sku}
+
+        if "name" in self.mapped and name:
+            product_data["name"] = name
+
+        if "description" in self.mapped:
+            product_data["description"] = row["description"] or ""
+
+        if "technical_specs" in self.mapped:
+            product_data["technical_specs"] = row["technical_specs"] or None
+
+        for field in self.decimal_fields:
+            if field in self.mapped:
+                product_data[field] = row[field]
+
+        if "category" in self.mapped:
+            product_data["category"] = categories.get(row["category"])
+
+        if "vendor" in self.mapped:
+            product_data["vendor"] = vendors.get(row["vendor"])
+
+        return product_data
+
+
+def existing_values(queryset, field, values):
+    found = set()
+    for chunk in in_batches(values):
+        found.update(
+            queryset.filter(**{f"{field}__in": chunk}).values_list(field, flat=True)
+        )
+    return found
+
+
+class ProductImportValidator(ProductImporter):
+    """
+    Simula la importación sin escribir nada (dry_run).
+
+    Devuelve los mismos conteos que daría la importación real y un
+    reporte por fila con tres niveles:
+
+    - ``error``: la importación se rechazaría (valor numérico inválido).
+    - ``skip``: la fila se omitiría (SKU vacío, producto nuevo sin nombre).
+    - ``warning``: la fila se importa, pero conviene revisarla (SKU
+      repetido en el archivo, categoría o proveedor que se creará).
+    """
+
+    max_issues = 1000
+    max_new_names = 100
+
+    def __init__(self, mapping, user=None, batch_size=IMPORT_BATCH_SIZE):
+        super().__init__(mapping, user, batch_size=batch_size)
+        self.rows = 0
+        self.issues = []
+        self.issues_total = {"error": 0, "skip": 0, "warning": 0}
+
+        # SKUs ya vistos en bloques anteriores y los que existirían tras ellos
+        self.seen_skus = set()
+        self.known_skus = set()
+        self.new_categories = set()
+        self.new_vendors = set()
+
+    def add_issues(self, mask, level, field, message, values=None):
+        count = int(mask.sum())
+        if not count:
+            return
+
+        self.issues_total[level] += count
+        room = self.max_issues - len(self.issues)
+        for index in mask[mask].index[:max(room, 0)]:
+            self.issues.append({
+                "row": int(index) + 2,
+                "level": level,
+                "field": field,
+                "message": message,
+                "value": values[index] if values is not None else None,
+            })
+
+    def validate_frame(self, df):
+        self.rows += len(df)
+        data = self.clean(df)
+
+        for field in self.decimal_fields:
+            if field in self.mapped:
+                self.add_issues(
+                    invalid_decimals(data[field]), "error", field,
+                    "Valor numérico inválido", data[field],
+                )
+
+        with_sku = has_text(data["sku"])
+        self.add_issues(~with_sku, "skip", "sku", "SKU vacío: la fila se omite")
+        self.skipped += int((~with_sku).sum())
+
+        data = data[with_sku].copy()
+        if data.empty:
+            return
+
+        skus = data["sku"].unique()
+        self.add_issues(
+            data["sku"].duplicated() | data["sku"].isin(self.seen_skus),
+            "warning", "sku",
+            "SKU repetido en el archivo: actualiza el producto de una fila anterior",
+            data["sku"],
+        )
+        self.seen_skus.update(skus)
+
+        existing = existing_values(Product.objects, "sku", skus) | (
+            self.known_skus & set(skus)
+        )
+        plan = self.plan(data, existing)
+
+        first_named = data["sku"].map(plan["first_named"])
+        unnamed_new = ~data["sku"].isin(existing) & (
+            first_named.isna() | (data["position"] < first_named)
+        )
+        self.add_issues(
+            unnamed_new, "skip", "name",
+            "Producto nuevo sin nombre: la fila se omite", data["sku"],
+        )
+
+        self.known_skus.update(existing)
+        self.known_skus.update(plan["first_named"].index)
+        self.created += plan["created"]
+        self.updated += plan["updated"]
+        self.skipped += plan["skipped"]
+
+        for field, model, new_names, message in (
+            ("category", Category, self.new_categories, "Categoría nueva: se creará"),
+            ("vendor", Vendor, self.new_vendors, "Proveedor nuevo: se creará"),
+        ):
+            if field not in self.mapped:
+                continue
+            names = data.loc[has_text(data[field]), field].unique()
+            missing = set(names) - existing_values(model.objects, "name", names)
+            self.add_issues(
+                data[field].isin(missing), "warning", field, message, data[field],
+            )
+            new_names.update(missing)
+
+    def report(self):
+        return {
+            "dry_run": True,
+            "valid": self.issues_total["error"] == 0,
+            "rows": self.rows,
+            "summary": {
+                **self.result(),
+                "new_categories": sorted(self.new_categories)[:self.max_new_names],
+                "new_categories_total": len(self.new_categories),
+                "new_vendors": sorted(self.new_vendors)[:self.max_new_names],
+                "new_vendors_total": len(self.new_vendors),
+            },
+            "issues_total": self.issues_total,
+            "issues": self.issues,
+        }
+
+
+class CategoryImporter:
+    """
+    Importa categorías con jerarquía.
+
+    Cada fila trae una ruta en ``path`` ("Laboratorio > Vidrio >
+    Matraces") o un ``name`` con su ``parent`` (que también puede ser una
+    ruta). El árbol se arma en memoria y las categorías faltantes se crean
+    nivel por nivel con bulk_create, slugs asignados en lote y una
+    consulta por nivel para CategoryClosure.
+
+    Los nombres se comparan con ``normalize`` (sin mayúsculas ni tildes).
+    El primer tramo de una ruta busca primero una categoría raíz y, si no
+    existe, cualquier categoría con ese nombre.
+    """
+
+    separator = ">"
+
+    def __init__(self, mapping, batch_size=IMPORT_BATCH_SIZE):
+        self.mapping = mapping
+        self.batch_size = batch_size
+        self.mapped = mapped_fields(mapping) & {"path", "name", "parent"}
+
+        # Ruta (tupla de nombres) -> None: conserva el orden sin repetir
+        self.paths = {}
+        self.created = 0
+        self.existing = 0
+        self.skipped = 0
+
+    def result(self):
+        return {
+            "created": self.created,
+            "existing": self.existing,
+            "skipped": self.skipped,
+        }
+
+    def add_frame(self, df):
+        columns = resolve_columns(df.columns, self.mapping)
+        for field in self.mapped:
+            if columns[field] is None:
+                raise ParseError(
+                    f"La columna '{self.mapping[field]}' no existe en el archivo. "
+                    f"Columnas disponibles: {list(df.columns)}"
+                )
+
+        if "path" in self.mapped:
+            values = clean_column(df, columns["path"])
+        else:
+            values = clean_column(df, columns["name"])
+            if "parent" in self.mapped:
+                parents = clean_column(df, columns["parent"])
+                with_parent = has_text(parents) & has_text(values)
+                values = values.where(
+                    ~with_parent,
+                    parents.fillna("") + f" {self.separator} " + values.fillna(""),
+                )
+
+        present = has_text(values)
+        self.skipped += int((~present).sum())
+
+        for value in values[present].unique():
+            path = tuple(
+                name.strip() for name in value.split(self.separator) if name.strip()
+            )
+            if path:
+                self.paths.setdefault(path, None)
+            else:
+                self.skipped += int((values == value).sum())
+
+    def save(self):
+        by_parent = {}
+        by_name = {}
+        for category in Category.objects.only("id", "name", "parent_id"):
+            key = normalize(category.name)
+            by_parent.setdefault((category.parent_id, key), category)
+            if key not in by_name or (
+                category.parent_id is None and by_name[key].parent_id is not None
+            ):
+                by_name[key] = category
+
+        # Profundidad -> {ruta normalizada: nombre a mostrar}
+        levels = defaultdict(dict)
+        for path in self.paths:
+            keys = tuple(normalize(name) for name in path)
+            for depth, name in enumerate(path):
+                levels[depth].setdefault(keys[:depth + 1], name)
+
+        nodes = {}
+        for depth in sorted(levels):
+            missing = []
+            for key, name in levels[depth].items():
+                parent = nodes[key[:-1]] if depth else None
+                if parent is None:
+                    category = by_parent.get((None, key[0])) or by_name.get(key[0])
+                else:
+                    category = by_parent.get((parent.id, key[-1]))
+
+                if category:
+                    nodes[key] = category
+                    self.existing += 1
+                else:
+                    missing.append((key, Category(name=name, parent=parent)))
+
+            if not missing:
+                continue
+
+            categories = create_categories(
+                [category for _, category in missing], self.batch_size
+            )
+
+            nodes.update(missing)
+            self.created += len(categories)
+
+        if self.created:
+            bump_cache_version("category")
+
+
+class VendorImporter:
+    """
+    Crea o actualiza proveedores por nombre.
+
+    Los proveedores existentes se cargan una vez en un mapa por nombre
+    normalizado (sin mayúsculas ni tildes). Si un nombre se repite en el
+    archivo quedan los valores de su última fila. Sólo se actualizan los
+    campos mapeados y los proveedores sin cambios no se escriben. Los
+    conteos son por proveedor.
+    """
+
+    active_values = ["1", "true", "si", "sí", "yes"]
+
+    def __init__(self, mapping, batch_size=IMPORT_BATCH_SIZE):
+        self.mapping = mapping
+        self.batch_size = batch_size
+        # Campos que el archivo actualiza en los proveedores existentes
+        self.fields = [
+            field for field in ("contact_email", "phone", "is_active")
+            if field in mapped_fields(mapping)
+        ]
+        # Con nombres repetidos en BD gana el más antiguo (el último del orden)
+        self.vendors = {
+            normalize(vendor.name): vendor
+            for vendor in Vendor.objects.order_by("-id").only(
+                "id", "name", "contact_email", "phone", "is_active"
+            )
+        }
+
+        self.created = 0
+        self.updated = 0
+        self.unchanged = 0
+        self.skipped = 0
+
+    def result(self):
+        return {
+            "created": self.created,
+            "updated": self.updated,
+            "unchanged": self.unchanged,
+            "skipped": self.skipped,
+        }
+
+    def import_frame(self, df):
+        columns = resolve_columns(df.columns, self.mapping)
+        if columns.get("name") is None:
+            raise ParseError("Columna name no encontrada")
+
+        data = pd.DataFrame(
+            {
+                field: clean_column(df, columns.get(field))
+                for field in ("name", "contact_email", "phone", "is_active")
+            },
+            index=df.index,
+        )
+
+        present = has_text(data["name"])
+        self.skipped += int((~present).sum())
+        data = data[present].copy()
+
+        data["key"] = [normalize(name) for name in data["name"]]
+        data["contact_email"] = data["contact_email"].fillna("")
+        data["phone"] = data["phone"].fillna("")
+        active = data["is_active"]
+        data["is_active"] = ~has_text(active) | active.str.lower().isin(self.active_values)
+
+        to_create = []
+        to_update = []
+
+        for row in data.drop_duplicates("key", keep="last").to_dict("records"):
+            vendor = self.vendors.get(row["key"])
+            values = {field: row[field] for field in self.fields}
+            if "is_active" in values:
+                values["is_active"] = bool(values["is_active"])
+
+            if vendor is None:
+                vendor = Vendor(name=row["name"], **values)
+                self.vendors[row["key"]] = vendor
+                to_create.append(vendor)
+            elif any(getattr(vendor, field) != value for field, value in values.items()):
+                for field, value in values.items():
+                    setattr(vendor, field, value)
+                to_update.append(vendor)
+            else:
+                self.unchanged += 1
+
+        if to_create:
+            Vendor.objects.bulk_create(to_create, batch_size=self.batch_size)
+        if to_update:
+            Vendor.objects.bulk_update(to_update, self.fields, batch_size=self.batch_size)
+        if to_create or to_update:
+            bump_cache_version("vendor")
+
+        self.created += len(to_create)
+        self.updated += len(to_update)
@@ -1,14 +1,19 @@
+import time
 from datetime import timedelta
 
 from django.core.management.base import BaseCommand
 from django.db import transaction
+from django.db.models import Exists, OuterRef, Q
 from django.utils import timezone
 
-from app.models import Cart
+from app.models import Cart, CartItem
 
 
 class Command(BaseCommand):
-    help = "Elimina carritos invitados sin actividad durante el periodo indicado."
+    help = (
+        "Elimina carritos invitados guardados en la base de datos "
+        "(GUEST_CART_BACKEND=database) sin actividad durante el periodo indicado."
+    )
 
     def add_arguments(self, parser):
         parser.add_argument(
@@ -22,24 +27,70 @@ class Command(BaseCommand):
             action="store_true",
             help="Muestra cuantos carritos se eliminarian sin borrarlos.",
         )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=1000,
+            help="Carritos eliminados por transaccion.",
+        )
+        parser.add_argument(
+            "--max-runtime",
+            type=float,
+            default=None,
+            help="Segundos maximos de ejecucion; el resto queda para la siguiente corrida.",
+        )
 
-    def handle(self, *args, **options):
-        days = options["days"]
-        cutoff = timezone.now() - timedelta(days=days)
+    def stale_carts(self, cutoff):
+        # Usa el indice parcial de carritos invitados por updated_at
+        recent_items = CartItem.objects.filter(
+            cart=OuterRef("pk"), updated_at__gt=cutoff
+        )
+        return Cart.objects.filter(
+            user__isnull=True,
+            updated_at__lte=cutoff,
+            created_at__lte=cutoff,
+        ).exclude(Exists(recent_items))
 
-        queryset = (
-            Cart.objects.filter(
-                user__isnull=True,
-                created_at__lte=cutoff,
-                updated_at__lte=cutoff,
+    def delete_batch(self, queryset, last_key, batch_size):
+        """
+        Borra el siguiente bloque en su propia transaccion. Recorre por
+        (updated_at, id), el orden del indice parcial, para que cada bloque
+        continue el rango anterior en vez de volver a leerlo desde el
+        inicio. Devuelve (ultima clave, carritos, items).
+        """
+        batch = queryset.order_by("updated_at", "id")
+        if last_key is not None:
+            last_updated_at, last_id = last_key
+            batch = batch.filter(
+                Q(updated_at__gt=last_updated_at)
+                | Q(updated_at=last_updated_at, id__gt=last_id)
             )
-            .exclude(cartitem__updated_at__gt=cutoff)
-            .distinct()
-        )
 
-        count = queryset.count()
+        with transaction.atomic():
+            # skip_locked: los carritos que otra conexion esta usando se
+            # saltan en esta corrida
+            rows = list(
+                batch.select_for_update(skip_locked=True)
+                .values_list("id", "updated_at")[:batch_size]
+            )
+            if not rows:
+                return None, 0, 0
+
+            ids = [cart_id for cart_id, _ in rows]
+            _, deleted = Cart.objects.filter(id__in=ids).delete()
+            carts = deleted.get(Cart._meta.label, 0)
+            items = deleted.get(CartItem._meta.label, 0)
+
+        last_id, last_updated_at = rows[-1]
+        return (last_updated_at, last_id), carts, items
+
+    def handle(self, *args, **options):
+        days = options["days"]
+        cutoff = timezone.now() - timedelta(days=days)
+        queryset = self.stale_carts(cutoff)
 
         if options["dry_run"]:
+            count = queryset.count()
             self.stdout.write(
                 self.style.WARNING(
                     f"{count} carrito(s) invitado(s) serian eliminados."
@@ -47,11 +98,37 @@ class Command(BaseCommand):
             )
             return
 
-        with transaction.atomic():
-            for cart in queryset.prefetch_related("cartitem_set"):
-                cart.cartitem_set.all().delete()
-                cart.delete()
+        batch_size = max(1, options["batch_size"])
+        max_runtime = options["max_runtime"]
+
+        started = time.monotonic()
+        last_key = None
+        carts = items = 0
+        finished = False
+
+        while max_runtime is None or time.monotonic() - started < max_runtime:
+            last_key, batch_carts, batch_items = self.delete_batch(
+                queryset, last_key, batch_size
+            )
+            if last_key is None:
+                finished = True
+                break
+            carts += batch_carts
+            items += batch_items
 
+        elapsed = time.monotonic() - started
+        rate = (carts + items) / elapsed if elapsed else 0
+
+        self.stdout.write(
+            self.style.SUCCESS(f"{carts} carrito(s) invitado(s) eliminados.")
+        )
         self.stdout.write(
-            self.style.SUCCESS(f"{count} carrito(s) invitado(s) eliminados.")
+            f"{items} item(s) eliminados en {elapsed:.2f} s "
+            f"({rate:.0f} filas/s)."
         )
+        if not finished:
+            self.stdout.write(
+                self.style.WARNING(
+                    "Se alcanzo --max-runtime; quedan carritos por eliminar."
+                )
+            )
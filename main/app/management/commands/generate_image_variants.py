@@ -0,0 +1,102 @@
+from itertools import groupby
+
+from django.core.management.base import BaseCommand
+
+from app.cache_utils import bump_cache_version
+from app.image_variants import VARIANT_FIELDS, delete_unshared_variants, render_variants
+from app.models import Banner, ProductImage, Vendor
+
+
+MODELS = {
+    "productimage": ProductImage,
+    "banner": Banner,
+    "vendor": Vendor,
+}
+
+# Versiones de cache que usan las imágenes de cada modelo
+CACHE_VERSIONS = {
+    "productimage": ("productimage", "product"),
+    "banner": ("banner",),
+    "vendor": ("vendor",),
+}
+
+
+class Command(BaseCommand):
+    help = (
+        "Genera las variantes WebP/JPEG de imágenes subidas antes de tenerlas. "
+        "Las filas que comparten archivo (imágenes deduplicadas) se procesan "
+        "una sola vez y las variantes reemplazadas se borran."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--model",
+            choices=sorted(MODELS),
+            action="append",
+            help="Limita el proceso a un modelo (se puede repetir).",
+        )
+        parser.add_argument(
+            "--force",
+            action="store_true",
+            help="Regenera también las variantes existentes.",
+        )
+
+    def sync_group(self, model, name, instances, force):
+        """
+        Actualiza las filas que usan el archivo ``name``. Devuelve cuántas
+        cambiaron.
+        """
+        image_field, variants_field = VARIANT_FIELDS[model._meta.model_name]
+        stale = [
+            instance for instance in instances
+            if force or (getattr(instance, variants_field) or {}).get("source", "") != name
+        ]
+        if not stale:
+            return 0
+
+        # Sin --force, las filas al día del grupo ya tienen las variantes
+        current = None if force else next(
+            (
+                getattr(instance, variants_field) for instance in instances
+                if instance not in stale
+            ),
+            None,
+        )
+        variants = current or render_variants(getattr(stale[0], image_field))
+
+        stale_ids = [instance.pk for instance in stale]
+        model.objects.filter(pk__in=stale_ids).update(**{variants_field: variants})
+
+        replaced = {}
+        for instance in stale:
+            previous = getattr(instance, variants_field) or {}
+            replaced.setdefault(repr(previous), previous)
+        for previous in replaced.values():
+            delete_unshared_variants(stale[0], previous, exclude=stale_ids)
+
+        return len(stale)
+
+    def handle(self, *args, **options):
+        for key in options["model"] or sorted(MODELS):
+            model = MODELS[key]
+            image_field, _ = VARIANT_FIELDS[key]
+
+            queryset = model.objects.exclude(**{image_field: ""}).exclude(
+                **{f"{image_field}__isnull": True}
+            ).order_by(image_field, "pk")
+            groups = groupby(
+                queryset.iterator(chunk_size=200),
+                key=lambda instance: getattr(instance, image_field).name,
+            )
+            updated = sum(
+                self.sync_group(model, name, list(instances), options["force"])
+                for name, instances in groups
+            )
+
+            if updated:
+                # .update() no dispara signals: se invalida la cache aquí
+                bump_cache_version(*CACHE_VERSIONS[key])
+
+            self.stdout.write(
+                self.style.SUCCESS(f"{key}: {updated} imagen(es) procesada(s).")
+            )
@@ -0,0 +1,110 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Count
+
+from app.image_dedup import blob_size, hash_file
+from app.models import ProductImage
+
+
+def format_bytes(value):
+    value = float(value)
+    for unit in ("B", "KB", "MB"):
+        if value < 1024:
+            return f"{value:.1f} {unit}"
+        value /= 1024
+    return f"{value:.1f} GB"
+
+
+class Command(BaseCommand):
+    help = "Reporta el espacio ahorrado por la deduplicación de imágenes de producto."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--backfill",
+            action="store_true",
+            help="Calcula antes el hash de las imágenes subidas sin él.",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=200,
+            help="Filas por lote al calcular hashes.",
+        )
+
+    def backfill(self, batch_size):
+        storage = ProductImage._meta.get_field("image").storage
+        pending = ProductImage.objects.filter(content_hash="").exclude(image="")
+
+        hashed = 0
+        batch = []
+        for image in pending.only("id", "image").iterator(chunk_size=batch_size):
+            try:
+                with storage.open(image.image.name, "rb") as file:
+                    image.content_hash = hash_file(file)
+            except OSError:
+                continue
+            batch.append(image)
+
+            if len(batch) >= batch_size:
+                ProductImage.objects.bulk_update(batch, ["content_hash"])
+                hashed += len(batch)
+                batch = []
+
+        if batch:
+            ProductImage.objects.bulk_update(batch, ["content_hash"])
+            hashed += len(batch)
+        return hashed
+
+    def handle(self, *args, **options):
+        if options["backfill"]:
+            hashed = self.backfill(options["batch_size"])
+            self.stdout.write(f"Hashes calculados: {hashed}")
+
+        storage = ProductImage._meta.get_field("image").storage
+        images = ProductImage.objects.exclude(image="")
+
+        total = images.count()
+        files = images.values("image").distinct().count()
+        unhashed = images.filter(content_hash="").count()
+
+        # Filas que reutilizan un archivo ya guardado
+        saved = 0
+        shared = (
+            images.values("image")
+            .annotate(refs=Count("id"))
+            .filter(refs__gt=1)
+        )
+        for row in shared.iterator():
+            variants = images.filter(image=row["image"]).values_list("variants", flat=True).first()
+            saved += blob_size(storage, row["image"], variants) * (row["refs"] - 1)
+
+        # Archivos con el mismo contenido subidos antes de deduplicar
+        reclaimable = 0
+        duplicated = 0
+        groups = (
+            images.exclude(content_hash="")
+            .values("content_hash")
+            .annotate(files=Count("image", distinct=True))
+            .filter(files__gt=1)
+        )
+        for group in groups.iterator():
+            name, variants = (
+                images.filter(content_hash=group["content_hash"])
+                .values_list("image", "variants")
+                .first()
+            )
+            duplicated += group["files"] - 1
+            reclaimable += blob_size(storage, name, variants) * (group["files"] - 1)
+
+        self.stdout.write(f"Imágenes: {total}")
+        self.stdout.write(f"Archivos guardados: {files}")
+        self.stdout.write(f"Filas que reutilizan un archivo: {total - files}")
+        self.stdout.write(self.style.SUCCESS(f"Espacio ahorrado: {format_bytes(saved)}"))
+        if duplicated:
+            self.stdout.write(self.style.WARNING(
+                f"Copias duplicadas anteriores a la deduplicación: {duplicated} "
+                f"({format_bytes(reclaimable)} recuperables)"
+            ))
+        if unhashed:
+            self.stdout.write(self.style.WARNING(
+                f"{unhashed} imagen(es) sin hash; ejecute con --backfill."
+            ))
@@ -0,0 +1,35 @@
+from django.db import migrations
+
+
+def create_search_index(apps, schema_editor):
+    from app.search import get_product_search
+
+    Product = apps.get_model("app", "Product")
+    backend = get_product_search()
+    backend.create_index()
+
+    products = Product.objects.select_related("vendor").order_by("pk")
+    batch = []
+    for product in products.iterator(chunk_size=1000):
+        batch.append(product)
+        if len(batch) == 1000:
+            backend.index(batch)
+            batch = []
+    backend.index(batch)
+
+
+def drop_search_index(apps, schema_editor):
+    from app.search import get_product_search
+
+    get_product_search().drop_index()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("app", "0017_cart_updated_at_cartitem_updated_at"),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 5.2.18 on 2026-10-18 16:25
+
+from django.db import migrations, models
+from django.db.models.functions import Coalesce, NullIf
+
+
+def fill_effective_price(apps, schema_editor):
+    Product = apps.get_model("app", "Product")
+    Product.objects.update(
+        effective_price=Coalesce(
+            NullIf(models.F("promo_price"), models.Value(0)),
+            models.F("price"),
+        )
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0020_categoryclosure'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='effective_price',
+            field=models.DecimalField(decimal_places=2, default=0, editable=False, max_digits=10),
+        ),
+        migrations.RunPython(fill_effective_price, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['is_active', 'effective_price'], name='product_effective_price_idx'),
+        ),
+    ]
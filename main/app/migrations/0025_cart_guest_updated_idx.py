@@ -0,0 +1,17 @@
+# Generated by Django 5.2.18 on 2026-10-18 16:54
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0024_productimage_content_hash'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='cart',
+            index=models.Index(condition=models.Q(('user__isnull', True)), fields=['updated_at', 'id'], name='cart_guest_updated_idx'),
+        ),
+    ]
@@ -1,9 +1,20 @@
 # core/models.py
 import uuid
-from django.db import models
+from collections import defaultdict
+from decimal import Decimal
+
+from django.core.exceptions import ValidationError
+from django.db import models, transaction
+from django.db.models import DEFERRED
+from django.db.models.functions import Coalesce, NullIf
 from django.contrib.auth.models import AbstractUser
+from django.core.files.storage import storages
 from django.utils import timezone
-from django.utils.text import slugify
+from django.utils.functional import LazyObject
+
+from .image_dedup import hash_file, stored_images
+from .image_variants import delete_unshared_variants
+from .slugs import allocate_slugs, save_with_unique_slug
 
 class User(AbstractUser):
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
@@ -62,35 +73,203 @@ class Category(models.Model):
     class Meta:
         ordering = ["name"]
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Padre guardado en BD, para detectar movimientos en save()
+        instance._saved_parent_id = instance.__dict__.get("parent_id", DEFERRED)
+        return instance
+
     def save(self, *args, **kwargs):
-        if not self.slug:
-            base_slug = slugify(self.name)
-            slug = base_slug
-            counter = 1
+        save_with_unique_slug(
+            self, self.name, lambda: self._save_with_closure(*args, **kwargs)
+        )
 
-            while Category.objects.filter(slug=slug).exists():
-                slug = f"{base_slug}-{counter}"
-                counter += 1
+    def _save_with_closure(self, *args, **kwargs):
+        is_new = self._state.adding
 
-            self.slug = slug
+        with transaction.atomic():
+            super().save(*args, **kwargs)
 
-        super().save(*args, **kwargs)
+            saved_parent_id = getattr(self, "_saved_parent_id", DEFERRED)
+            if is_new:
+                CategoryClosure.insert_node(self)
+            elif (
+                saved_parent_id is not DEFERRED
+                and self.parent_id != saved_parent_id
+            ):
+                CategoryClosure.move_subtree(self)
+
+        self._saved_parent_id = self.parent_id
 
     def __str__(self):
         return self.name
 
+
+class CategoryClosure(models.Model):
+    """
+    Tabla de clausura de Category: una fila por cada par
+    ancestro/descendiente, incluida la propia categoría (depth 0).
+    Permite filtrar un subárbol completo con un solo subquery indexado.
+    """
+    ancestor = models.ForeignKey(
+        Category,
+        related_name="descendant_links",
+        on_delete=models.CASCADE
+    )
+    descendant = models.ForeignKey(
+        Category,
+        related_name="ancestor_links",
+        on_delete=models.CASCADE
+    )
+    depth = models.PositiveIntegerField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["ancestor", "descendant"],
+                name="category_closure_unique",
+            ),
+        ]
+
+    @classmethod
+    def subtree_ids(cls, category_id):
+        return cls.objects.filter(ancestor_id=category_id).values("descendant_id")
+
+    @classmethod
+    def insert_node(cls, category):
+        cls.insert_nodes([category])
+
+    @classmethod
+    def insert_nodes(cls, categories):
+        """
+        Vínculos de varias categorías nuevas con una consulta. Los padres
+        ya deben tener sus propios vínculos (creación nivel por nivel).
+        """
+        parent_ids = {category.parent_id for category in categories if category.parent_id}
+        ancestors = defaultdict(list)
+
+        for ancestor_id, descendant_id, depth in cls.objects.filter(
+            descendant_id__in=parent_ids
+        ).values_list("ancestor_id", "descendant_id", "depth"):
+            ancestors[descendant_id].append((ancestor_id, depth))
+
+        links = []
+        for category in categories:
+            links.append(cls(ancestor=category, descendant=category, depth=0))
+            links += [
+                cls(ancestor_id=ancestor_id, descendant=category, depth=depth + 1)
+                for ancestor_id, depth in ancestors.get(category.parent_id, [])
+            ]
+
+        cls.objects.bulk_create(links, batch_size=1000)
+
+    @classmethod
+    def move_subtree(cls, category):
+        subtree = list(
+            cls.objects.filter(ancestor=category).values_list("descendant_id", "depth")
+        )
+        subtree_ids = [descendant_id for descendant_id, _ in subtree]
+
+        if category.parent_id in subtree_ids:
+            raise ValidationError(
+                "Una categoría no puede ser subcategoría de sí misma."
+            )
+
+        # Se cortan los vínculos con los ancestros anteriores
+        cls.objects.filter(descendant_id__in=subtree_ids).exclude(
+            ancestor_id__in=subtree_ids
+        ).delete()
+
+        if not category.parent_id:
+            return
+
+        new_ancestors = cls.objects.filter(
+            descendant_id=category.parent_id
+        ).values_list("ancestor_id", "depth")
+
+        cls.objects.bulk_create([
+            cls(
+                ancestor_id=ancestor_id,
+                descendant_id=descendant_id,
+                depth=ancestor_depth + depth + 1,
+            )
+            for ancestor_id, ancestor_depth in new_ancestors
+            for descendant_id, depth in subtree
+        ], batch_size=1000)
+
 class Vendor(models.Model):
     name = models.CharField(max_length=255)
     contact_email = models.EmailField(blank=True)
     phone = models.CharField(max_length=50, blank=True)
 
     logo = models.ImageField(upload_to="vendors/", blank=True, null=True)
+    # Variantes redimensionadas del logo (ver app/image_variants.py)
+    logo_variants = models.JSONField(default=dict, blank=True, editable=False)
 
     is_active = models.BooleanField(default=True)
 
     def __str__(self):
         return self.name
     
+def effective_price_expression(price, promo_price):
+    """
+    Precio de venta en SQL: promo_price si existe y no es 0, si no price.
+    Acepta valores o expresiones (ej. F("price")).
+    """
+    output_field = models.DecimalField(max_digits=10, decimal_places=2)
+
+    def as_expression(value):
+        if hasattr(value, "resolve_expression"):
+            return value
+        return models.Value(value, output_field=output_field)
+
+    return Coalesce(
+        NullIf(as_expression(promo_price), models.Value(0, output_field=output_field)),
+        as_expression(price),
+        output_field=output_field,
+    )
+
+
+class ProductQuerySet(models.QuerySet):
+    """
+    Mantiene effective_price en las operaciones masivas, que no pasan
+    por Product.save().
+    """
+
+    PRICE_FIELDS = {"price", "promo_price"}
+
+    def update(self, **kwargs):
+        if self.PRICE_FIELDS & set(kwargs) and "effective_price" not in kwargs:
+            kwargs["effective_price"] = effective_price_expression(
+                kwargs.get("price", models.F("price")),
+                kwargs.get("promo_price", models.F("promo_price")),
+            )
+        return super().update(**kwargs)
+
+    def bulk_create(self, objs, *args, **kwargs):
+        objs = list(objs)
+        for obj in objs:
+            obj.refresh_effective_price()
+
+        # bulk_create no pasa por save(): los slugs faltantes se asignan en lote
+        missing_slug = [obj for obj in objs if not obj.slug]
+        slugs = allocate_slugs(self.model, [obj.name for obj in missing_slug])
+        for obj, slug in zip(missing_slug, slugs):
+            obj.slug = slug
+        return super().bulk_create(objs, *args, **kwargs)
+
+    def bulk_update(self, objs, fields, *args, **kwargs):
+        objs = list(objs)
+        fields = list(fields)
+        if self.PRICE_FIELDS & set(fields):
+            for obj in objs:
+                obj.refresh_effective_price()
+            if "effective_price" not in fields:
+                fields.append("effective_price")
+        return super().bulk_update(objs, fields, *args, **kwargs)
+
+
 class Product(models.Model):
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
 
@@ -106,6 +285,10 @@ class Product(models.Model):
 
     price = models.DecimalField(max_digits=10, decimal_places=2)
     promo_price = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
+    # promo_price or price, guardado para filtrar y ordenar por índice
+    effective_price = models.DecimalField(
+        max_digits=10, decimal_places=2, default=0, editable=False
+    )
 
     is_featured = models.BooleanField(default=False)
     is_active = models.BooleanField(default=True)
@@ -115,17 +298,40 @@ class Product(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = ProductQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            # Orden del catálogo público y su paginación por cursor
+            models.Index(
+                fields=["is_active", "-created_at", "-id"],
+                name="product_catalog_order_idx",
+            ),
+            # Filtro por rango de precio y orden por precio
+            models.Index(
+                fields=["is_active", "effective_price"],
+                name="product_effective_price_idx",
+            ),
+        ]
+
+    def refresh_effective_price(self):
+        promo_price = (
+            Decimal(str(self.promo_price))
+            if self.promo_price not in (None, "")
+            else None
+        )
+        self.effective_price = promo_price or self.price
+
     def save(self, *args, **kwargs):
+        self.refresh_effective_price()
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None and {"price", "promo_price"} & set(update_fields):
+            kwargs["update_fields"] = {*update_fields, "effective_price"}
+
         self.sku = self.sku.strip() if self.sku else None
-        if not self.slug:
-            base_slug = slugify(self.name)
-            slug = base_slug
-            counter = 1
-            while Product.objects.filter(slug=slug).exists():
-                slug = f"{base_slug}-{counter}"
-                counter += 1
-            self.slug = slug
-        super().save(*args, **kwargs)
+        save_with_unique_slug(
+            self, self.name, lambda: super(Product, self).save(*args, **kwargs)
+        )
 
 class ProductPriceHistory(models.Model):
     product = models.ForeignKey(Product, on_delete=models.CASCADE)
@@ -135,9 +341,25 @@ class ProductPriceHistory(models.Model):
 class ProductImage(models.Model):
     product = models.ForeignKey(Product, on_delete=models.CASCADE)
     image = models.ImageField(upload_to="products/")
+    variants = models.JSONField(default=dict, blank=True, editable=False)
+    # SHA-256 del archivo: si los bytes ya están guardados se reutilizan
+    content_hash = models.CharField(max_length=64, blank=True, db_index=True, editable=False)
     is_main = models.BooleanField(default=False)
 
     def save(self, *args, **kwargs):
+        replaced = None
+        if self.image and not self.image._committed:
+            self.content_hash = hash_file(self.image)
+            stored = stored_images(ProductImage.objects.all(), [self.content_hash])
+            if self.content_hash in stored:
+                # Mismo archivo y mismas variantes; no se vuelve a subir
+                previous = self.variants
+                self.image, self.variants = stored[self.content_hash]
+                # post_save no regenera (la fuente coincide): las variantes
+                # del archivo anterior se liberan aquí
+                if (previous or {}).get("source") not in (None, self.image.name):
+                    replaced = previous
+
         if self.is_main:
             ProductImage.objects.filter(
                 product=self.product,
@@ -146,6 +368,9 @@ class ProductImage(models.Model):
 
         super().save(*args, **kwargs)
 
+        if replaced:
+            transaction.on_commit(lambda: delete_unshared_variants(self, replaced))
+
 class Cart(models.Model):
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     user = models.ForeignKey(User, null=True, blank=True, on_delete=models.CASCADE)
@@ -153,6 +378,17 @@ class Cart(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            # Limpieza de carritos invitados inactivos (cleanup_guest_carts
+            # recorre por updated_at, id)
+            models.Index(
+                fields=["updated_at", "id"],
+                condition=models.Q(user__isnull=True),
+                name="cart_guest_updated_idx",
+            ),
+        ]
+
 class CartItem(models.Model):
     cart = models.ForeignKey(Cart, on_delete=models.CASCADE)
     product = models.ForeignKey(Product, on_delete=models.PROTECT)
@@ -221,6 +457,7 @@ class Banner(models.Model):
         help_text="Frase llamativa del banner"
     )
     image = models.ImageField(upload_to="banners/")
+    variants = models.JSONField(default=dict, blank=True, editable=False)
     link = models.URLField(blank=True)  
     start_date = models.DateField()
     end_date = models.DateField()
@@ -238,3 +475,60 @@ class EventLog(models.Model):
     metadata = models.JSONField(blank=True, null=True)
     created_at = models.DateTimeField(auto_now_add=True)
 
+
+class ImportJobStorage(LazyObject):
+    """
+    Como ``default_storage``, pero delega en ``storages["imports"]`` en cada
+    uso: FileField evalúa el callable de ``storage`` una sola vez, al definir
+    el modelo, y así los cambios de STORAGES (override_settings) se respetan.
+    """
+
+    def _setup(self):
+        self._wrapped = storages["imports"]
+
+    def __getattr__(self, name):
+        return getattr(storages["imports"], name)
+
+
+def import_job_storage():
+    return ImportJobStorage()
+
+
+class ImportJob(models.Model):
+    """
+    Importación ejecutada en segundo plano. Guarda el avance por bloque
+    (chunks_done) junto con los datos del bloque, para poder reanudar
+    desde el último bloque confirmado si el trabajo falla.
+    """
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user = models.ForeignKey(User, null=True, blank=True, on_delete=models.SET_NULL)
+
+    class Status(models.TextChoices):
+        PENDING = "PENDING", "Pendiente"
+        RUNNING = "RUNNING", "En proceso"
+        COMPLETED = "COMPLETED", "Completado"
+        FAILED = "FAILED", "Fallido"
+
+    model = models.CharField(max_length=20)
+    # Se borra al completar; se conserva si falla para poder reanudar
+    file = models.FileField(upload_to="jobs/", storage=import_job_storage, blank=True)
+    filename = models.CharField(max_length=255)
+    mapping = models.JSONField(default=dict)
+
+    status = models.CharField(
+        max_length=20,
+        choices=Status.choices,
+        default=Status.PENDING
+    )
+    error = models.TextField(blank=True)
+
+    chunks_done = models.PositiveIntegerField(default=0)
+    rows_processed = models.PositiveIntegerField(default=0)
+    created = models.PositiveIntegerField(default=0)
+    updated = models.PositiveIntegerField(default=0)
+    skipped = models.PositiveIntegerField(default=0)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
@@ -0,0 +1,100 @@
+# app/pagination.py
+import base64
+import uuid
+from datetime import datetime
+
+from django.core.paginator import Paginator
+from django.db.models import Q
+from django.utils.functional import cached_property
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+from .cache_utils import cached_count
+
+
+# El filtro ?category= resuelve el subárbol con CategoryClosure: mover una
+# categoría cambia el conteo sin tocar los productos
+COUNT_VERSIONS = ("product", "category")
+
+
+class CachedCountPaginator(Paginator):
+    @cached_property
+    def count(self):
+        return cached_count(self.object_list, *COUNT_VERSIONS)
+
+
+class PublicProductPagination(PageNumberPagination):
+    page_size = 12
+    django_paginator_class = CachedCountPaginator
+
+
+class PublicProductCursorPagination(BasePagination):
+    """
+    Paginación por cursor (keyset) sobre (created_at, id), para scroll
+    infinito: cada página filtra desde el último producto entregado en
+    vez de usar OFFSET. Usa el índice product_catalog_order_idx.
+    """
+
+    page_size = 12
+    cursor_query_param = "cursor"
+    ordering = ("-created_at", "-id")
+    invalid_cursor_message = "Cursor inválido"
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.count = cached_count(queryset, *COUNT_VERSIONS)
+
+        position = self.decode_cursor(request)
+        if position:
+            created_at, product_id = position
+            queryset = queryset.filter(
+                Q(created_at__lt=created_at)
+                | Q(created_at=created_at, id__lt=product_id)
+            )
+
+        results = list(queryset.order_by(*self.ordering)[: self.page_size + 1])
+        self.has_next = len(results) > self.page_size
+        results = results[: self.page_size]
+        self.last = results[-1] if results else None
+        return results
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+
+        try:
+            decoded = base64.urlsafe_b64decode(encoded.encode("ascii")).decode("ascii")
+            created_at, product_id = decoded.split("|", 1)
+            return datetime.fromisoformat(created_at), uuid.UUID(product_id)
+        except (TypeError, ValueError, UnicodeError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def encode_cursor(self, product):
+        position = f"{product.created_at.isoformat()}|{product.id}"
+        return base64.urlsafe_b64encode(position.encode("ascii")).decode("ascii")
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+
+        url = remove_query_param(self.request.build_absolute_uri(), "page")
+        return replace_query_param(
+            url, self.cursor_query_param, self.encode_cursor(self.last)
+        )
+
+    def get_paginated_response(self, data):
+        return Response({
+            "count": self.count,
+            "next": self.get_next_link(),
+            "previous": None,
+            "results": data,
+        })
+
+
+class CartAdminPagination(PageNumberPagination):
+    page_size = 10
+    page_size_query_param = "page_size"
+    max_page_size = 100
@@ -0,0 +1,310 @@
+# app/search.py
+"""
+Búsqueda de productos por texto.
+
+Cada producto tiene una fila en la tabla ``app_product_search`` con sus
+textos ya normalizados (minúsculas y sin tildes):
+
+- PostgreSQL: ``tsvector`` ponderado por campo (índice GIN) y el nombre
+  con índice de trigramas (``pg_trgm``) para tolerar errores de tipeo.
+- SQLite: tabla virtual FTS5, ordenada con ``bm25``.
+
+La tabla se crea en la migración 0018 y se mantiene con las señales de
+``app/signals.py``. Las cargas masivas deben llamar a ``index`` ellas
+mismas.
+"""
+import re
+
+from django.db import connection
+from django.db.models import FloatField, Q, Value
+from django.db.models.expressions import RawSQL
+
+from .models import Product
+from .text_utils import normalize
+
+
+SEARCH_TABLE = "app_product_search"
+
+# Campo indexado -> peso (A es el más relevante)
+SEARCH_FIELDS = {
+    "name": "A",
+    "sku": "B",
+    "vendor": "C",
+    "description": "D",
+}
+
+
+def product_search_fields(product):
+    vendor = product.vendor if product.vendor_id else None
+    return {
+        "name": normalize(product.name or ""),
+        "sku": normalize(product.sku or ""),
+        "vendor": normalize(vendor.name if vendor else ""),
+        "description": normalize(product.description or ""),
+    }
+
+
+def search_terms(query):
+    return re.findall(r"\w+", normalize(query or ""))
+
+
+def product_db_id(product_id):
+    return Product._meta.pk.get_db_prep_value(product_id, connection)
+
+
+class ProductSearchBackend:
+    """
+    Interfaz común. ``search`` filtra el queryset y lo anota con
+    ``search_rank`` (mayor es más relevante).
+    """
+
+    def create_index(self):
+        pass
+
+    def drop_index(self):
+        pass
+
+    def index(self, products):
+        pass
+
+    def remove(self, product_ids):
+        pass
+
+    def search(self, queryset, query, fields=None):
+        raise NotImplementedError
+
+    def no_results(self, queryset):
+        # Búsqueda sin palabras ("***", '""'): vacío, pero con search_rank
+        # para que search_products pueda ordenar igual
+        return queryset.none().annotate(
+            search_rank=Value(0.0, output_field=FloatField())
+        )
+
+
+class BasicProductSearch(ProductSearchBackend):
+    """
+    Respaldo para motores sin búsqueda de texto: icontains sin ranking.
+    """
+
+    lookups = {
+        "name": "name__icontains",
+        "sku": "sku__icontains",
+        "vendor": "vendor__name__icontains",
+        "description": "description__icontains",
+    }
+
+    def search(self, queryset, query, fields=None):
+        condition = Q()
+        for field in fields or SEARCH_FIELDS:
+            condition |= Q(**{self.lookups[field]: query})
+
+        return queryset.filter(condition).annotate(
+            search_rank=Value(0.0, output_field=FloatField())
+        )
+
+
+class PostgresProductSearch(ProductSearchBackend):
+
+    def create_index(self):
+        with connection.cursor() as cursor:
+            cursor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+            cursor.execute(
+                f"""
+                CREATE TABLE IF NOT EXISTS {SEARCH_TABLE} (
+                    product_id uuid PRIMARY KEY
+                        REFERENCES {Product._meta.db_table} (id)
+                        ON DELETE CASCADE,
+                    name text NOT NULL DEFAULT '',
+                    document tsvector NOT NULL
+                )
+                """
+            )
+            cursor.execute(
+                f"CREATE INDEX IF NOT EXISTS {SEARCH_TABLE}_document_idx "
+                f"ON {SEARCH_TABLE} USING gin (document)"
+            )
+            cursor.execute(
+                f"CREATE INDEX IF NOT EXISTS {SEARCH_TABLE}_name_trgm_idx "
+                f"ON {SEARCH_TABLE} USING gin (name gin_trgm_ops)"
+            )
+
+    def drop_index(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f"DROP TABLE IF EXISTS {SEARCH_TABLE}")
+
+    def index(self, products):
+        document = " || ".join(
+            f"setweight(to_tsvector('simple', %s), '{weight}')"
+            for weight in SEARCH_FIELDS.values()
+        )
+        rows = []
+        for product in products:
+            fields = product_search_fields(product)
+            rows.append([
+                product_db_id(product.pk),
+                fields["name"],
+                *(fields[field] for field in SEARCH_FIELDS),
+            ])
+
+        if not rows:
+            return
+
+        with connection.cursor() as cursor:
+            cursor.executemany(
+                f"""
+                INSERT INTO {SEARCH_TABLE} (product_id, name, document)
+                VALUES (%s, %s, {document})
+                ON CONFLICT (product_id) DO UPDATE
+                SET name = EXCLUDED.name, document = EXCLUDED.document
+                """,
+                rows,
+            )
+
+    def remove(self, product_ids):
+        if not product_ids:
+            return
+
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"DELETE FROM {SEARCH_TABLE} WHERE product_id = ANY(%s)",
+                [[product_db_id(product_id) for product_id in product_ids]],
+            )
+
+    def search(self, queryset, query, fields=None):
+        terms = search_terms(query)
+        if not terms:
+            return self.no_results(queryset)
+
+        weights = "".join(SEARCH_FIELDS[field] for field in fields or SEARCH_FIELDS)
+        tsquery = " & ".join(f"{term}:*{weights}" for term in terms)
+        text = " ".join(terms)
+        table = Product._meta.db_table
+
+        return queryset.filter(
+            id__in=RawSQL(
+                f"""
+                SELECT product_id FROM {SEARCH_TABLE}
+                WHERE document @@ to_tsquery('simple', %s) OR name %% %s
+                """,
+                [tsquery, text],
+            )
+        ).annotate(
+            search_rank=RawSQL(
+                f"""
+                SELECT ts_rank(document, to_tsquery('simple', %s))
+                    + similarity(name, %s)
+                FROM {SEARCH_TABLE} WHERE product_id = {table}.id
+                """,
+                [tsquery, text],
+                output_field=FloatField(),
+            )
+        )
+
+
+class SqliteProductSearch(ProductSearchBackend):
+    # SQLite limita la cantidad de parámetros por consulta
+    batch_size = 500
+
+    def create_index(self):
+        columns = ", ".join(SEARCH_FIELDS)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"""
+                CREATE VIRTUAL TABLE IF NOT EXISTS {SEARCH_TABLE} USING fts5(
+                    product_id UNINDEXED, {columns},
+                    tokenize = 'unicode61 remove_diacritics 2'
+                )
+                """
+            )
+
+    def drop_index(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f"DROP TABLE IF EXISTS {SEARCH_TABLE}")
+
+    def index(self, products):
+        rows = []
+        for product in products:
+            fields = product_search_fields(product)
+            rows.append([
+                product_db_id(product.pk),
+                *(fields[field] for field in SEARCH_FIELDS),
+            ])
+
+        if not rows:
+            return
+
+        self.remove([row[0] for row in rows], prepared=True)
+
+        placeholders = ", ".join(["%s"] * (len(SEARCH_FIELDS) + 1))
+        with connection.cursor() as cursor:
+            cursor.executemany(
+                f"INSERT INTO {SEARCH_TABLE} VALUES ({placeholders})",
+                rows,
+            )
+
+    def remove(self, product_ids, prepared=False):
+        ids = [
+            product_id if prepared else product_db_id(product_id)
+            for product_id in product_ids
+        ]
+        with connection.cursor() as cursor:
+            for start in range(0, len(ids), self.batch_size):
+                chunk = ids[start:start + self.batch_size]
+                placeholders = ", ".join(["%s"] * len(chunk))
+                cursor.execute(
+                    f"DELETE FROM {SEARCH_TABLE} "
+                    f"WHERE product_id IN ({placeholders})",
+                    chunk,
+                )
+
+    def search(self, queryset, query, fields=None):
+        terms = search_terms(query)
+        if not terms:
+            return self.no_results(queryset)
+
+        match = " ".join(f'"{term}"*' for term in terms)
+        if fields:
+            match = "{%s} : (%s)" % (" ".join(fields), match)
+
+        weights = ", ".join(
+            str(10.0 / (index + 1)) for index in range(len(SEARCH_FIELDS))
+        )
+        table = Product._meta.db_table
+
+        return queryset.filter(
+            id__in=RawSQL(
+                f"SELECT product_id FROM {SEARCH_TABLE} "
+                f"WHERE {SEARCH_TABLE} MATCH %s",
+                [match],
+            )
+        ).annotate(
+            # bm25 devuelve valores negativos: más bajo es mejor
+            search_rank=RawSQL(
+                f"""
+                SELECT -bm25({SEARCH_TABLE}, 0, {weights})
+                FROM {SEARCH_TABLE}
+                WHERE {SEARCH_TABLE} MATCH %s AND product_id = {table}.id
+                """,
+                [match],
+                output_field=FloatField(),
+            )
+        )
+
+
+def get_product_search():
+    if connection.vendor == "postgresql":
+        return PostgresProductSearch()
+    if connection.vendor == "sqlite":
+        return SqliteProductSearch()
+    return BasicProductSearch()
+
+
+def search_products(queryset, query, fields=None):
+    """
+    Filtra por texto y ordena por relevancia (luego por más reciente).
+    """
+    return (
+        get_product_search()
+        .search(queryset, query, fields=fields)
+        .order_by("-search_rank", "-created_at")
+    )
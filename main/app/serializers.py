@@ -1,13 +1,14 @@
 from rest_framework import serializers
 from django.contrib.auth import get_user_model
-from django.db.models import Count
+from django.db.models import Prefetch
 from .models import (
-    Category, Vendor, Product, ProductImage,
+    Category, CategoryClosure, Vendor, Product, ProductImage,
     Cart, CartItem,
     Order, OrderItem,
-    Address, Banner, ContentBlock
+    Address, Banner, ContentBlock, ImportJob
 )
 from .auth_utils import build_unique_username
+from .image_variants import display_url, variant_srcset, wants_original
 from django.contrib.auth.password_validation import validate_password
 
 User = get_user_model()
@@ -35,6 +36,7 @@ class CategorySerializer(serializers.ModelSerializer):
 class CategoryTreeSerializer(serializers.ModelSerializer):
     children = serializers.SerializerMethodField()
     products_count = serializers.IntegerField(read_only=True)
+    subtree_products_count = serializers.IntegerField(read_only=True)
 
     class Meta:
         model = Category
@@ -44,14 +46,13 @@ class CategoryTreeSerializer(serializers.ModelSerializer):
             "slug",
             "description",
             "products_count",
+            "subtree_products_count",
             "children",
         ]
 
     def get_children(self, obj):
-        queryset = obj.children.annotate(
-            products_count=Count("product")
-        )
-        return CategoryTreeSerializer(queryset, many=True).data
+        # Hijos armados en memoria por build_category_tree
+        return CategoryTreeSerializer(obj.tree_children, many=True).data
 
 
 # ======================
@@ -68,7 +69,17 @@ class CategoryAdminSerializer(serializers.ModelSerializer):
             "parent",
             "is_active",
         ]
-        read_only_fields = ["slug"] 
+        read_only_fields = ["slug"]
+
+    def validate_parent(self, value):
+        if value and self.instance and CategoryClosure.objects.filter(
+            ancestor=self.instance, descendant=value
+        ).exists():
+            raise serializers.ValidationError(
+                "Una categoría no puede ser subcategoría de sí misma "
+                "ni de sus subcategorías."
+            )
+        return value
 
 # ======================
 # VENDOR
@@ -78,20 +89,24 @@ class VendorSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Vendor
-        fields = "__all__"
+        exclude = ["logo_variants"]
 
     def to_representation(self, instance):
         data = super().to_representation(instance)
         request = self.context.get("request")
+        absolute = request.build_absolute_uri if request else None
 
         if instance.logo and hasattr(instance.logo, "url"):
-            data["logo"] = (
-                request.build_absolute_uri(instance.logo.url)
-                if request else instance.logo.url
+            url = display_url(
+                instance.logo, instance.logo_variants, wants_original(request)
             )
+            data["logo"] = absolute(url) if absolute else url
         else:
             data["logo"] = None
 
+        data["logo_srcset"] = variant_srcset(
+            instance.logo, instance.logo_variants, absolute
+        )
         return data
 
 # ======================
@@ -104,26 +119,119 @@ class ProductImageCreateSerializer(serializers.ModelSerializer):
 
 class ProductImageSerializer(serializers.ModelSerializer):
     image = serializers.SerializerMethodField()
+    srcset = serializers.SerializerMethodField()
 
     class Meta:
         model = ProductImage
-        fields = ["id", "image", "is_main"]
+        fields = ["id", "image", "srcset", "is_main"]
 
     def get_image(self, obj):
-        return obj.image.url if obj.image else None
+        # Variante redimensionada; el original solo con ?original=true
+        return display_url(
+            obj.image, obj.variants, wants_original(self.context.get("request"))
+        )
+
+    def get_srcset(self, obj):
+        return variant_srcset(obj.image, obj.variants)
+
+# ======================
+# SPARSE FIELDSETS
+# ======================
+class SparseFieldsetMixin:
+    """
+    Acepta ``fields`` / ``omit`` (listas de nombres) para devolver solo
+    una parte de los campos. ``select_related_fields`` y
+    ``prefetch_related_fields`` indican qué relación usa cada campo, para
+    que la vista cargue únicamente las de los campos pedidos.
+    """
+
+    select_related_fields = {}
+    prefetch_related_fields = {}
+
+    def __init__(self, *args, fields=None, omit=None, **kwargs):
+        super().__init__(*args, **kwargs)
+
+        selected = set(self.selected_field_names(fields, omit))
+        for name in list(self.fields):
+            if name not in selected:
+                self.fields.pop(name)
+
+    @staticmethod
+    def parse_field_list(value):
+        if not value:
+            return None
+        return [name.strip() for name in value.split(",") if name.strip()]
+
+    @classmethod
+    def unknown_field_names(cls, fields=None, omit=None):
+        available = set(cls.Meta.fields)
+        return [
+            name for name in dict.fromkeys([*(fields or []), *(omit or [])])
+            if name not in available
+        ]
+
+    @classmethod
+    def selected_field_names(cls, fields=None, omit=None):
+        names = list(cls.Meta.fields)
+        if fields:
+            names = [name for name in names if name in fields]
+        if omit:
+            names = [name for name in names if name not in omit]
+        return names
+
+    @classmethod
+    def optimize_queryset(cls, queryset, fields=None, omit=None):
+        names = cls.selected_field_names(fields, omit)
+        select = {
+            cls.select_related_fields[name]
+            for name in names
+            if name in cls.select_related_fields
+        }
+
+        # Un lookup simple gana sobre un Prefetch filtrado de la misma relación
+        prefetch = {}
+        for name in names:
+            lookup = cls.prefetch_related_fields.get(name)
+            if lookup is None:
+                continue
+            key = getattr(lookup, "prefetch_to", lookup)
+            if isinstance(prefetch.get(key), str):
+                continue
+            prefetch[key] = lookup
+
+        return queryset.select_related(*select).prefetch_related(*prefetch.values())
+
 
 # ======================
 # PRODUCT (PUBLIC)
 # ======================
-class ProductSerializer(serializers.ModelSerializer):
+class ProductSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     images = ProductImageSerializer(
         many=True, source="productimage_set", read_only=True
     )
 
     main_image = serializers.SerializerMethodField()
+    main_image_srcset = serializers.SerializerMethodField()
     category_name = serializers.CharField(source="category.name", read_only=True)
     vendor_name = serializers.CharField(source="vendor.name", read_only=True)
-    category_id = serializers.UUIDField(source="category.id", read_only=True)
+    category_id = serializers.UUIDField(read_only=True)
+
+    select_related_fields = {
+        "category_name": "category",
+        "vendor_name": "vendor",
+    }
+    prefetch_related_fields = {
+        "images": "productimage_set",
+        # Para la imagen principal basta con precargar las marcadas
+        "main_image": Prefetch(
+            "productimage_set",
+            queryset=ProductImage.objects.filter(is_main=True),
+        ),
+        "main_image_srcset": Prefetch(
+            "productimage_set",
+            queryset=ProductImage.objects.filter(is_main=True),
+        ),
+    }
 
     class Meta:
         model = Product
@@ -149,20 +257,53 @@ class ProductSerializer(serializers.ModelSerializer):
             # IMÁGENES
             "images",
             "main_image",
+            "main_image_srcset",
         ]
 
+    def main_product_image(self, obj):
+        # Se elige sobre las imágenes precargadas para no consultar por producto
+        return next(
+            (image for image in obj.productimage_set.all() if image.is_main),
+            None,
+        )
+
     def get_main_image(self, obj):
-        image = obj.productimage_set.filter(is_main=True).first()
+        image = self.main_product_image(obj)
         if image:
-            return image.image.url
+            return display_url(
+                image.image, image.variants, wants_original(self.context.get("request"))
+            )
         return None
 
+    def get_main_image_srcset(self, obj):
+        image = self.main_product_image(obj)
+        return variant_srcset(image.image, image.variants) if image else None
+
+
+class ProductCardSerializer(ProductSerializer):
+    """
+    Representación compacta para listados (tarjetas de producto).
+    """
+
+    class Meta(ProductSerializer.Meta):
+        fields = [
+            "id",
+            "name",
+            "slug",
+            "price",
+            "promo_price",
+            "category_id",
+            "category_name",
+            "vendor_name",
+            "main_image",
+            "main_image_srcset",
+        ]
 
 
 # ======================
 # PRODUCT (ADMIN)
 # ======================
-class ProductAdminSerializer(serializers.ModelSerializer):
+class ProductAdminSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     category_name = serializers.CharField(source="category.name", read_only=True)
     vendor_name = serializers.CharField(source="vendor.name", read_only=True)
 
@@ -170,6 +311,14 @@ class ProductAdminSerializer(serializers.ModelSerializer):
         many=True, source="productimage_set", read_only=True
     )
 
+    select_related_fields = {
+        "category_name": "category",
+        "vendor_name": "vendor",
+    }
+    prefetch_related_fields = {
+        "images": "productimage_set",
+    }
+
     class Meta:
         model = Product
         fields = [
@@ -223,6 +372,16 @@ class CartSerializer(serializers.ModelSerializer):
         model = Cart
         fields = ["id", "user", "items", "created_at"]
 
+class GuestCartSerializer(serializers.Serializer):
+    """
+    Carrito invitado de app/guest_carts.py, con la misma forma que CartSerializer.
+    """
+
+    id = serializers.UUIDField(allow_null=True, read_only=True)
+    user = serializers.ReadOnlyField()
+    items = CartItemSerializer(many=True, read_only=True)
+    created_at = serializers.DateTimeField(allow_null=True, read_only=True)
+
 # ======================
 # ORDER
 # ======================
@@ -254,17 +413,23 @@ class AddressSerializer(serializers.ModelSerializer):
 class BannerCreateUpdateSerializer(serializers.ModelSerializer):
     class Meta:
         model = Banner
-        fields = "__all__"
+        exclude = ["variants"]
 
 class BannerSerializer(serializers.ModelSerializer):
     image = serializers.SerializerMethodField()
+    srcset = serializers.SerializerMethodField()
 
     class Meta:
         model = Banner
-        fields = "__all__"
+        exclude = ["variants"]
 
     def get_image(self, obj):
-        return obj.image.url if obj.image else None
+        return display_url(
+            obj.image, obj.variants, wants_original(self.context.get("request"))
+        )
+
+    def get_srcset(self, obj):
+        return variant_srcset(obj.image, obj.variants)
 
 
 class ContentBlockSerializer(serializers.ModelSerializer):
@@ -441,5 +606,28 @@ class CategoryPublicTreeSerializer(serializers.ModelSerializer):
         fields = ["id", "name", "slug", "children"]
 
     def get_children(self, obj):
-        children = obj.children.filter(is_active=True)
-        return CategoryPublicTreeSerializer(children, many=True).data
+        # Hijos activos armados en memoria por build_category_tree
+        return CategoryPublicTreeSerializer(obj.tree_children, many=True).data
+
+# ======================
+# IMPORTACIONES (ADMIN)
+# ======================
+class ImportJobSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = ImportJob
+        fields = [
+            "id",
+            "model",
+            "filename",
+            "status",
+            "error",
+            "chunks_done",
+            "rows_processed",
+            "created",
+            "updated",
+            "skipped",
+            "created_at",
+            "updated_at",
+            "finished_at",
+        ]
+        read_only_fields = fields
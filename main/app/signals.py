@@ -0,0 +1,103 @@
+# app/signals.py
+import threading
+from contextlib import contextmanager
+
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .cache_utils import bump_cache_version
+from .image_variants import sync_variants
+from .models import Banner, Category, ContentBlock, Product, ProductImage, Vendor
+from .search import get_product_search
+
+
+# Las eliminaciones masivas (app/deletions.py) silencian los receptores
+# por fila y actualizan índice y cache una vez por bloque
+_bulk = threading.local()
+
+
+@contextmanager
+def per_row_receivers_muted():
+    _bulk.muted = True
+    try:
+        yield
+    finally:
+        _bulk.muted = False
+
+
+def receivers_muted():
+    return getattr(_bulk, "muted", False)
+
+
+# ======================
+# BÚSQUEDA DE PRODUCTOS
+# ======================
+@receiver(post_save, sender=Product)
+def index_product(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    get_product_search().index([instance])
+
+
+@receiver(post_delete, sender=Product)
+def unindex_product(sender, instance, **kwargs):
+    if receivers_muted():
+        return
+    get_product_search().remove([instance.pk])
+
+
+@receiver(post_save, sender=Vendor)
+def reindex_vendor_products(sender, instance, created=False, raw=False, **kwargs):
+    if raw or created:
+        return
+    products = Product.objects.filter(vendor=instance).select_related("vendor")
+    get_product_search().index(products.iterator(chunk_size=500))
+
+
+# ======================
+# VARIANTES DE IMÁGENES
+# ======================
+# Se conecta antes que la invalidación de cache para que las respuestas
+# regeneradas ya incluyan las variantes
+def generate_image_variants(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    sync_variants(instance)
+
+
+for model in (ProductImage, Banner, Vendor):
+    post_save.connect(
+        generate_image_variants, sender=model,
+        dispatch_uid=f"image-variants-{model._meta.model_name}",
+    )
+
+
+# ======================
+# CACHE DEL CATÁLOGO
+# ======================
+# Modelo -> versión que invalida las respuestas cacheadas que lo usan
+CACHE_VERSIONS = {
+    Product: "product",
+    ProductImage: "productimage",
+    Category: "category",
+    Vendor: "vendor",
+    Banner: "banner",
+    ContentBlock: "contentblock",
+}
+
+
+def bump_model_cache_version(sender, **kwargs):
+    if receivers_muted():
+        return
+    bump_cache_version(CACHE_VERSIONS[sender])
+
+
+for model, version in CACHE_VERSIONS.items():
+    post_save.connect(
+        bump_model_cache_version, sender=model,
+        dispatch_uid=f"bump-cache-{version}-save",
+    )
+    post_delete.connect(
+        bump_model_cache_version, sender=model,
+        dispatch_uid=f"bump-cache-{version}-delete",
+    )
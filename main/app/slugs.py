@@ -0,0 +1,91 @@
+# app/slugs.py
+import re
+from collections import defaultdict
+
+from django.db import IntegrityError, transaction
+from django.db.models import Q
+from django.utils.text import slugify
+
+
+# Espacio reservado para el sufijo "-N" dentro del max_length del campo
+SUFFIX_RESERVE = 8
+PREFIX_CHUNK_SIZE = 100
+SUFFIX_PATTERN = re.compile(r"^(.+)-(\d+)$")
+
+
+def base_slug(model, value):
+    max_length = model._meta.get_field("slug").max_length
+    return slugify(value)[: max_length - SUFFIX_RESERVE].strip("-") or model._meta.model_name
+
+
+def allocate_slugs(model, values):
+    """
+    Devuelve un slug libre por cada valor, en el mismo orden.
+
+    Los slugs ocupados se leen con una consulta por prefijo (en bloques
+    de PREFIX_CHUNK_SIZE bases) y se toma el menor sufijo numérico libre
+    en memoria, en lugar de probar sufijo por sufijo contra la base. No se
+    continúa desde el mayor sufijo: "matraz-250" puede ser el slug de
+    "Matraz 250" y no un sufijo de "matraz".
+    """
+    bases = [base_slug(model, value) for value in values]
+    unique_bases = list(dict.fromkeys(bases))
+
+    taken = set()
+    for start in range(0, len(unique_bases), PREFIX_CHUNK_SIZE):
+        condition = Q()
+        for base in unique_bases[start:start + PREFIX_CHUNK_SIZE]:
+            # "kit" y "kit-N", no "kitchen-..."
+            condition |= Q(slug=base) | Q(slug__startswith=f"{base}-")
+        taken.update(model._default_manager.filter(condition).values_list("slug", flat=True))
+
+    # Base pedida -> sufijos ocupados de esa misma base ("matraz-250-1"
+    # es un sufijo de "matraz-250", no de "matraz")
+    suffixes = defaultdict(set)
+    requested = set(unique_bases)
+    for slug in taken:
+        match = SUFFIX_PATTERN.match(slug)
+        if match and match.group(1) in requested:
+            suffixes[match.group(1)].add(int(match.group(2)))
+
+    next_suffix = defaultdict(lambda: 1)
+    slugs = []
+    for base in bases:
+        if base not in taken:
+            slug = base
+        else:
+            suffix = next_suffix[base]
+            while suffix in suffixes[base]:
+                suffix += 1
+            next_suffix[base] = suffix + 1
+            slug = f"{base}-{suffix}"
+        taken.add(slug)
+        slugs.append(slug)
+
+    return slugs
+
+
+def allocate_slug(model, value):
+    return allocate_slugs(model, [value])[0]
+
+
+def save_with_unique_slug(instance, value, save, attempts=3):
+    """
+    Ejecuta ``save`` asignando antes un slug libre si falta. Si otro
+    proceso ocupa el mismo slug entre la consulta y el INSERT, la
+    restricción unique lo rechaza y se reintenta con el siguiente sufijo.
+    """
+    if instance.slug:
+        return save()
+
+    model = type(instance)
+    for attempt in range(attempts):
+        instance.slug = allocate_slug(model, value)
+        try:
+            with transaction.atomic():
+                return save()
+        except IntegrityError:
+            slug_taken = model._default_manager.filter(slug=instance.slug).exists()
+            if attempt == attempts - 1 or not slug_taken:
+                instance.slug = ""
+                raise
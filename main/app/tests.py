@@ -1,17 +1,48 @@
 import json
+import os
+import shutil
+import tempfile
+import time
+import zipfile
 from datetime import timedelta
-from io import BytesIO
+from decimal import Decimal
+from io import BytesIO, StringIO
+from unittest.mock import patch
 
+from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.core.management import call_command
+from django.db import connection
+from django.db.models.signals import post_delete
 from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.core.files.base import ContentFile
 from django.core.files.uploadedfile import SimpleUploadedFile
 from django.utils import timezone
+from django.utils.http import http_date
 import pandas as pd
 from rest_framework.test import APIClient
 from rest_framework_simplejwt.tokens import RefreshToken
 
-from .models import Cart, CartItem, Product, Vendor
+from .models import (
+    Cart,
+    CartItem,
+    Category,
+    CategoryClosure,
+    ContentBlock,
+    ImportJob,
+    Order,
+    OrderItem,
+    Product,
+    ProductImage,
+    Vendor,
+)
+from .cache_utils import bump_cache_version
+from .import_jobs import run_import_job
+from .importers import ProductImporter
+from .search import get_product_search
+from .serializers import ProductSerializer
+from .slugs import allocate_slugs
 
 
 User = get_user_model()
@@ -56,7 +87,10 @@ class LoginIdentifierTests(TestCase):
         self.assertEqual(response.data["user"]["email"], self.user.email)
 
 
-@override_settings(ALLOWED_HOSTS=["testserver", "localhost", "127.0.0.1"])
+@override_settings(
+    ALLOWED_HOSTS=["testserver", "localhost", "127.0.0.1"],
+    GUEST_CART_BACKEND="database",
+)
 class GuestCartTests(TestCase):
     def setUp(self):
         self.client = APIClient()
@@ -96,6 +130,195 @@ class GuestCartTests(TestCase):
         )
         self.assertEqual(guest_cart.cartitem_set.count(), 1)
 
+    def test_anonymous_cart_reads_do_not_create_session_or_cart(self):
+        from django.contrib.sessions.models import Session
+
+        with CaptureQueriesContext(connection) as context:
+            cart_response = self.client.get("/api/cart/")
+            items_response = self.client.get("/api/cart-items/")
+
+        self.assertEqual(cart_response.status_code, 200)
+        self.assertEqual(cart_response.data["items"], [])
+        self.assertIsNone(cart_response.data["id"])
+        self.assertEqual(items_response.status_code, 200)
+        self.assertNotIn(settings.SESSION_COOKIE_NAME, cart_response.cookies)
+        self.assertFalse(
+            any(
+                query["sql"].startswith(("INSERT", "UPDATE"))
+                for query in context.captured_queries
+            )
+        )
+        self.assertEqual(Session.objects.count(), 0)
+        self.assertEqual(Cart.objects.count(), 0)
+
+        # La primera vez que agrega un producto se crean sesión y carrito
+        self.client.post(
+            "/api/cart/",
+            {"product_id": str(self.product.id), "quantity": 1},
+            format="json",
+        )
+        self.assertEqual(Session.objects.count(), 1)
+        self.assertEqual(Cart.objects.count(), 1)
+
+
+@override_settings(
+    ALLOWED_HOSTS=["testserver", "localhost", "127.0.0.1"],
+    GUEST_CART_BACKEND="cache",
+)
+class CacheGuestCartTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.vendor = Vendor.objects.create(name="Proveedor Cache")
+        self.product = Product.objects.create(
+            vendor=self.vendor, name="Bureta", sku="CACHE-1", price="15.00",
+        )
+        self.other = Product.objects.create(
+            vendor=self.vendor, name="Probeta", sku="CACHE-2", price="8.00",
+        )
+        self.password = "Cliente12345!"
+        self.user = User.objects.create_user(
+            username="cliente-cache",
+            email="cliente-cache@castromonte.com",
+            password=self.password,
+            role=User.Role.CLIENT,
+        )
+
+    def tearDown(self):
+        from django.core.cache import cache
+
+        cache.clear()
+
+    def add(self, product, quantity):
+        return self.client.post(
+            "/api/cart/",
+            {"product_id": str(product.id), "quantity": quantity},
+            format="json",
+        )
+
+    def test_guest_cart_lives_in_cache_without_sql_rows(self):
+        self.add(self.product, 2)
+        response = self.add(self.product, 1)
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(len(response.data["items"]), 1)
+        self.assertEqual(response.data["items"][0]["quantity"], 3)
+        self.assertEqual(response.data["items"][0]["price_snapshot"], "15.00")
+        self.assertEqual(response.data["items"][0]["product"]["id"], str(self.product.id))
+        self.assertEqual(Cart.objects.count(), 0)
+        self.assertEqual(CartItem.objects.count(), 0)
+
+        self.add(self.other, 1)
+        item_id = self.client.get("/api/cart/").data["items"][1]["id"]
+
+        response = self.client.patch(
+            f"/api/cart-items/{item_id}/", {"quantity": 4}, format="json"
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["quantity"], 4)
+
+        items = self.client.get("/api/cart-items/").data["results"]
+        self.assertEqual([item["quantity"] for item in items], [3, 4])
+
+        self.assertEqual(self.client.delete(f"/api/cart-items/{item_id}/").status_code, 204)
+        self.assertEqual(self.client.delete(f"/api/cart-items/{item_id}/").status_code, 404)
+        self.assertEqual(self.client.patch(
+            "/api/cart-items/abc/", {"quantity": 1}, format="json"
+        ).status_code, 404)
+        self.assertEqual(len(self.client.get("/api/cart/").data["items"]), 1)
+        self.assertEqual(Cart.objects.count(), 0)
+
+    def test_login_moves_guest_cart_into_sql(self):
+        user_cart = Cart.objects.create(user=self.user)
+        CartItem.objects.create(
+            cart=user_cart, product=self.product, quantity=1, price_snapshot="15.00",
+        )
+
+        self.add(self.product, 2)
+        self.add(self.other, 1)
+        removed = Product.objects.create(
+            vendor=self.vendor, name="Eliminado", sku="CACHE-3", price="1.00",
+        )
+        self.add(removed, 1)
+        removed.delete()
+
+        response = self.client.post(
+            "/api/auth/login/",
+            {"identifier": self.user.username, "password": self.password},
+            format="json",
+        )
+        self.assertEqual(response.status_code, 200)
+
+        quantities = dict(
+            CartItem.objects.filter(cart=user_cart).values_list("product__sku", "quantity")
+        )
+        self.assertEqual(quantities, {"CACHE-1": 3, "CACHE-2": 1})
+        self.assertEqual(Cart.objects.count(), 1)
+
+        # El carrito invitado se vació al unirse
+        self.client.force_authenticate(user=None)
+        self.assertEqual(self.client.get("/api/cart/").data["items"], [])
+
+    def test_guest_carts_expire_with_cache_timeout(self):
+        from .guest_carts import CacheGuestCartStore
+
+        store = CacheGuestCartStore(timeout=60)
+        with patch.object(store.cache, "set", wraps=store.cache.set) as cache_set:
+            store.add("sesion-ttl", self.product, 1)
+
+        self.assertEqual(cache_set.call_args.args[2], 60)
+        self.assertEqual(store.get("sesion-ttl").items[0].quantity, 1)
+
+    def test_writes_wait_for_the_session_lock(self):
+        from .guest_carts import CacheGuestCartStore
+
+        store = CacheGuestCartStore()
+        store.add("sesion-lock", self.product, 1)
+        lock_key = f"{store.key('sesion-lock')}:lock"
+        store.cache.add(lock_key, "otro-request", store.lock_timeout)
+
+        # El otro request termina mientras este espera
+        with patch(
+            "app.guest_carts.time.sleep",
+            side_effect=lambda seconds: store.cache.delete(lock_key),
+        ) as sleep:
+            cart = store.add("sesion-lock", self.product, 2)
+
+        self.assertEqual(sleep.call_count, 1)
+        self.assertEqual(cart.items[0].quantity, 3)
+        self.assertIsNone(store.cache.get(lock_key))
+
+    def test_sql_guest_carts_from_before_the_switch_are_kept(self):
+        from .guest_carts import CacheGuestCartStore
+
+        store = CacheGuestCartStore()
+        legacy = Cart.objects.create(session_key="sesion-sql")
+        item = CartItem.objects.create(
+            cart=legacy, product=self.product, quantity=2, price_snapshot="15.00",
+        )
+
+        cart = store.get("sesion-sql")
+        self.assertEqual([(entry.id, entry.quantity) for entry in cart.items], [(item.id, 2)])
+
+        # La primera escritura lo pasa a la cache con los mismos ids
+        store.update_item("sesion-sql", item.id, 5)
+        cart = store.add("sesion-sql", self.other, 1)
+        self.assertEqual(
+            [(entry.product_id, entry.quantity) for entry in cart.items],
+            [(self.product.id, 5), (self.other.id, 1)],
+        )
+        self.assertFalse(Cart.objects.filter(pk=legacy.pk).exists())
+
+        other_legacy = Cart.objects.create(session_key="sesion-sql-2")
+        CartItem.objects.create(
+            cart=other_legacy, product=self.other, quantity=3, price_snapshot="8.00",
+        )
+        user_cart = store.merge_into("sesion-sql-2", self.user)
+        self.assertEqual(
+            list(user_cart.cartitem_set.values_list("product_id", "quantity")),
+            [(self.other.id, 3)],
+        )
+        self.assertFalse(Cart.objects.filter(pk=other_legacy.pk).exists())
+
 
 @override_settings(ALLOWED_HOSTS=["testserver", "localhost", "127.0.0.1"])
 class ProductImportTests(TestCase):
@@ -225,72 +448,240 @@ class ProductImportTests(TestCase):
         self.assertEqual(response.data["created"], 1)
         self.assertTrue(Product.objects.filter(sku="SKU-XLSX").exists())
 
+    def post_products_csv(self, content, mapping):
+        return self.client.post(
+            "/api/admin/import/",
+            {
+                "file": SimpleUploadedFile("productos.csv", content, content_type="text/csv"),
+                "model": "product",
+                "mapping": json.dumps(mapping),
+            },
+            format="multipart",
+        )
 
-@override_settings(ALLOWED_HOSTS=["testserver", "localhost", "127.0.0.1"])
-class PublicProductPaginationTests(TestCase):
-    def setUp(self):
-        self.client = APIClient()
-        self.vendor = Vendor.objects.create(name="Proveedor Publico")
-
-        for index in range(13):
-            Product.objects.create(
-                vendor=self.vendor,
-                name=f"Producto publico {index}",
-                sku=f"PUB-{index:03}",
-                description="Producto para prueba de paginacion publica",
-                technical_specs={"orden": index},
-                price="10.00",
-                is_active=True,
+    def test_product_import_creates_new_categories_in_batch(self):
+        def import_with_categories(prefix, count):
+            rows = b"".join(
+                f"P{index},{prefix}-{index},Categoria {prefix} {index},10\n".encode()
+                for index in range(count)
             )
+            with CaptureQueriesContext(connection) as queries:
+                response = self.post_products_csv(
+                    b"name,sku,category,price\n" + rows,
+                    {"name": "name", "sku": "sku", "category": "category", "price": "price"},
+                )
+            self.assertEqual(response.status_code, 200)
+            return len(queries)
 
-    def test_public_products_returns_twelve_items_per_page(self):
-        response = self.client.get("/api/products/")
+        few = import_with_categories("A", 2)
+        many = import_with_categories("B", 30)
+
+        self.assertEqual(few, many)
+        category = Category.objects.get(name="Categoria B 29")
+        self.assertEqual(category.slug, "categoria-b-29")
+        self.assertTrue(
+            CategoryClosure.objects.filter(
+                ancestor=category, descendant=category, depth=0
+            ).exists()
+        )
+        self.assertEqual(Product.objects.get(sku="B-29").category, category)
+
+    def test_product_import_counts_repeated_skus_like_row_by_row(self):
+        response = self.post_products_csv(
+            (
+                b"Nombre,SKU,Categoria,Proveedor,Precio,Promo\n"
+                b"Nuevo,SKU-010,Reactivos,Merck,12.00,\n"
+                b",SKU-011,Reactivos,Merck,5,\n"
+                b"Nuevo v2,SKU-010,Vidrio,Merck,13.50,10\n"
+                b"Existente editado,SKU-001,,,,\n"
+            ),
+            {
+                "name": "nombre",
+                "sku": "sku",
+                "category": "categoria",
+                "vendor": "proveedor",
+                "price": "precio",
+                "promo_price": "promo",
+            },
+        )
 
         self.assertEqual(response.status_code, 200)
-        self.assertEqual(response.data["count"], 13)
-        self.assertEqual(len(response.data["results"]), 12)
+        self.assertEqual(response.data["created"], 1)
+        self.assertEqual(response.data["updated"], 2)
+        self.assertEqual(response.data["skipped"], 1)
 
+        product = Product.objects.select_related("category", "vendor").get(sku="SKU-010")
+        self.assertEqual(product.name, "Nuevo v2")
+        self.assertEqual(product.category.name, "Vidrio")
+        self.assertEqual(product.vendor.name, "Merck")
+        self.assertEqual(str(product.effective_price), "10.00")
+        self.assertTrue(product.slug)
+        self.assertEqual(Vendor.objects.filter(name="Merck").count(), 1)
+        self.assertTrue(Category.objects.filter(name="Reactivos").exists())
+        self.assertFalse(Product.objects.filter(sku="SKU-011").exists())
 
-@override_settings(ALLOWED_HOSTS=["testserver", "localhost", "127.0.0.1"])
-class PublicProductSearchTests(TestCase):
-    def setUp(self):
-        self.client = APIClient()
-        self.vendor = Vendor.objects.create(name="Proveedor Search")
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.name, "Existente editado")
+        self.assertIsNone(self.product.category_id)
+        self.assertEqual(str(self.product.price), "0.00")
 
-        self.name_match = Product.objects.create(
-            vendor=self.vendor,
-            name="Microscopio Analitico",
-            sku="BUS-001",
-            description="Equipo de laboratorio",
-            technical_specs={"tipo": "optico"},
-            price="20.00",
-            is_active=True,
+        from .search import search_products
+        self.assertEqual(
+            list(search_products(Product.objects.all(), "nuevo").values_list("sku", flat=True)),
+            ["SKU-010"],
         )
-        Product.objects.create(
-            vendor=self.vendor,
-            name="Centrifuga Clinica",
-            sku="MICRO-002",
-            description="Incluye modulo para microscopio",
-            technical_specs={"tipo": "centrifuga"},
-            price="25.00",
-            is_active=True,
+
+    def test_product_import_queries_do_not_grow_with_rows(self):
+        def run(count, offset):
+            rows = "".join(
+                f"Producto {i},SKU-{i:05d},Categoria {i % 3},Proveedor {i % 2},{i}.50\n"
+                for i in range(offset, offset + count)
+            )
+            with CaptureQueriesContext(connection) as queries:
+                response = self.post_products_csv(
+                    ("name,sku,category,vendor,price\n" + rows).encode(),
+                    {
+                        "name": "name",
+                        "sku": "sku",
+                        "category": "category",
+                        "vendor": "vendor",
+                        "price": "price",
+                    },
+                )
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response.data["created"], count)
+            return len(queries)
+
+        run(3, 0)
+        self.assertEqual(run(5, 100), run(50, 1000))
+
+    def test_product_import_rejects_invalid_prices(self):
+        response = self.post_products_csv(
+            b"name,sku,price\nUno,SKU-100,10\nDos,SKU-101,diez\n",
+            {"name": "name", "sku": "sku", "price": "price"},
         )
 
-    def test_public_search_filters_only_by_product_name(self):
-        response = self.client.get("/api/products/?search=microscopio")
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("3", response.data["detail"])
+        self.assertFalse(Product.objects.filter(sku="SKU-100").exists())
+
+    @override_settings(IMPORT_CHUNK_SIZE=3)
+    def test_product_import_dry_run_reports_rows_without_writing(self):
+        Category.objects.create(name="Reactivos")
+        products_before = Product.objects.count()
+
+        response = self.client.post(
+            "/api/admin/import/",
+            {
+                "file": SimpleUploadedFile(
+                    "productos.csv",
+                    (
+                        b"name,sku,category,price\n"
+                        b"Nuevo,SKU-500,Reactivos,10\n"
+                        b"Otro,SKU-500,Vidrio,abc\n"
+                        b",SKU-501,,5\n"
+                        b"Editado,SKU-001,,20\n"
+                        b"Sin sku,,,3\n"
+                    ),
+                    content_type="text/csv",
+                ),
+                "model": "product",
+                "dry_run": "true",
+                "mapping": json.dumps(
+                    {"name": "name", "sku": "sku", "category": "category", "price": "price"}
+                ),
+            },
+            format="multipart",
+        )
 
         self.assertEqual(response.status_code, 200)
-        self.assertEqual(response.data["count"], 1)
-        self.assertEqual(response.data["results"][0]["id"], str(self.name_match.id))
+        self.assertTrue(response.data["dry_run"])
+        self.assertFalse(response.data["valid"])
+        self.assertEqual(response.data["rows"], 5)
+        self.assertEqual(response.data["summary"]["created"], 1)
+        self.assertEqual(response.data["summary"]["updated"], 2)
+        self.assertEqual(response.data["summary"]["skipped"], 2)
+        self.assertEqual(response.data["summary"]["new_categories"], ["Vidrio"])
+        self.assertEqual(
+            response.data["issues_total"], {"error": 1, "skip": 2, "warning": 2}
+        )
+        self.assertIn(
+            {"row": 3, "level": "error", "field": "price",
+             "message": "Valor numérico inválido", "value": "abc"},
+            response.data["issues"],
+        )
+        self.assertEqual(
+            sorted((issue["row"], issue["field"]) for issue in response.data["issues"]),
+            [(3, "category"), (3, "price"), (3, "sku"), (4, "name"), (6, "sku")],
+        )
+
+        self.assertEqual(Product.objects.count(), products_before)
+        self.assertFalse(Category.objects.filter(name="Vidrio").exists())
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.name, "Producto existente")
+
+    @override_settings(IMPORT_CHUNK_SIZE=2)
+    def test_product_import_commits_each_chunk(self):
+        response = self.post_products_csv(
+            (
+                b"name,sku,price\n"
+                b"Uno,SKU-200,10\n"
+                b"Dos,SKU-201,20\n"
+                b"Uno v2,SKU-200,11\n"
+                b"Cuatro,SKU-203,cuarenta\n"
+            ),
+            {"name": "name", "sku": "sku", "price": "price"},
+        )
+
+        # El segundo bloque falla completo; el primero queda guardado
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("5", response.data["detail"])
+        self.assertEqual(response.data["created"], 2)
+        self.assertEqual(response.data["updated"], 0)
+        self.assertEqual(Product.objects.get(sku="SKU-200").name, "Uno")
+        self.assertFalse(Product.objects.filter(sku="SKU-203").exists())
+
+    @override_settings(IMPORT_CHUNK_SIZE=2)
+    def test_product_import_streams_xlsx_in_chunks(self):
+        from openpyxl import Workbook
+
+        workbook = Workbook()
+        sheet = workbook.active
+        sheet.append(["Name ", "SKU", "Price"])
+        sheet.append(["Uno", "SKU-300", 10])
+        sheet.append([None, None, None])
+        sheet.append(["Dos", "SKU-301", 20.5])
+        sheet.append(["Uno v2", "SKU-300", 12])
+        sheet.append([None, "SKU-302", 5])
+        buffer = BytesIO()
+        workbook.save(buffer)
+
+        response = self.client.post(
+            "/api/admin/import/",
+            {
+                "file": SimpleUploadedFile("productos.xlsx", buffer.getvalue()),
+                "model": "product",
+                "mapping": json.dumps({"name": "name", "sku": "sku", "price": "price"}),
+            },
+            format="multipart",
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["created"], 2)
+        self.assertEqual(response.data["updated"], 1)
+        self.assertEqual(response.data["skipped"], 1)
+        product = Product.objects.get(sku="SKU-300")
+        self.assertEqual(product.name, "Uno v2")
+        self.assertEqual(str(product.price), "12.00")
 
 
 @override_settings(ALLOWED_HOSTS=["testserver", "localhost", "127.0.0.1"])
-class CartAdminBulkDeleteTests(TestCase):
+class CategoryImportTests(TestCase):
     def setUp(self):
         self.client = APIClient()
         self.user = User.objects.create_user(
-            username="admin-carts",
-            email="admin-carts@castromonte.com",
+            username="staff-categories",
+            email="categorias@castromonte.com",
             password="Admin12345!",
             role=User.Role.ADMIN,
             is_staff=True,
@@ -298,68 +689,1817 @@ class CartAdminBulkDeleteTests(TestCase):
         )
         self.client.force_authenticate(user=self.user)
 
-        self.vendor = Vendor.objects.create(name="Proveedor Carritos")
-        self.product = Product.objects.create(
-            vendor=self.vendor,
-            name="Producto carrito",
-            sku="CART-001",
-            description="Producto para prueba de carritos",
-            technical_specs={"tipo": "demo"},
-            price="15.00",
-            created_by=self.user,
+        self.lab = Category.objects.create(name="Laboratorio")
+        self.glass = Category.objects.create(name="Vidrio", parent=self.lab)
+
+    def post_categories_csv(self, content, mapping):
+        return self.client.post(
+            "/api/admin/import/",
+            {
+                "file": SimpleUploadedFile("categorias.csv", content, content_type="text/csv"),
+                "model": "category",
+                "mapping": json.dumps(mapping),
+            },
+            format="multipart",
         )
 
-        self.cart_one = Cart.objects.create(user=self.user)
-        self.cart_two = Cart.objects.create()
+    def test_category_import_builds_tree_from_paths(self):
+        content = (
+            "ruta\n"
+            "Laboratorio > Vidrio > Matraces\n"
+            "laboratorio > vidrio > Probetas\n"
+            "Reactivos\n"
+            "Reactivos > Ácidos\n"
+            "\n"
+            " > \n"
+        ).encode()
 
-        CartItem.objects.create(
-            cart=self.cart_one,
-            product=self.product,
-            quantity=2,
-            price_snapshot="15.00",
+        response = self.post_categories_csv(content, {"path": "Ruta"})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["created"], 4)
+        self.assertEqual(response.data["existing"], 2)
+        self.assertEqual(response.data["skipped"], 1)
+
+        flasks = Category.objects.get(name="Matraces")
+        self.assertEqual(flasks.parent_id, self.glass.id)
+        self.assertEqual(flasks.slug, "matraces")
+        self.assertEqual(
+            Category.objects.get(name="Ácidos").parent,
+            Category.objects.get(name="Reactivos", parent__isnull=True),
         )
-        CartItem.objects.create(
-            cart=self.cart_two,
-            product=self.product,
-            quantity=1,
-            price_snapshot="15.00",
+        self.assertEqual(
+            set(
+                Category.objects.filter(
+                    id__in=CategoryClosure.subtree_ids(self.lab.id)
+                ).values_list("name", flat=True)
+            ),
+            {"Laboratorio", "Vidrio", "Matraces", "Probetas"},
         )
 
-    def test_cart_bulk_delete_removes_selected_carts(self):
-        response = self.client.post(
-            "/api/admin/carts/bulk-delete/",
-            {"ids": [str(self.cart_one.id), str(self.cart_two.id)]},
-            format="json",
+        response = self.post_categories_csv(content, {"path": "ruta"})
+        self.assertEqual(response.data["created"], 0)
+        self.assertEqual(response.data["existing"], 6)
+
+    def test_category_import_accepts_parent_column(self):
+        response = self.post_categories_csv(
+            (
+                "nombre,padre\n"
+                "Pipetas,Laboratorio > Vidrio\n"
+                "Vidrio,Laboratorio\n"
+                "Balanzas,\n"
+            ).encode(),
+            {"name": "nombre", "parent": "padre"},
         )
 
         self.assertEqual(response.status_code, 200)
-        self.assertEqual(response.data["deleted"], 2)
-        self.assertFalse(Cart.objects.filter(id=self.cart_one.id).exists())
-        self.assertFalse(Cart.objects.filter(id=self.cart_two.id).exists())
-        self.assertEqual(CartItem.objects.count(), 0)
+        self.assertEqual(response.data["created"], 2)
+        self.assertEqual(response.data["existing"], 2)
+        self.assertEqual(Category.objects.get(name="Pipetas").parent_id, self.glass.id)
+        self.assertIsNone(Category.objects.get(name="Balanzas").parent_id)
 
-    def test_cart_admin_list_is_paginated(self):
-        response = self.client.get("/api/admin/carts/?page_size=1")
+    def test_category_import_rejects_unknown_column(self):
+        response = self.post_categories_csv(b"nombre\nPipetas\n", {"name": "categoria"})
 
-        self.assertEqual(response.status_code, 200)
-        self.assertEqual(response.data["count"], 2)
-        self.assertEqual(len(response.data["results"]), 1)
-        self.assertIsNotNone(response.data["next"])
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("categoria", response.data["detail"])
+        self.assertFalse(Category.objects.filter(name="Pipetas").exists())
 
-    def test_cleanup_guest_carts_removes_only_inactive_guest_carts(self):
-        cutoff_date = timezone.now() - timedelta(days=2)
 
-        recent_item_cart = Cart.objects.create()
-        recent_item = CartItem.objects.create(
-            cart=recent_item_cart,
-            product=self.product,
-            quantity=1,
-            price_snapshot="15.00",
+@override_settings(ALLOWED_HOSTS=["testserver", "localhost", "127.0.0.1"])
+class VendorImportTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(
+            username="staff-vendors",
+            email="proveedores@castromonte.com",
+            password="Admin12345!",
+            role=User.Role.ADMIN,
+            is_staff=True,
+            is_active=True,
         )
+        self.client.force_authenticate(user=self.user)
 
-        old_user_cart = Cart.objects.create(user=self.user)
-        old_user_item = CartItem.objects.create(
-            cart=old_user_cart,
+        self.merck = Vendor.objects.create(
+            name="Merck Perú", contact_email="ventas@merck.pe", phone="111"
+        )
+        self.sigma = Vendor.objects.create(
+            name="Sigma", contact_email="sigma@example.com", phone="222"
+        )
+
+    def test_vendor_import_upserts_by_normalized_name(self):
+        file = SimpleUploadedFile(
+            "proveedores.csv",
+            (
+                "Nombre,Correo,Telefono,Activo\n"
+                "MERCK PERU,ventas@merck.pe,999,si\n"
+                "sigma,sigma@example.com,222,true\n"
+                "Nuevo Lab,,333,no\n"
+                "nuevo lab,lab@example.com,333,no\n"
+                ",x@example.com,,\n"
+            ).encode(),
+            content_type="text/csv",
+        )
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(
+                "/api/admin/import/",
+                {
+                    "file": file,
+                    "model": "vendor",
+                    "mapping": json.dumps({
+                        "name": "nombre",
+                        "contact_email": "correo",
+                        "phone": "telefono",
+                        "is_active": "activo",
+                    }),
+                },
+                format="multipart",
+            )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["created"], 1)
+        self.assertEqual(response.data["updated"], 1)
+        self.assertEqual(response.data["unchanged"], 1)
+        self.assertEqual(response.data["skipped"], 1)
+
+        self.merck.refresh_from_db()
+        self.assertEqual(self.merck.name, "Merck Perú")
+        self.assertEqual(self.merck.phone, "999")
+
+        new_vendor = Vendor.objects.get(name__iexact="nuevo lab")
+        self.assertEqual(new_vendor.contact_email, "lab@example.com")
+        self.assertFalse(new_vendor.is_active)
+        self.assertEqual(Vendor.objects.count(), 3)
+
+        writes = [q for q in queries.captured_queries if q["sql"].startswith(("INSERT", "UPDATE"))]
+        self.assertEqual(len(writes), 2)
+
+    def test_vendor_import_only_updates_mapped_fields(self):
+        response = self.client.post(
+            "/api/admin/import/",
+            {
+                "file": SimpleUploadedFile(
+                    "proveedores.csv", b"name,phone\nSigma,555\n", content_type="text/csv"
+                ),
+                "model": "vendor",
+                "mapping": json.dumps({"name": "name", "phone": "phone"}),
+            },
+            format="multipart",
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.sigma.refresh_from_db()
+        self.assertEqual(self.sigma.phone, "555")
+        self.assertEqual(self.sigma.contact_email, "sigma@example.com")
+
+
+@override_settings(
+    ALLOWED_HOSTS=["testserver", "localhost", "127.0.0.1"],
+    IMPORT_CHUNK_SIZE=2,
+)
+class ImportJobTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.jobs_root = tempfile.mkdtemp(prefix="import-jobs-")
+        cls.addClassCleanup(shutil.rmtree, cls.jobs_root, ignore_errors=True)
+        cls.enterClassContext(override_settings(STORAGES={
+            **settings.STORAGES,
+            "imports": {
+                "BACKEND": "django.core.files.storage.FileSystemStorage",
+                "OPTIONS": {"location": cls.jobs_root},
+            },
+        }))
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(
+            username="staff-jobs",
+            email="jobs@castromonte.com",
+            password="Admin12345!",
+            role=User.Role.ADMIN,
+            is_staff=True,
+            is_active=True,
+        )
+        self.client.force_authenticate(user=self.user)
+
+        # El worker corre en el mismo hilo para ver la transacción del test
+        submit = patch(
+            "app.import_jobs.executor.submit",
+            side_effect=lambda function, job_id: run_import_job(job_id),
+        )
+        submit.start()
+        self.addCleanup(submit.stop)
+
+    def start_job(self):
+        file = SimpleUploadedFile(
+            "productos.csv",
+            (
+                b"name,sku,price\n"
+                b"Uno,SKU-400,10\n"
+                b"Dos,SKU-401,20\n"
+                b"Uno v2,SKU-400,11\n"
+                b",,5\n"
+                b"Cinco,SKU-404,50\n"
+            ),
+            content_type="text/csv",
+        )
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(
+                "/api/admin/import/",
+                {
+                    "file": file,
+                    "model": "product",
+                    "background": "true",
+                    "mapping": json.dumps({"name": "name", "sku": "sku", "price": "price"}),
+                },
+                format="multipart",
+            )
+        self.assertEqual(response.status_code, 202)
+        return response.data["job_id"]
+
+    def test_background_import_reports_progress(self):
+        job_id = self.start_job()
+
+        response = self.client.get(f"/api/admin/import/jobs/{job_id}/")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["status"], ImportJob.Status.COMPLETED)
+        self.assertEqual(response.data["chunks_done"], 3)
+        self.assertEqual(response.data["rows_processed"], 5)
+        self.assertEqual(response.data["created"], 3)
+        self.assertEqual(response.data["updated"], 1)
+        self.assertEqual(response.data["skipped"], 1)
+        self.assertEqual(Product.objects.get(sku="SKU-400").name, "Uno v2")
+
+    def test_failed_job_resumes_from_last_checkpoint(self):
+        import_frame = ProductImporter.import_frame
+        calls = []
+
+        def fail_on_second_chunk(importer, frame):
+            calls.append(len(frame))
+            if len(calls) == 2:
+                raise RuntimeError("conexión perdida")
+            return import_frame(importer, frame)
+
+        with patch.object(ProductImporter, "import_frame", fail_on_second_chunk):
+            job_id = self.start_job()
+
+            job = ImportJob.objects.get(pk=job_id)
+            self.assertEqual(job.status, ImportJob.Status.FAILED)
+            self.assertEqual(job.error, "conexión perdida")
+            self.assertEqual(job.chunks_done, 1)
+            self.assertEqual(job.created, 2)
+
+            with self.captureOnCommitCallbacks(execute=True):
+                response = self.client.post(f"/api/admin/import/jobs/{job_id}/resume/")
+            self.assertEqual(response.status_code, 202)
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, ImportJob.Status.COMPLETED)
+        self.assertEqual(job.chunks_done, 3)
+        self.assertEqual(job.rows_processed, 5)
+        self.assertEqual(
+            (job.created, job.updated, job.skipped),
+            (3, 1, 1),
+        )
+
+        response = self.client.post(f"/api/admin/import/jobs/{job_id}/resume/")
+        self.assertEqual(response.status_code, 400)
+
+    def test_resume_only_claims_failed_or_stale_jobs(self):
+        with patch("app.import_jobs.executor.submit"):
+            job_id = self.start_job()
+        job = ImportJob.objects.get(pk=job_id)
+        self.assertEqual(job.status, ImportJob.Status.PENDING)
+
+        # Sigue en cola: no se vuelve a encolar
+        response = self.client.post(f"/api/admin/import/jobs/{job_id}/resume/")
+        self.assertEqual(response.status_code, 400)
+
+        # En proceso en otro worker, con avance reciente
+        ImportJob.objects.filter(pk=job_id).update(
+            status=ImportJob.Status.RUNNING, updated_at=timezone.now()
+        )
+        response = self.client.post(f"/api/admin/import/jobs/{job_id}/resume/")
+        self.assertEqual(response.status_code, 400)
+
+        # El worker se detuvo sin marcarlo: se reanuda
+        ImportJob.objects.filter(pk=job_id).update(
+            updated_at=timezone.now() - timedelta(seconds=settings.IMPORT_JOB_STALE_AFTER + 1)
+        )
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(f"/api/admin/import/jobs/{job_id}/resume/")
+        self.assertEqual(response.status_code, 202)
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, ImportJob.Status.COMPLETED)
+        self.assertEqual(job.rows_processed, 5)
+
+    def test_worker_skips_jobs_it_did_not_claim(self):
+        with patch("app.import_jobs.executor.submit"):
+            job_id = self.start_job()
+        ImportJob.objects.filter(pk=job_id).update(status=ImportJob.Status.RUNNING)
+
+        run_import_job(job_id)
+
+        job = ImportJob.objects.get(pk=job_id)
+        self.assertEqual(job.chunks_done, 0)
+        self.assertFalse(Product.objects.filter(sku="SKU-400").exists())
+
+    def test_uploaded_file_uses_imports_storage(self):
+        with patch.object(ProductImporter, "import_frame", side_effect=RuntimeError("falla")):
+            job_id = self.start_job()
+
+        job = ImportJob.objects.get(pk=job_id)
+        self.assertTrue(job.file.path.startswith(self.jobs_root))
+        self.assertTrue(os.path.exists(job.file.path))
+
+
+MEDIA_TMP = tempfile.mkdtemp(prefix="media-")
+
+
+def image_bytes(image_format="JPEG", color="red"):
+    from PIL import Image
+
+    buffer = BytesIO()
+    Image.new("RGB", (8, 8), color).save(buffer, format=image_format)
+    return buffer.getvalue()
+
+
+@override_settings(
+    ALLOWED_HOSTS=["testserver", "localhost", "127.0.0.1"],
+    STORAGES={
+        **settings.STORAGES,
+        "default": {
+            "BACKEND": "django.core.files.storage.FileSystemStorage",
+            "OPTIONS": {"location": MEDIA_TMP},
+        },
+    },
+)
+class ProductImageImportTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(
+            username="staff-images",
+            email="images@castromonte.com",
+            password="Admin12345!",
+            role=User.Role.ADMIN,
+            is_staff=True,
+            is_active=True,
+        )
+        self.client.force_authenticate(user=self.user)
+        self.vendor = Vendor.objects.create(name="Proveedor Imagenes")
+        self.pipeta = Product.objects.create(
+            vendor=self.vendor, name="Pipeta", sku="PIP-100", price="10.00"
+        )
+        self.matraz = Product.objects.create(
+            vendor=self.vendor, name="Matraz", sku="MAT_200", price="20.00"
+        )
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(MEDIA_TMP, ignore_errors=True)
+
+    def upload(self, files, name="imagenes.zip"):
+        buffer = BytesIO()
+        with zipfile.ZipFile(buffer, "w") as archive:
+            for filename, data in files.items():
+                archive.writestr(filename, data)
+
+        return self.client.post(
+            "/api/admin/import/images/",
+            {"file": SimpleUploadedFile(name, buffer.getvalue(), content_type="application/zip")},
+            format="multipart",
+        )
+
+    def test_zip_creates_images_and_reports_unmatched_files(self):
+        response = self.upload({
+            "fotos/PIP-100_2.jpg": image_bytes(color="green"),
+            "fotos/pip-100_main.png": image_bytes("PNG"),
+            "MAT_200.jpg": image_bytes(),
+            "MAT_200_3.jpg": image_bytes(color="blue"),
+            "NOEXISTE_main.jpg": image_bytes(),
+            "PIP-100_5.jpg": b"no es una imagen",
+            "leeme.txt": b"hola",
+            "__MACOSX/._PIP-100_2.jpg": b"",
+        })
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["created"], 4)
+        self.assertEqual(
+            {item["file"] for item in response.data["unmatched"]},
+            {"NOEXISTE_main.jpg", "PIP-100_5.jpg", "leeme.txt"},
+        )
+
+        pipeta_images = ProductImage.objects.filter(product=self.pipeta)
+        self.assertEqual(pipeta_images.count(), 2)
+        self.assertIn("pip-100_main", pipeta_images.get(is_main=True).image.name)
+
+        # Sin "_main": la principal es la de menor número (el SKU lleva "_")
+        matraz_images = ProductImage.objects.filter(product=self.matraz)
+        self.assertEqual(matraz_images.count(), 2)
+        self.assertNotIn("MAT_200_3", matraz_images.get(is_main=True).image.name)
+
+    def test_main_file_replaces_existing_main_image(self):
+        self.upload({"PIP-100.jpg": image_bytes()})
+        self.upload({"PIP-100_2.jpg": image_bytes(color="green")})
+
+        images = ProductImage.objects.filter(product=self.pipeta)
+        self.assertEqual(images.filter(is_main=True).count(), 1)
+        self.assertFalse(images.get(image__contains="PIP-100_2").is_main)
+
+        self.upload({"PIP-100_main.webp": image_bytes("WEBP")})
+
+        main = images.get(is_main=True)
+        self.assertIn("PIP-100_main", main.image.name)
+        self.assertEqual(images.count(), 3)
+
+    def test_rejects_files_that_are_not_zip(self):
+        response = self.client.post(
+            "/api/admin/import/images/",
+            {"file": SimpleUploadedFile("fotos.zip", b"no es zip")},
+            format="multipart",
+        )
+        self.assertEqual(response.status_code, 400)
+
+
+@override_settings(
+    ALLOWED_HOSTS=["testserver", "localhost", "127.0.0.1"],
+    STORAGES={
+        **settings.STORAGES,
+        "default": {
+            "BACKEND": "django.core.files.storage.FileSystemStorage",
+            "OPTIONS": {"location": MEDIA_TMP},
+        },
+    },
+    IMAGE_VARIANT_WIDTHS=[320, 640, 1024],
+    IMAGE_VARIANT_DEFAULT_WIDTH=640,
+)
+class ImageVariantTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(
+            username="staff-variants",
+            email="variants@castromonte.com",
+            password="Admin12345!",
+            role=User.Role.ADMIN,
+            is_staff=True,
+            is_active=True,
+        )
+        self.vendor = Vendor.objects.create(name="Proveedor Variantes")
+        self.product = Product.objects.create(
+            vendor=self.vendor, name="Microscopio", sku="MIC-100",
+            price="10.00", is_active=True,
+        )
+
+    def upload_image(self, size=(2000, 1000), name="microscopio.jpg", color="blue"):
+        from PIL import Image
+
+        buffer = BytesIO()
+        Image.new("RGB", size, color).save(buffer, format="JPEG")
+        return SimpleUploadedFile(name, buffer.getvalue(), content_type="image/jpeg")
+
+    def test_upload_generates_variants_beside_original(self):
+        image = ProductImage.objects.create(
+            product=self.product, image=self.upload_image(), is_main=True
+        )
+        image.refresh_from_db()
+
+        storage = image.image.storage
+        self.assertEqual(image.variants["source"], image.image.name)
+        self.assertEqual(set(image.variants["webp"]), {"320", "640", "1024"})
+        for name in [*image.variants["webp"].values(), *image.variants["jpeg"].values()]:
+            self.assertTrue(name.startswith("products/microscopio"))
+            self.assertTrue(storage.exists(name))
+
+        from PIL import Image
+
+        with storage.open(image.variants["webp"]["320"]) as file:
+            self.assertEqual(Image.open(file).size, (320, 160))
+
+    def test_small_images_are_not_upscaled(self):
+        image = ProductImage.objects.create(
+            product=self.product, image=self.upload_image(size=(400, 300))
+        )
+        image.refresh_from_db()
+        self.assertEqual(set(image.variants["jpeg"]), {"320", "400"})
+
+    def test_serializers_expose_srcset_and_hide_original(self):
+        image = ProductImage.objects.create(
+            product=self.product, image=self.upload_image(), is_main=True
+        )
+        image.refresh_from_db()
+
+        response = self.client.get("/api/products/")
+        card = response.data["results"][0]
+        self.assertTrue(card["main_image"].endswith("_w640.jpg"))
+        self.assertEqual(
+            list(card["main_image_srcset"]["webp"]), ["320w", "640w", "1024w"]
+        )
+
+        response = self.client.get("/api/products/?original=true")
+        self.assertEqual(response.data["results"][0]["main_image"], image.image.url)
+
+        self.vendor.logo = self.upload_image(name="logo.jpg")
+        self.vendor.save()
+        response = self.client.get("/api/vendors/")
+        vendor = response.data["results"][0]
+        self.assertTrue(vendor["logo"].startswith("http://testserver/"))
+        self.assertTrue(vendor["logo"].endswith("_w640.jpg"))
+        self.assertIn("320w", vendor["logo_srcset"]["webp"])
+        self.assertNotIn("logo_variants", vendor)
+
+    def test_replacing_image_regenerates_variants(self):
+        image = ProductImage.objects.create(
+            product=self.product, image=self.upload_image()
+        )
+        old_variants = image.variants
+        storage = image.image.storage
+
+        image.image = self.upload_image(name="nuevo.jpg", color="green")
+        image.save()
+
+        self.assertTrue(image.variants["jpeg"]["320"].startswith("products/nuevo"))
+        self.assertFalse(storage.exists(old_variants["jpeg"]["320"]))
+
+    def test_command_backfills_images_without_variants(self):
+        image = ProductImage.objects.create(
+            product=self.product, image=self.upload_image()
+        )
+        ProductImage.objects.filter(pk=image.pk).update(variants={})
+
+        call_command("generate_image_variants", "--model", "productimage", stdout=StringIO())
+        image.refresh_from_db()
+        self.assertEqual(set(image.variants["webp"]), {"320", "640", "1024"})
+
+    def test_zip_import_creates_variants(self):
+        self.client.force_authenticate(user=self.user)
+        buffer = BytesIO()
+        with zipfile.ZipFile(buffer, "w") as archive:
+            archive.writestr("MIC-100_main.jpg", self.upload_image().read())
+
+        response = self.client.post(
+            "/api/admin/import/images/",
+            {"file": SimpleUploadedFile("fotos.zip", buffer.getvalue())},
+            format="multipart",
+        )
+
+        self.assertEqual(response.status_code, 200)
+        image = ProductImage.objects.get(product=self.product)
+        self.assertEqual(set(image.variants["jpeg"]), {"320", "640", "1024"})
+
+
+@override_settings(
+    ALLOWED_HOSTS=["testserver", "localhost", "127.0.0.1"],
+    STORAGES={
+        **settings.STORAGES,
+        "default": {
+            "BACKEND": "django.core.files.storage.FileSystemStorage",
+            "OPTIONS": {"location": MEDIA_TMP},
+        },
+    },
+    IMAGE_VARIANT_WIDTHS=[320],
+)
+class ImageDedupTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(
+            username="staff-dedup",
+            email="dedup@castromonte.com",
+            password="Admin12345!",
+            role=User.Role.ADMIN,
+            is_staff=True,
+            is_active=True,
+        )
+        self.client.force_authenticate(user=self.user)
+        self.vendor = Vendor.objects.create(name="Proveedor Dedup")
+        self.products = [
+            Product.objects.create(
+                vendor=self.vendor, name=f"Bureta {index}",
+                sku=f"BUR-{index}", price="10.00",
+            )
+            for index in range(3)
+        ]
+
+    def upload(self, product, data, name="bureta.jpg"):
+        return self.client.post(
+            f"/api/admin/products/{product.pk}/images/",
+            {"image": SimpleUploadedFile(name, data, content_type="image/jpeg")},
+            format="multipart",
+        )
+
+    def test_repeated_upload_reuses_stored_file_and_variants(self):
+        data = image_bytes(color="navy")
+        self.assertEqual(self.upload(self.products[0], data).status_code, 201)
+
+        with patch.object(
+            ProductImage._meta.get_field("image").storage.__class__, "save"
+        ) as save:
+            self.assertEqual(self.upload(self.products[1], data, "otra.jpg").status_code, 201)
+        save.assert_not_called()
+
+        first, second = ProductImage.objects.filter(
+            product__in=self.products[:2]
+        ).order_by("product__sku")
+        self.assertEqual(first.image.name, second.image.name)
+        self.assertEqual(first.variants, second.variants)
+        self.assertEqual(first.content_hash, second.content_hash)
+
+        # Cambiar la imagen de una fila no borra las variantes compartidas
+        storage = first.image.storage
+        second.image = SimpleUploadedFile("nueva.jpg", image_bytes(color="olive"))
+        second.save()
+        self.assertTrue(storage.exists(first.variants["jpeg"]["8"]))
+
+    def test_repointing_to_a_stored_file_deletes_the_old_variants(self):
+        stored = image_bytes(color="navy")
+        self.upload(self.products[0], stored)
+        self.upload(self.products[1], image_bytes(color="olive"))
+        image = ProductImage.objects.get(product=self.products[1])
+        storage = image.image.storage
+        old_variants = image.variants
+        self.assertTrue(storage.exists(old_variants["jpeg"]["8"]))
+
+        image.image = SimpleUploadedFile("repetida.jpg", stored)
+        with self.captureOnCommitCallbacks(execute=True):
+            image.save()
+
+        self.assertEqual(
+            image.image.name,
+            ProductImage.objects.get(product=self.products[0]).image.name,
+        )
+        self.assertFalse(storage.exists(old_variants["jpeg"]["8"]))
+        self.assertTrue(storage.exists(image.variants["jpeg"]["8"]))
+
+    def test_forced_regeneration_builds_shared_files_once(self):
+        from . import image_variants
+
+        data = image_bytes(color="navy")
+        self.upload(self.products[0], data)
+        self.upload(self.products[1], data)
+        self.upload(self.products[2], image_bytes(color="olive"))
+        old = {image.pk: image.variants for image in ProductImage.objects.all()}
+        storage = ProductImage.objects.first().image.storage
+
+        with patch.object(
+            image_variants, "build_variants", wraps=image_variants.build_variants
+        ) as build:
+            call_command(
+                "generate_image_variants", "--model", "productimage", "--force",
+                stdout=StringIO(),
+            )
+
+        self.assertEqual(build.call_count, 2)
+        first, second, third = ProductImage.objects.order_by("product__sku")
+        self.assertEqual(first.variants, second.variants)
+        self.assertNotEqual(first.variants, old[first.pk])
+        for variants in old.values():
+            self.assertFalse(storage.exists(variants["jpeg"]["8"]))
+        for image in (first, third):
+            self.assertTrue(storage.exists(image.variants["jpeg"]["8"]))
+
+    def test_zip_reuses_files_already_stored(self):
+        data = image_bytes(color="teal")
+        self.upload(self.products[0], data)
+
+        buffer = BytesIO()
+        with zipfile.ZipFile(buffer, "w") as archive:
+            archive.writestr("BUR-0_2.jpg", data)
+            archive.writestr("BUR-1.jpg", data)
+            archive.writestr("BUR-2.jpg", image_bytes(color="maroon"))
+            archive.writestr("BUR-2_2.jpg", image_bytes(color="maroon"))
+
+        response = self.client.post(
+            "/api/admin/import/images/",
+            {"file": SimpleUploadedFile("fotos.zip", buffer.getvalue())},
+            format="multipart",
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["created"], 4)
+        self.assertEqual(response.data["uploaded"], 1)
+        self.assertEqual(
+            ProductImage.objects.values("image").distinct().count(), 2
+        )
+
+    def test_report_command_shows_savings_and_legacy_duplicates(self):
+        data = image_bytes(color="purple")
+        self.upload(self.products[0], data)
+        self.upload(self.products[1], data)
+
+        # Copias subidas antes de deduplicar: dos archivos iguales, sin hash
+        storage = ProductImage._meta.get_field("image").storage
+        ProductImage.objects.bulk_create([
+            ProductImage(
+                product=self.products[2],
+                image=storage.save(f"products/{name}", ContentFile(image_bytes(color="gray"))),
+            )
+            for name in ("legacy.jpg", "legacy-copia.jpg")
+        ])
+
+        out = StringIO()
+        call_command("image_dedup_report", "--backfill", stdout=out)
+        output = out.getvalue()
+
+        self.assertIn("Hashes calculados: 2", output)
+        self.assertIn("Imágenes: 4", output)
+        self.assertIn("Filas que reutilizan un archivo: 1", output)
+        self.assertIn("Copias duplicadas anteriores a la deduplicación: 1", output)
+        self.assertNotIn("sin hash", output)
+
+
+@override_settings(ALLOWED_HOSTS=["testserver", "localhost", "127.0.0.1"])
+class PublicProductPaginationTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.vendor = Vendor.objects.create(name="Proveedor Publico")
+
+        for index in range(13):
+            Product.objects.create(
+                vendor=self.vendor,
+                name=f"Producto publico {index}",
+                sku=f"PUB-{index:03}",
+                description="Producto para prueba de paginacion publica",
+                technical_specs={"orden": index},
+                price="10.00",
+                is_active=True,
+            )
+
+    def test_public_products_returns_twelve_items_per_page(self):
+        response = self.client.get("/api/products/")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["count"], 13)
+        self.assertEqual(len(response.data["results"]), 12)
+
+    def test_public_products_cursor_mode_walks_whole_catalog(self):
+        response = self.client.get("/api/products/?pagination=cursor")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["count"], 13)
+        self.assertEqual(len(response.data["results"]), 12)
+        self.assertIn("cursor=", response.data["next"])
+
+        second = self.client.get(response.data["next"])
+
+        self.assertEqual(second.status_code, 200)
+        self.assertEqual(len(second.data["results"]), 1)
+        self.assertIsNone(second.data["next"])
+
+        seen = {
+            item["id"]
+            for item in response.data["results"] + second.data["results"]
+        }
+        self.assertEqual(len(seen), 13)
+
+    def test_public_products_count_is_cached_until_catalog_changes(self):
+        self.client.get("/api/products/")
+
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get("/api/products/")
+        self.assertEqual(response.data["count"], 13)
+        self.assertFalse(
+            any("COUNT(" in query["sql"] for query in context.captured_queries)
+        )
+
+        Product.objects.create(
+            vendor=self.vendor,
+            name="Producto publico nuevo",
+            description="Producto nuevo",
+            price="10.00",
+        )
+        response = self.client.get("/api/products/")
+        self.assertEqual(response.data["count"], 14)
+
+    def test_public_products_rejects_invalid_cursor(self):
+        response = self.client.get("/api/products/?cursor=no-es-un-cursor")
+
+        self.assertEqual(response.status_code, 404)
+
+
+@override_settings(ALLOWED_HOSTS=["testserver", "localhost", "127.0.0.1"])
+class PublicProductQueryCountTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.vendor = Vendor.objects.create(name="Proveedor Consultas")
+        self.category = Category.objects.create(name="Vidrieria")
+
+    def create_products(self, total, offset=0):
+        for index in range(offset, offset + total):
+            product = Product.objects.create(
+                vendor=self.vendor,
+                category=self.category,
+                name=f"Matraz {index}",
+                sku=f"QRY-{index:03}",
+                description="Producto para prueba de consultas",
+                price="12.00",
+            )
+            ProductImage.objects.create(
+                product=product, image=f"products/matraz-{index}.jpg", is_main=True
+            )
+            ProductImage.objects.create(
+                product=product, image=f"products/matraz-{index}-b.jpg"
+            )
+
+    def count_queries(self, url):
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(context.captured_queries), response
+
+    def test_public_product_list_uses_fixed_number_of_queries(self):
+        self.create_products(2)
+        few_queries, _ = self.count_queries("/api/products/")
+
+        self.create_products(10, offset=2)
+        many_queries, response = self.count_queries("/api/products/")
+
+        # COUNT de la página, productos con categoría y proveedor (JOIN) e
+        # imágenes principales (prefetch), sin importar cuántos haya
+        self.assertEqual(few_queries, 3)
+        self.assertEqual(many_queries, 3)
+        self.assertEqual(len(response.data["results"]), 12)
+        first = response.data["results"][0]
+        self.assertTrue(first["main_image"].endswith(".jpg"))
+        self.assertNotIn("-b.jpg", first["main_image"])
+        self.assertEqual(first["category_name"], "Vidrieria")
+        self.assertEqual(first["vendor_name"], "Proveedor Consultas")
+
+    def test_public_list_returns_compact_cards_by_default(self):
+        self.create_products(1)
+
+        response = self.client.get("/api/products/")
+        card = response.data["results"][0]
+
+        self.assertIn("main_image", card)
+        for field in ["description", "technical_specs", "images"]:
+            self.assertNotIn(field, card)
+
+        detail = self.client.get(f"/api/products/{card['slug']}/")
+        self.assertEqual(len(detail.data["images"]), 2)
+        self.assertIn("description", detail.data)
+
+    def test_sparse_fields_skip_unrequested_relations(self):
+        self.create_products(3)
+
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get("/api/products/?fields=id,name,images")
+
+        self.assertEqual(set(response.data["results"][0]), {"id", "name", "images"})
+        self.assertEqual(len(response.data["results"][0]["images"]), 2)
+        sql = " ".join(query["sql"] for query in context.captured_queries)
+        self.assertNotIn('"app_category"', sql)
+        self.assertNotIn('"app_vendor"', sql)
+
+        response = self.client.get("/api/products/?omit=main_image,vendor_name")
+        self.assertNotIn("main_image", response.data["results"][0])
+        self.assertNotIn("vendor_name", response.data["results"][0])
+        self.assertIn("category_name", response.data["results"][0])
+
+    def test_unknown_sparse_fields_return_400(self):
+        self.create_products(2)
+        product = Product.objects.first()
+
+        for url in [
+            "/api/products/?fields=bogus",
+            "/api/products/?fields=id,bogus,otro",
+            "/api/products/?omit=bogus",
+            f"/api/products/{product.slug}/?fields=bogus",
+        ]:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 400, url)
+            self.assertIn("bogus", str(response.data["detail"]))
+            self.assertIn("name", response.data["available_fields"])
+
+        response = self.client.get("/api/products/?fields=id,bogus,otro")
+        self.assertEqual(str(response.data["detail"]), "Campos desconocidos: bogus, otro")
+
+    def test_admin_list_accepts_sparse_fields(self):
+        staff = User.objects.create_user(
+            username="staff-campos",
+            email="staff-campos@castromonte.com",
+            password="Admin12345!",
+            role=User.Role.STAFF,
+            is_staff=True,
+        )
+        self.client.force_authenticate(user=staff)
+        self.create_products(2)
+
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get("/api/admin/products/?fields=id,sku,name")
+
+        self.assertEqual(set(response.data["results"][0]), {"id", "sku", "name"})
+        sql = " ".join(query["sql"] for query in context.captured_queries)
+        self.assertNotIn('"app_productimage"', sql)
+
+    def test_cart_serialization_uses_fixed_number_of_queries(self):
+        self.create_products(12)
+        products = list(Product.objects.all())
+
+        for product in products[:2]:
+            self.client.post(
+                "/api/cart/",
+                {"product_id": str(product.id), "quantity": 1},
+                format="json",
+            )
+        few_queries, _ = self.count_queries("/api/cart/")
+
+        for product in products[2:]:
+            self.client.post(
+                "/api/cart/",
+                {"product_id": str(product.id), "quantity": 1},
+                format="json",
+            )
+        many_queries, response = self.count_queries("/api/cart/")
+
+        self.assertEqual(few_queries, many_queries)
+        self.assertEqual(len(response.data["items"]), 12)
+
+
+@override_settings(ALLOWED_HOSTS=["testserver", "localhost", "127.0.0.1"])
+class EffectivePriceTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.cheap = Product.objects.create(
+            name="Pipeta", description="Pipeta", price="5.00"
+        )
+        self.promo = Product.objects.create(
+            name="Balanza", description="Balanza", price="90.00", promo_price="40.00"
+        )
+        self.expensive = Product.objects.create(
+            name="Microscopio", description="Microscopio", price="70.00"
+        )
+
+    def result_names(self, params):
+        response = self.client.get("/api/products/", params)
+        self.assertEqual(response.status_code, 200)
+        return [item["name"] for item in response.data["results"]]
+
+    def test_public_catalog_filters_and_orders_by_effective_price(self):
+        self.assertEqual(
+            self.result_names({"ordering": "price"}),
+            ["Pipeta", "Balanza", "Microscopio"],
+        )
+        self.assertEqual(
+            self.result_names({"ordering": "-price", "max_price": "50"}),
+            ["Balanza", "Pipeta"],
+        )
+        self.assertEqual(
+            self.result_names({"min_price": "41", "max_price": "80"}),
+            ["Microscopio"],
+        )
+
+        response = self.client.get("/api/products/", {"min_price": "barato"})
+        self.assertEqual(response.status_code, 400)
+
+    def test_effective_price_stays_in_sync_on_bulk_operations(self):
+        Product.objects.filter(id=self.promo.id).update(promo_price=None)
+        self.promo.refresh_from_db()
+        self.assertEqual(str(self.promo.effective_price), "90.00")
+
+        Product.objects.filter(id=self.cheap.id).update(promo_price="3.50")
+        self.cheap.refresh_from_db()
+        self.assertEqual(str(self.cheap.effective_price), "3.50")
+
+        self.expensive.price = Decimal("65.00")
+        Product.objects.bulk_update([self.expensive], ["price"])
+        self.expensive.refresh_from_db()
+        self.assertEqual(str(self.expensive.effective_price), "65.00")
+
+        self.expensive.promo_price = Decimal("60.00")
+        self.expensive.save(update_fields=["promo_price"])
+        self.expensive.refresh_from_db()
+        self.assertEqual(str(self.expensive.effective_price), "60.00")
+
+        created = Product.objects.bulk_create([
+            Product(
+                name="Gradilla",
+                slug="gradilla",
+                description="Gradilla",
+                price=Decimal("12.00"),
+                promo_price=Decimal("0"),
+            )
+        ])
+        created[0].refresh_from_db()
+        self.assertEqual(str(created[0].effective_price), "12.00")
+
+
+class SlugAllocationTests(TestCase):
+    def test_save_takes_next_suffix_with_single_lookup(self):
+        for slug in ["matraz", "matraz-1", "matraz-2", "matraz-aforado"]:
+            Product.objects.create(name="Matraz", slug=slug, description="x", price="1.00")
+
+        product = Product(name="Matraz", description="x", price="1.00")
+        with CaptureQueriesContext(connection) as queries:
+            product.save()
+
+        self.assertEqual(product.slug, "matraz-3")
+        slug_lookups = [q for q in queries.captured_queries if "LIKE" in q["sql"]]
+        self.assertEqual(len(slug_lookups), 1)
+
+    def test_numeric_tail_in_title_is_not_a_suffix(self):
+        Product.objects.create(name="Matraz", description="x", price="1.00")
+        Product.objects.create(name="Matraz 250", description="x", price="1.00")
+        Product.objects.create(name="Matraz 250", description="x", price="1.00")
+
+        created = Product.objects.bulk_create([
+            Product(name="Matraz", description="x", price="1.00"),
+            Product(name="Matraz", description="x", price="1.00"),
+            Product(name="Matraz 250", description="x", price="1.00"),
+        ])
+
+        self.assertEqual(
+            [product.slug for product in created],
+            ["matraz-1", "matraz-2", "matraz-250-2"],
+        )
+
+    def test_lookup_ignores_slugs_that_only_share_the_prefix(self):
+        Product.objects.create(name="Kitchen", description="x", price="1.00")
+        Product.objects.create(name="Kit", description="x", price="1.00")
+
+        with CaptureQueriesContext(connection) as queries:
+            slugs = allocate_slugs(Product, ["Kit"])
+
+        self.assertEqual(slugs, ["kit-1"])
+        self.assertEqual(len(queries.captured_queries), 1)
+        sql = queries.captured_queries[0]["sql"]
+        self.assertIn("\"app_product\".\"slug\" = 'kit'", sql)
+        self.assertIn("LIKE 'kit-%'", sql)
+
+    def test_category_slug_respects_field_length(self):
+        category = Category.objects.create(name="Reactivos " * 10)
+        self.assertLessEqual(len(category.slug), 50)
+
+        other = Category.objects.create(name="Reactivos " * 10)
+        self.assertEqual(other.slug, f"{category.slug}-1")
+
+    def test_bulk_create_allocates_slugs_in_batch(self):
+        Product.objects.create(name="Pipeta", description="x", price="1.00")
+
+        with CaptureQueriesContext(connection) as queries:
+            created = Product.objects.bulk_create([
+                Product(name="Pipeta", description="x", price="1.00"),
+                Product(name="Pipeta", description="x", price="1.00"),
+                Product(name="Bureta", description="x", price="1.00"),
+            ])
+
+        self.assertEqual(
+            [product.slug for product in created],
+            ["pipeta-1", "pipeta-2", "bureta"],
+        )
+        slug_lookups = [q for q in queries.captured_queries if "LIKE" in q["sql"]]
+        self.assertEqual(len(slug_lookups), 1)
+
+    def test_save_retries_when_slug_is_taken_concurrently(self):
+        from . import slugs
+
+        Product.objects.create(name="Balanza", description="x", price="1.00")
+        allocate_slugs = slugs.allocate_slugs
+        calls = []
+
+        def stale_then_fresh(model, values):
+            # La primera consulta "no ve" el slug que otro proceso ya insertó
+            calls.append(values)
+            if len(calls) == 1:
+                return ["balanza"]
+            return allocate_slugs(model, values)
+
+        product = Product(name="Balanza", description="x", price="1.00")
+        with patch.object(slugs, "allocate_slugs", side_effect=stale_then_fresh):
+            product.save()
+
+        self.assertEqual(len(calls), 2)
+        self.assertEqual(product.slug, "balanza-1")
+
+
+@override_settings(ALLOWED_HOSTS=["testserver", "localhost", "127.0.0.1"])
+class ProductFacetTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.lab = Category.objects.create(name="Laboratorio")
+        self.glass = Category.objects.create(name="Vidrio", parent=self.lab)
+        self.optics = Category.objects.create(name="Optica")
+        self.vendor = Vendor.objects.create(name="Proveedor A")
+        self.other_vendor = Vendor.objects.create(name="Proveedor B")
+
+        for name, category, vendor, price in [
+            ("Matraz", self.glass, self.vendor, "20.00"),
+            ("Probeta", self.glass, self.vendor, "60.00"),
+            ("Mechero", self.lab, self.other_vendor, "120.00"),
+            ("Microscopio", self.optics, self.other_vendor, "1500.00"),
+        ]:
+            Product.objects.create(
+                name=name,
+                category=category,
+                vendor=vendor,
+                description=name,
+                price=price,
+            )
+
+    def test_facets_count_subtrees_vendors_and_price_ranges(self):
+        with self.assertNumQueries(3):
+            response = self.client.get("/api/products/facets/")
+
+        self.assertEqual(response.status_code, 200)
+        categories = {item["name"]: item["count"] for item in response.data["categories"]}
+        self.assertEqual(categories, {"Laboratorio": 3, "Vidrio": 2, "Optica": 1})
+
+        vendors = {item["name"]: item["count"] for item in response.data["vendors"]}
+        self.assertEqual(vendors, {"Proveedor A": 2, "Proveedor B": 2})
+
+        prices = [item["count"] for item in response.data["price_ranges"]]
+        self.assertEqual(prices, [1, 1, 1, 0, 0, 1])
+
+        with self.assertNumQueries(0):
+            self.client.get("/api/products/facets/")
+
+    def test_facets_apply_listing_filters(self):
+        response = self.client.get(
+            "/api/products/facets/",
+            {"category": str(self.lab.id), "max_price": "100"},
+        )
+
+        categories = {item["name"]: item["count"] for item in response.data["categories"]}
+        self.assertEqual(categories, {"Laboratorio": 2, "Vidrio": 2})
+        vendors = {item["name"]: item["count"] for item in response.data["vendors"]}
+        self.assertEqual(vendors, {"Proveedor A": 2})
+
+
+@override_settings(ALLOWED_HOSTS=["testserver", "localhost", "127.0.0.1"])
+class PublicResponseCacheTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.vendor = Vendor.objects.create(name="Proveedor Cache")
+        self.product = Product.objects.create(
+            vendor=self.vendor,
+            name="Bureta",
+            description="Bureta graduada",
+            price="30.00",
+        )
+
+    def test_repeated_requests_are_served_from_cache(self):
+        first = self.client.get("/api/products/?page=1&category=")
+        self.assertEqual(first["X-Cache"], "MISS")
+
+        with self.assertNumQueries(0):
+            second = self.client.get("/api/products/?page=1")
+
+        self.assertEqual(second["X-Cache"], "HIT")
+        self.assertEqual(second.data, first.data)
+
+    def test_related_model_changes_invalidate_cached_products(self):
+        self.client.get("/api/products/")
+
+        ProductImage.objects.create(
+            product=self.product, image="products/bureta.jpg", is_main=True
+        )
+        response = self.client.get("/api/products/")
+        self.assertEqual(response["X-Cache"], "MISS")
+        self.assertTrue(response.data["results"][0]["main_image"].endswith("bureta.jpg"))
+
+        self.vendor.name = "Proveedor Renombrado"
+        self.vendor.save()
+        response = self.client.get("/api/products/")
+        self.assertEqual(response["X-Cache"], "MISS")
+        self.assertEqual(
+            response.data["results"][0]["vendor_name"], "Proveedor Renombrado"
+        )
+
+    def test_content_blocks_are_cached_per_version(self):
+        block = ContentBlock.objects.create(
+            key="about", title="Nosotros", content="v1"
+        )
+        self.client.get("/api/content/")
+
+        response = self.client.get("/api/content/")
+        self.assertEqual(response["X-Cache"], "HIT")
+
+        block.delete()
+        response = self.client.get("/api/content/")
+        self.assertEqual(response["X-Cache"], "MISS")
+        self.assertEqual(response.data["count"], 0)
+
+
+@override_settings(ALLOWED_HOSTS=["testserver", "localhost", "127.0.0.1"])
+class ProductConditionalGetTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.product = Product.objects.create(
+            name="Probeta graduada",
+            description="Probeta de 100 ml",
+            price="9.00",
+        )
+        self.detail_url = f"/api/products/{self.product.slug}/"
+
+    def test_detail_returns_304_without_serializing(self):
+        response = self.client.get(self.detail_url)
+
+        self.assertEqual(response.status_code, 200)
+        etag = response["ETag"]
+        self.assertIn("Last-Modified", response)
+
+        with patch.object(
+            ProductSerializer, "to_representation", side_effect=AssertionError
+        ):
+            not_modified = self.client.get(self.detail_url, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(not_modified.status_code, 304)
+        self.assertEqual(not_modified["ETag"], etag)
+
+    def test_detail_etag_changes_with_product_and_images(self):
+        etag = self.client.get(self.detail_url)["ETag"]
+
+        ProductImage.objects.create(product=self.product, image="products/p.jpg")
+        response = self.client.get(self.detail_url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], etag)
+
+        etag = response["ETag"]
+        self.product.price = "11.00"
+        self.product.save()
+        response = self.client.get(self.detail_url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["price"], "11.00")
+
+    def test_list_honors_if_none_match(self):
+        response = self.client.get("/api/products/?page=1")
+        etag = response["ETag"]
+
+        not_modified = self.client.get("/api/products/?page=1", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(not_modified.status_code, 304)
+
+        other_page = self.client.get("/api/products/?search=probeta", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(other_page.status_code, 200)
+
+    def test_list_revalidates_after_rows_leave_the_listing(self):
+        Product.objects.create(name="Matraz aforado", price="12.00")
+        response = self.client.get("/api/products/")
+        self.assertNotIn("Last-Modified", response)
+        etag = response["ETag"]
+        since = http_date(time.time() + 60)
+
+        # Desactivar no aumenta el máximo updated_at de las filas visibles
+        self.product.is_active = False
+        self.product.save()
+
+        response = self.client.get("/api/products/", HTTP_IF_MODIFIED_SINCE=since)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["count"], 1)
+
+        response = self.client.get("/api/products/", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+
+@override_settings(ALLOWED_HOSTS=["testserver", "localhost", "127.0.0.1"])
+class PublicProductSearchTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.vendor = Vendor.objects.create(name="Proveedor Search")
+
+        self.name_match = Product.objects.create(
+            vendor=self.vendor,
+            name="Microscopio Analitico",
+            sku="BUS-001",
+            description="Equipo de laboratorio",
+            technical_specs={"tipo": "optico"},
+            price="20.00",
+            is_active=True,
+        )
+        Product.objects.create(
+            vendor=self.vendor,
+            name="Centrifuga Clinica",
+            sku="MICRO-002",
+            description="Incluye modulo para microscopio",
+            technical_specs={"tipo": "centrifuga"},
+            price="25.00",
+            is_active=True,
+        )
+
+    def test_public_search_filters_only_by_product_name(self):
+        response = self.client.get("/api/products/?search=microscopio")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["count"], 1)
+        self.assertEqual(response.data["results"][0]["id"], str(self.name_match.id))
+
+    def test_public_search_ignores_accents_and_matches_prefixes(self):
+        for query in ["analítico", "ANALITICO", "microsc anali"]:
+            response = self.client.get("/api/products/", {"search": query})
+
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response.data["count"], 1)
+            self.assertEqual(
+                response.data["results"][0]["id"], str(self.name_match.id)
+            )
+
+    def test_search_query_budget_and_ranking(self):
+        vendor = Vendor.objects.create(name="Refractometros del Sur")
+        in_description = Product.objects.create(
+            vendor=self.vendor, name="Lampara", sku="RNK-3",
+            description="Repuesto para refractometro", price="1.00",
+        )
+        in_vendor = Product.objects.create(
+            vendor=vendor, name="Prisma", sku="RNK-2",
+            description="Accesorio", price="1.00",
+        )
+        in_name = Product.objects.create(
+            vendor=self.vendor, name="Refractometro", sku="RNK-1",
+            description="Accesorio", price="1.00",
+        )
+        longer_name = Product.objects.create(
+            vendor=self.vendor, name="Funda de vinilo para refractometro portatil",
+            sku="RNK-4", description="Accesorio", price="1.00",
+        )
+
+        # Público: solo el nombre; bm25 prefiere el nombre más corto
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get("/api/products/", {"search": "refractometro"})
+        few_queries = len(queries.captured_queries)
+        self.assertEqual(
+            [item["id"] for item in response.data["results"]],
+            [str(in_name.id), str(longer_name.id)],
+        )
+
+        # Panel: nombre > proveedor > descripción (pesos de SEARCH_FIELDS)
+        staff = User.objects.create_user(
+            username="staff-rank",
+            email="staff-rank@castromonte.com",
+            password="Admin12345!",
+            role=User.Role.STAFF,
+            is_staff=True,
+        )
+        self.client.force_authenticate(user=staff)
+        response = self.client.get("/api/admin/products/", {"search": "refractometro"})
+        ids = [item["id"] for item in response.data["results"]]
+        self.assertEqual(ids[0], str(in_name.id))
+        self.assertLess(ids.index(str(in_vendor.id)), ids.index(str(in_description.id)))
+        self.client.force_authenticate(user=None)
+
+        Product.objects.bulk_create([
+            Product(
+                vendor=self.vendor, name=f"Tapa para refractometro modelo {index}",
+                sku=f"RNK-V{index}", price="1.00",
+            )
+            for index in range(20)
+        ])
+        # Como las cargas masivas: índice y versión de cache a mano
+        get_product_search().index(Product.objects.filter(sku__startswith="RNK-V"))
+        bump_cache_version("product")
+
+        # COUNT, página (MATCH + bm25) e imágenes: no crece con los resultados
+        self.assertEqual(few_queries, 3)
+        with self.assertNumQueries(few_queries):
+            response = self.client.get("/api/products/", {"search": "refractometro"})
+        self.assertEqual(response.data["count"], 22)
+        self.assertEqual(response.data["results"][0]["id"], str(in_name.id))
+
+        # Sin palabras no se consulta la base
+        with self.assertNumQueries(0):
+            response = self.client.get("/api/products/", {"search": "***"})
+        self.assertEqual(response.data["count"], 0)
+
+    def test_search_without_words_returns_empty_page(self):
+        for query in ["***", '""', "¿?", "- -"]:
+            response = self.client.get("/api/products/", {"search": query})
+
+            self.assertEqual(response.status_code, 200, query)
+            self.assertEqual(response.data["count"], 0)
+            self.assertEqual(response.data["results"], [])
+
+        staff = User.objects.create_user(
+            username="staff-empty-search",
+            email="staff-empty-search@castromonte.com",
+            password="Admin12345!",
+            role=User.Role.STAFF,
+            is_staff=True,
+        )
+        self.client.force_authenticate(user=staff)
+        response = self.client.get("/api/admin/products/", {"search": "***"})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["count"], 0)
+
+    def test_public_search_orders_by_relevance(self):
+        Product.objects.create(
+            vendor=self.vendor,
+            name="Funda protectora antipolvo de vinilo para microscopio",
+            sku="BUS-003",
+            description="Accesorio",
+            price="5.00",
+            is_active=True,
+        )
+
+        response = self.client.get("/api/products/?search=microscopio")
+
+        self.assertEqual(response.data["count"], 2)
+        self.assertEqual(response.data["results"][0]["id"], str(self.name_match.id))
+
+    def test_admin_search_covers_sku_vendor_and_description(self):
+        staff = User.objects.create_user(
+            username="staff-search",
+            email="staff-search@castromonte.com",
+            password="Admin12345!",
+            role=User.Role.STAFF,
+            is_staff=True,
+        )
+        self.client.force_authenticate(user=staff)
+
+        response = self.client.get("/api/admin/products/?search=microscopio")
+        self.assertEqual(response.data["count"], 2)
+        self.assertEqual(response.data["results"][0]["id"], str(self.name_match.id))
+
+        self.vendor.name = "Óptica Andina"
+        self.vendor.save()
+
+        response = self.client.get("/api/admin/products/?search=optica")
+        self.assertEqual(response.data["count"], 2)
+
+        self.name_match.delete()
+        response = self.client.get("/api/admin/products/?search=optica")
+        self.assertEqual(response.data["count"], 1)
+
+
+@override_settings(ALLOWED_HOSTS=["testserver", "localhost", "127.0.0.1"])
+class CategoryHierarchyTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.staff = User.objects.create_user(
+            username="staff-categorias",
+            email="staff-categorias@castromonte.com",
+            password="Admin12345!",
+            role=User.Role.STAFF,
+            is_staff=True,
+        )
+
+        self.lab = Category.objects.create(name="Laboratorio")
+        self.glass = Category.objects.create(name="Vidrio", parent=self.lab)
+        self.flasks = Category.objects.create(name="Matraces", parent=self.glass)
+        self.optics = Category.objects.create(name="Optica")
+
+        self.deep_product = Product.objects.create(
+            category=self.flasks,
+            name="Matraz Erlenmeyer",
+            description="Vidrio borosilicato",
+            price="8.00",
+        )
+        self.optics_product = Product.objects.create(
+            category=self.optics,
+            name="Lupa",
+            description="Lupa de mano",
+            price="4.00",
+        )
+
+    def product_ids(self, category):
+        response = self.client.get("/api/products/", {"category": str(category.id)})
+        self.assertEqual(response.status_code, 200)
+        return {item["id"] for item in response.data["results"]}
+
+    def test_category_filter_covers_whole_subtree_in_one_query(self):
+        self.client.get("/api/products/", {"category": str(self.lab.id)})
+
+        with CaptureQueriesContext(connection) as context:
+            ids = self.product_ids(self.lab)
+
+        self.assertEqual(ids, {str(self.deep_product.id)})
+        self.assertFalse(
+            any(
+                query["sql"].startswith('SELECT "app_category"')
+                for query in context.captured_queries
+            )
+        )
+        self.assertEqual(self.product_ids(self.optics), {str(self.optics_product.id)})
+
+    def test_moving_category_updates_subtree_filters(self):
+        self.glass.parent = self.optics
+        self.glass.save()
+
+        self.assertEqual(self.product_ids(self.lab), set())
+        self.assertEqual(
+            self.product_ids(self.optics),
+            {str(self.deep_product.id), str(self.optics_product.id)},
+        )
+
+    def test_moving_category_invalidates_cached_subtree_count(self):
+        response = self.client.get("/api/products/", {"category": str(self.lab.id)})
+        self.assertEqual(response.data["count"], 1)
+
+        self.glass.parent = self.optics
+        self.glass.save()
+
+        response = self.client.get("/api/products/", {"category": str(self.lab.id)})
+        self.assertEqual(response.data["count"], 0)
+        response = self.client.get("/api/products/", {"category": str(self.optics.id)})
+        self.assertEqual(response.data["count"], 2)
+
+    def test_admin_rejects_moving_category_under_its_descendant(self):
+        self.client.force_authenticate(user=self.staff)
+
+        response = self.client.patch(
+            f"/api/admin/categories/{self.lab.id}/",
+            {"parent": str(self.flasks.id)},
+            format="json",
+        )
+
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("parent", response.data)
+
+    def test_admin_tree_returns_requested_subtree(self):
+        self.client.force_authenticate(user=self.staff)
+
+        response = self.client.get(f"/api/admin/categories/tree/?root={self.glass.id}")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data), 1)
+        self.assertEqual(response.data[0]["name"], "Vidrio")
+        self.assertEqual(response.data[0]["children"][0]["name"], "Matraces")
+        self.assertEqual(response.data[0]["children"][0]["products_count"], 1)
+
+    def test_admin_tree_rolls_up_subtree_counts_with_one_query(self):
+        self.client.force_authenticate(user=self.staff)
+        Product.objects.create(
+            category=self.glass,
+            name="Probeta",
+            description="Vidrio",
+            price="3.00",
+        )
+
+        with self.assertNumQueries(1):
+            response = self.client.get("/api/admin/categories/tree/")
+
+        self.assertEqual(response.status_code, 200)
+        nodes = {node["name"]: node for node in response.data}
+        lab = nodes["Laboratorio"]
+        glass = lab["children"][0]
+        flasks = glass["children"][0]
+
+        self.assertEqual(
+            (lab["products_count"], lab["subtree_products_count"]), (0, 2)
+        )
+        self.assertEqual(
+            (glass["products_count"], glass["subtree_products_count"]), (1, 2)
+        )
+        self.assertEqual(
+            (flasks["products_count"], flasks["subtree_products_count"]), (1, 1)
+        )
+        self.assertEqual(nodes["Optica"]["subtree_products_count"], 1)
+
+
+@override_settings(ALLOWED_HOSTS=["testserver", "localhost", "127.0.0.1"])
+class PublicCategoryTreeTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.lab = Category.objects.create(name="Laboratorio")
+        self.glass = Category.objects.create(name="Vidrio", parent=self.lab)
+        Category.objects.create(name="Matraces", parent=self.glass)
+        hidden = Category.objects.create(
+            name="Descontinuados", parent=self.lab, is_active=False
+        )
+        Category.objects.create(name="Oculta", parent=hidden)
+
+    def test_public_tree_is_built_once_and_served_from_cache(self):
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get("/api/categories/")
+        self.assertEqual(len(context.captured_queries), 1)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["count"], 1)
+        lab = response.data["results"][0]
+        self.assertEqual(lab["name"], "Laboratorio")
+        self.assertEqual([child["name"] for child in lab["children"]], ["Vidrio"])
+        self.assertEqual(lab["children"][0]["children"][0]["name"], "Matraces")
+
+        with self.assertNumQueries(0):
+            cached = self.client.get("/api/categories/")
+        self.assertEqual(cached.data, response.data)
+
+    def test_public_tree_is_invalidated_on_category_changes(self):
+        self.client.get("/api/categories/")
+
+        self.glass.name = "Vidrieria"
+        self.glass.save()
+        response = self.client.get("/api/categories/")
+        lab = response.data["results"][0]
+        self.assertEqual(lab["children"][0]["name"], "Vidrieria")
+
+        self.glass.delete()
+        response = self.client.get("/api/categories/")
+        self.assertEqual(response.data["results"][0]["children"], [])
+
+
+@override_settings(ALLOWED_HOSTS=["testserver", "localhost", "127.0.0.1"])
+class ProductAdminBulkDeleteTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(
+            username="admin-bulk-products",
+            email="admin-bulk-products@castromonte.com",
+            password="Admin12345!",
+            role=User.Role.ADMIN,
+            is_staff=True,
+            is_active=True,
+        )
+        self.client.force_authenticate(user=self.user)
+        self.vendor = Vendor.objects.create(name="Proveedor Bulk")
+
+    def create_products(self, count, prefix="BULK"):
+        products = Product.objects.bulk_create([
+            Product(
+                vendor=self.vendor, name=f"Producto {prefix} {index}",
+                sku=f"{prefix}-{index:04}", price="10.00",
+            )
+            for index in range(count)
+        ])
+        ProductImage.objects.bulk_create([
+            ProductImage(product=product, image="products/bulk.jpg", is_main=True)
+            for product in products
+        ])
+        get_product_search().index(products)
+        return products
+
+    def bulk_delete(self, ids):
+        return self.client.post(
+            "/api/admin/products/bulk-delete/", {"ids": ids}, format="json"
+        )
+
+    def test_bulk_delete_skips_protected_products_and_reports_missing(self):
+        free, in_cart, in_order = self.create_products(3)
+        CartItem.objects.create(
+            cart=Cart.objects.create(), product=in_cart,
+            quantity=1, price_snapshot="10.00",
+        )
+        order = Order.objects.create(user=self.user, total="10.00")
+        OrderItem.objects.create(order=order, product=in_order, quantity=1, price="10.00")
+        missing_id = "00000000-0000-0000-0000-000000000000"
+
+        response = self.bulk_delete([
+            str(free.id), str(in_cart.id), str(in_order.id), missing_id,
+        ])
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["deleted"], 1)
+        self.assertEqual(
+            [item["id"] for item in response.data["failed"]],
+            [str(in_cart.id), str(in_order.id)],
+        )
+        self.assertEqual(response.data["failed"][0]["name"], in_cart.name)
+        self.assertEqual(response.data["missing"], [missing_id])
+        self.assertEqual(
+            response.data["detail"],
+            "Eliminación masiva completada con observaciones.",
+        )
+
+        self.assertFalse(Product.objects.filter(id=free.id).exists())
+        self.assertFalse(ProductImage.objects.filter(product_id=free.id).exists())
+        self.assertEqual(Product.objects.filter(id__in=[in_cart.id, in_order.id]).count(), 2)
+
+        self.assertEqual(
+            list(get_product_search().search(Product.objects.all(), "BULK-0000")), []
+        )
+        self.assertEqual(
+            get_product_search().search(Product.objects.all(), "BULK-0001").count(), 1
+        )
+
+    def test_bulk_delete_statements_do_not_grow_with_rows(self):
+        few = [str(product.id) for product in self.create_products(25, "FEW")]
+        many = [str(product.id) for product in self.create_products(50, "MANY")]
+
+        def delete_and_count(ids):
+            with CaptureQueriesContext(connection) as queries:
+                self.assertEqual(self.bulk_delete(ids).data["deleted"], len(ids))
+            return len(queries.captured_queries)
+
+        with patch("app.signals.bump_cache_version") as per_row_bump, patch(
+            "app.deletions.bump_cache_version"
+        ) as bulk_bump:
+            few_queries = delete_and_count(few)
+            many_queries = delete_and_count(many)
+
+        # Todas las consultas (incluido el índice de búsqueda), no solo los
+        # DELETE de tablas del ORM
+        self.assertEqual(few_queries, many_queries)
+        per_row_bump.assert_not_called()
+        self.assertEqual(bulk_bump.call_count, 2)
+        self.assertEqual(Product.objects.count(), 0)
+        self.assertEqual(ProductImage.objects.count(), 0)
+
+    def test_bulk_delete_sends_delete_signals(self):
+        products = self.create_products(2)
+        deleted = []
+
+        def record(sender, instance, **kwargs):
+            deleted.append((sender, instance.pk))
+
+        post_delete.connect(record, weak=False)
+        self.addCleanup(post_delete.disconnect, record)
+
+        self.bulk_delete([str(product.id) for product in products])
+
+        self.assertEqual(
+            sorted(str(pk) for sender, pk in deleted if sender is Product),
+            sorted(str(product.id) for product in products),
+        )
+        self.assertEqual(sum(sender is ProductImage for sender, _ in deleted), 2)
+
+
+@override_settings(ALLOWED_HOSTS=["testserver", "localhost", "127.0.0.1"])
+class CartAdminBulkDeleteTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(
+            username="admin-carts",
+            email="admin-carts@castromonte.com",
+            password="Admin12345!",
+            role=User.Role.ADMIN,
+            is_staff=True,
+            is_active=True,
+        )
+        self.client.force_authenticate(user=self.user)
+
+        self.vendor = Vendor.objects.create(name="Proveedor Carritos")
+        self.product = Product.objects.create(
+            vendor=self.vendor,
+            name="Producto carrito",
+            sku="CART-001",
+            description="Producto para prueba de carritos",
+            technical_specs={"tipo": "demo"},
+            price="15.00",
+            created_by=self.user,
+        )
+
+        self.cart_one = Cart.objects.create(user=self.user)
+        self.cart_two = Cart.objects.create()
+
+        CartItem.objects.create(
+            cart=self.cart_one,
+            product=self.product,
+            quantity=2,
+            price_snapshot="15.00",
+        )
+        CartItem.objects.create(
+            cart=self.cart_two,
+            product=self.product,
+            quantity=1,
+            price_snapshot="15.00",
+        )
+
+    def test_cart_bulk_delete_removes_selected_carts(self):
+        response = self.client.post(
+            "/api/admin/carts/bulk-delete/",
+            {"ids": [str(self.cart_one.id), str(self.cart_two.id)]},
+            format="json",
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["deleted"], 2)
+        self.assertFalse(Cart.objects.filter(id=self.cart_one.id).exists())
+        self.assertFalse(Cart.objects.filter(id=self.cart_two.id).exists())
+        self.assertEqual(CartItem.objects.count(), 0)
+
+    def test_cart_bulk_delete_uses_set_based_queries(self):
+        extra = [Cart.objects.create() for _ in range(20)]
+        for cart in extra:
+            CartItem.objects.create(
+                cart=cart, product=self.product, quantity=1, price_snapshot="15.00",
+            )
+        missing_id = "00000000-0000-0000-0000-000000000000"
+
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.post(
+                "/api/admin/carts/bulk-delete/",
+                {"ids": [str(cart.id) for cart in extra] + [missing_id]},
+                format="json",
+            )
+
+        self.assertEqual(response.data["deleted"], 20)
+        self.assertEqual(response.data["missing"], [missing_id])
+        self.assertLess(len(context), 10)
+        self.assertEqual(Cart.objects.count(), 2)
+        self.assertEqual(CartItem.objects.count(), 2)
+
+    def test_cart_admin_list_is_paginated(self):
+        response = self.client.get("/api/admin/carts/?page_size=1")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["count"], 2)
+        self.assertEqual(len(response.data["results"]), 1)
+        self.assertIsNotNone(response.data["next"])
+
+    def test_cleanup_guest_carts_removes_only_inactive_guest_carts(self):
+        cutoff_date = timezone.now() - timedelta(days=2)
+
+        recent_item_cart = Cart.objects.create()
+        recent_item = CartItem.objects.create(
+            cart=recent_item_cart,
+            product=self.product,
+            quantity=1,
+            price_snapshot="15.00",
+        )
+
+        old_user_cart = Cart.objects.create(user=self.user)
+        old_user_item = CartItem.objects.create(
+            cart=old_user_cart,
             product=self.product,
             quantity=1,
             price_snapshot="15.00",
@@ -389,12 +2529,67 @@ class CartAdminBulkDeleteTests(TestCase):
             updated_at=cutoff_date,
         )
 
-        call_command("cleanup_guest_carts")
+        call_command("cleanup_guest_carts", stdout=StringIO())
 
         self.assertFalse(Cart.objects.filter(id=self.cart_two.id).exists())
         self.assertTrue(Cart.objects.filter(id=recent_item_cart.id).exists())
         self.assertTrue(Cart.objects.filter(id=old_user_cart.id).exists())
 
+    def create_stale_guest_carts(self, count):
+        cutoff_date = timezone.now() - timedelta(days=2)
+        carts = [Cart.objects.create() for _ in range(count)]
+        for cart in carts:
+            CartItem.objects.create(
+                cart=cart, product=self.product, quantity=1, price_snapshot="15.00",
+            )
+        Cart.objects.filter(id__in=[cart.id for cart in carts]).update(
+            created_at=cutoff_date, updated_at=cutoff_date,
+        )
+        CartItem.objects.filter(cart__in=carts).update(
+            created_at=cutoff_date, updated_at=cutoff_date,
+        )
+        return carts
+
+    def test_cleanup_guest_carts_deletes_in_batches_and_reports_rate(self):
+        carts = self.create_stale_guest_carts(5)
+        out = StringIO()
+
+        with CaptureQueriesContext(connection) as context:
+            call_command("cleanup_guest_carts", "--batch-size", "2", stdout=out)
+
+        self.assertFalse(Cart.objects.filter(id__in=[cart.id for cart in carts]).exists())
+        self.assertTrue(Cart.objects.filter(id=self.cart_two.id).exists())
+        self.assertIn("5 carrito(s) invitado(s) eliminados.", out.getvalue())
+        self.assertIn("5 item(s) eliminados", out.getvalue())
+        self.assertIn("filas/s", out.getvalue())
+
+        queries = [query["sql"] for query in context.captured_queries]
+        # 3 bloques con datos + 1 vacío, cada uno en su transacción
+        selects = [
+            sql for sql in queries
+            if sql.startswith('SELECT "app_cart"."id"') and " LIMIT " in sql
+        ]
+        self.assertEqual(len(selects), 4)
+        # Cada bloque sigue desde la última clave (updated_at, id)
+        self.assertIn('"app_cart"."updated_at" > ', selects[1])
+        # Los ítems se borran en un DELETE por bloque, sin cargarlos
+        self.assertFalse(
+            [sql for sql in queries if sql.startswith('SELECT "app_cartitem"')]
+        )
+        self.assertEqual(
+            len([sql for sql in queries if sql.startswith('DELETE FROM "app_cartitem"')]),
+            3,
+        )
+
+    def test_cleanup_guest_carts_stops_at_max_runtime(self):
+        carts = self.create_stale_guest_carts(3)
+        out = StringIO()
+
+        call_command("cleanup_guest_carts", "--max-runtime", "0", stdout=out)
+
+        self.assertEqual(Cart.objects.filter(id__in=[cart.id for cart in carts]).count(), 3)
+        self.assertIn("--max-runtime", out.getvalue())
+
 
 class SessionLifetimeTests(TestCase):
     def test_refresh_token_lasts_three_days(self):
@@ -0,0 +1,9 @@
+import unicodedata
+
+
+def normalize(text):
+    text = str(text).strip().lower()
+    return ''.join(
+        c for c in unicodedata.normalize('NFD', text)
+        if unicodedata.category(c) != 'Mn'
+    )
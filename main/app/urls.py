@@ -2,7 +2,7 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
 from rest_framework_nested import routers
-from .import_view import AdminImportView
+from .import_view import AdminImageImportView, AdminImportView, ImportJobViewSet
 
 from .views import (
     CategoryViewSet, CategoryAdminViewSet,
@@ -29,6 +29,7 @@ router.register("cart-items", CartItemViewSet, basename="cart-items")
 router.register("admin/staff", StaffAdminViewSet, basename="admin-staff")
 router.register("vendors", VendorPublicViewSet, basename="vendors")
 router.register("admin/carts", CartAdminViewSet, basename="admin-carts")
+router.register("admin/import/jobs", ImportJobViewSet, basename="admin-import-jobs")
 
 # Rutas anidadas para ProductImage
 products_router = routers.NestedDefaultRouter(router,"admin/products",lookup="product")
@@ -43,4 +44,5 @@ urlpatterns = [
     path("admin/dashboard/", AdminDashboardView.as_view(), name="admin-dashboard"),
     path("payments/culqi/charge/", CulqiChargeView.as_view()),
     path("admin/import/", AdminImportView.as_view()),
+    path("admin/import/images/", AdminImageImportView.as_view()),
 ]
@@ -1,19 +1,20 @@
 # app/views.py
 import os
+import uuid
+from decimal import Decimal, InvalidOperation
 from rest_framework.viewsets import ReadOnlyModelViewSet, ModelViewSet
-from rest_framework.permissions import AllowAny, IsAuthenticated
+from rest_framework.permissions import SAFE_METHODS, AllowAny, IsAuthenticated
 from rest_framework.response import Response
 from rest_framework import serializers, status
 from rest_framework.parsers import MultiPartParser, FormParser
 from rest_framework.decorators import action
-from rest_framework.exceptions import ValidationError
+from rest_framework.exceptions import NotFound, ValidationError
 from rest_framework_simplejwt.views import TokenObtainPairView
 from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
 from rest_framework_simplejwt.tokens import RefreshToken
 from django.utils.text import slugify
-from django.db.models import Count, Sum, Q, Max
+from django.db.models import Count, F, Max, Q, Sum, prefetch_related_objects
 from rest_framework.views import APIView
-from rest_framework.pagination import PageNumberPagination
 from django.utils import timezone
 from rest_framework.generics import CreateAPIView
 from django.contrib.auth import get_user_model
@@ -28,16 +29,29 @@ from django.conf import settings
 import requests
 
 from .models import (
-    User, Category, Vendor, Product, ProductImage,
+    User, Category, CategoryClosure, Vendor, Product, ProductImage,
     Cart, Order, Banner, ContentBlock, CartItem, OrderItem
 )
 from .serializers import (
     UserSerializer, CategorySerializer, CategoryTreeSerializer, CategoryAdminSerializer,
-    VendorSerializer, ProductSerializer, ProductAdminSerializer, ProductImageSerializer,
+    VendorSerializer, ProductSerializer, ProductCardSerializer, ProductAdminSerializer,
+    ProductImageSerializer, SparseFieldsetMixin,
     CartSerializer, OrderSerializer, OrderAdminSerializer, BannerSerializer,
     ContentBlockSerializer, ClientRegisterSerializer, AddToCartSerializer, CartItemSerializer,
     StaffCreateSerializer, ProductImageCreateSerializer, BannerCreateUpdateSerializer,
-    CartAdminSerializer, CategoryPublicTreeSerializer
+    CartAdminSerializer, CategoryPublicTreeSerializer, GuestCartSerializer
+)
+from .cache_utils import (
+    CachedResponseMixin,
+    ConditionalResponseMixin,
+    build_etag,
+    normalized_query_params,
+    response_cache_stats,
+)
+from .categories import (
+    build_category_tree,
+    get_public_category_tree,
+    rollup_products_count,
 )
 from .auth_utils import (
     find_user_by_email,
@@ -45,20 +59,88 @@ from .auth_utils import (
     merge_session_cart_to_user,
     verify_google_credential,
 )
+from .pagination import (
+    CartAdminPagination,
+    PublicProductCursorPagination,
+    PublicProductPagination,
+)
+from .deletions import delete_carts, delete_products
+from .guest_carts import get_guest_cart_store
 from .permissions import IsAdmin, IsStaff, IsStaffOrReadOnly, IsClient
+from .search import search_products
 
 
 User = get_user_model()
 
 
-class PublicProductPagination(PageNumberPagination):
-    page_size = 12
+def product_related_lookups(prefix=""):
+    """
+    Relaciones que ProductSerializer necesita, con el prefijo de la
+    relación que lo anida (ej. "cartitem_set__product__").
+    """
+    return [
+        f"{prefix}{field}"
+        for field in ("category", "vendor", "productimage_set")
+    ]
+
+def filter_price_range(queryset, params):
+    """
+    Aplica ?min_price= / ?max_price= sobre effective_price.
+    """
+    for param, lookup in (("min_price", "gte"), ("max_price", "lte")):
+        value = params.get(param)
+        if not value:
+            continue
+
+        try:
+            value = Decimal(value)
+        except InvalidOperation:
+            value = None
+
+        if value is None or not value.is_finite():
+            raise ValidationError({param: "Precio inválido."})
+
+        queryset = queryset.filter(**{f"effective_price__{lookup}": value})
+
+    return queryset
+
+
+class SparseFieldsViewMixin:
+    """
+    Pasa ?fields= / ?omit= (separados por coma) al serializer en lecturas.
+    Los nombres que el serializer no tiene responden 400.
+    """
+
+    def get_sparse_fields(self):
+        if self.request.method not in SAFE_METHODS:
+            return {}
 
+        params = self.request.query_params
+        sparse = {
+            "fields": SparseFieldsetMixin.parse_field_list(params.get("fields")),
+            "omit": SparseFieldsetMixin.parse_field_list(params.get("omit")),
+        }
 
-class CartAdminPagination(PageNumberPagination):
-    page_size = 10
-    page_size_query_param = "page_size"
-    max_page_size = 100
+        serializer_class = self.get_serializer_class()
+        unknown = serializer_class.unknown_field_names(**sparse)
+        if unknown:
+            raise ValidationError({
+                "detail": f"Campos desconocidos: {', '.join(unknown)}",
+                "available_fields": list(serializer_class.Meta.fields),
+            })
+        return sparse
+
+    def get_serializer(self, *args, **kwargs):
+        kwargs.update(self.get_sparse_fields())
+        return super().get_serializer(*args, **kwargs)
+
+    def optimize_queryset(self, queryset):
+        """
+        Carga solo las relaciones de los campos que se van a devolver.
+        """
+        return self.get_serializer_class().optimize_queryset(
+            queryset, **self.get_sparse_fields()
+        )
 
 # ======================
 # CATEGORY
@@ -68,6 +150,26 @@ class CategoryViewSet(ReadOnlyModelViewSet):
     serializer_class = CategoryPublicTreeSerializer
     permission_classes = [AllowAny]
 
+    # El árbol sale de cache; solo se consulta la BD al invalidarse
+    def list(self, request, *args, **kwargs):
+        tree = get_public_category_tree()
+        page = self.paginate_queryset(tree)
+        if page is not None:
+            return self.get_paginated_response(page)
+        return Response(tree)
+
+    def retrieve(self, request, *args, **kwargs):
+        node = next(
+            (
+                node for node in get_public_category_tree()
+                if node["id"] == str(kwargs.get("pk"))
+            ),
+            None,
+        )
+        if node is None:
+            raise NotFound()
+        return Response(node)
+
 class CategoryAdminViewSet(ModelViewSet):
     queryset = Category.objects.all()
     serializer_class = CategoryAdminSerializer
@@ -82,12 +184,25 @@ class CategoryAdminViewSet(ModelViewSet):
 
     @action(detail=False, methods=["get"], url_path="tree")
     def tree(self, request):
-        queryset = (
-            Category.objects
-            .filter(parent__isnull=True)
-            .annotate(products_count=Count("product"))
-        )
-        serializer = CategoryTreeSerializer(queryset, many=True)
+        """
+        Árbol completo, o solo el subárbol de ?root=<id>. Los conteos
+        directos salen de una sola consulta agrupada y los del subárbol
+        se suman en memoria.
+        """
+        queryset = Category.objects.annotate(products_count=Count("product"))
+
+        root_id = request.query_params.get("root")
+        if root_id:
+            try:
+                root_id = uuid.UUID(root_id)
+            except ValueError:
+                raise ValidationError({"root": "ID de categoría inválido."})
+
+            queryset = queryset.filter(id__in=CategoryClosure.subtree_ids(root_id))
+
+        roots = build_category_tree(queryset, root_id=root_id or None)
+        rollup_products_count(roots)
+        serializer = CategoryTreeSerializer(roots, many=True)
         return Response(serializer.data)
 
 
@@ -114,40 +229,198 @@ class VendorAdminViewSet(ModelViewSet):
 # PRODUCT
 # ======================
 # views.py
-class ProductViewSet(ReadOnlyModelViewSet):
+class ProductViewSet(
+    ConditionalResponseMixin,
+    CachedResponseMixin,
+    SparseFieldsViewMixin,
+    ReadOnlyModelViewSet,
+):
     serializer_class = ProductSerializer
     permission_classes = [AllowAny]
+    cache_versions = ("product", "productimage", "category", "vendor")
     lookup_field = "slug"
     pagination_class = PublicProductPagination
+    cursor_pagination_class = PublicProductCursorPagination
+    public_orderings = {
+        "price": ("effective_price", "id"),
+        "-price": ("-effective_price", "-id"),
+    }
+    # Límites de los rangos de precio de /products/facets/
+    price_facet_bounds = (50, 100, 250, 500, 1000)
+
+    @property
+    def paginator(self):
+        """
+        ?pagination=cursor (o un ?cursor=) activa la paginación por cursor;
+        por defecto se mantiene la paginación por número de página.
+        La búsqueda y el orden por precio usan siempre páginas.
+        """
+        if not hasattr(self, "_paginator"):
+            params = self.request.query_params
+            use_cursor = (
+                params.get("pagination") == "cursor" or "cursor" in params
+            ) and not (
+                params.get("search")
+                or params.get("ordering") in self.public_orderings
+            )
+            self._paginator = (
+                self.cursor_pagination_class()
+                if use_cursor
+                else self.pagination_class()
+            )
+        return self._paginator
+
+    def get_list_validators(self, request):
+        # Sin Last-Modified: el máximo updated_at de las filas visibles no
+        # cambia al eliminar o desactivar productos ni al renombrar una
+        # categoría o proveedor. Las versiones de cache sí.
+        etag = build_etag(
+            normalized_query_params(request.query_params),
+            versions=self.cache_versions,
+        )
+        return etag, None
+
+    def get_detail_validators(self, request, **kwargs):
+        product = (
+            Product.objects
+            .filter(is_active=True, slug=kwargs.get(self.lookup_field))
+            .values("id", "updated_at")
+            .first()
+        )
+        if not product:
+            return None
+
+        # Imágenes, categoría y proveedor no cambian updated_at
+        etag = build_etag(
+            product["id"],
+            product["updated_at"],
+            versions=("productimage", "category", "vendor"),
+        )
+        return etag, product["updated_at"]
 
-    def get_queryset(self):
-        queryset = Product.objects.filter(is_active=True)
+    def get_serializer_class(self):
+        # Los listados usan la tarjeta compacta salvo que se pidan campos
+        if self.action == "list" and not self.request.query_params.get("fields"):
+            return ProductCardSerializer
+        return ProductSerializer
 
-        # 🔍 SEARCH
-        search = self.request.query_params.get("search")
-        if search:
-            queryset = queryset.filter(name__icontains=search)
+    def get_queryset(self):
+        queryset = self.optimize_queryset(
+            Product.objects.filter(is_active=True)
+        )
 
-        # 📂 CATEGORY
+        # 📂 CATEGORY (todo el subárbol, a cualquier profundidad)
         category_id = self.request.query_params.get("category")
         if category_id:
             try:
-                category = Category.objects.get(id=category_id)
-                categories = Category.objects.filter(
-                    Q(id=category.id) | Q(parent=category)
-                )
-                queryset = queryset.filter(category__in=categories)
-            except Category.DoesNotExist:
-                queryset = queryset.none()
+                category_id = uuid.UUID(category_id)
+            except ValueError:
+                return queryset.none()
+
+            queryset = queryset.filter(
+                category__in=CategoryClosure.subtree_ids(category_id)
+            )
 
-        return queryset.order_by("-created_at")
+        # 💰 PRICE RANGE (sobre el precio efectivo indexado)
+        queryset = filter_price_range(queryset, self.request.query_params)
+
+        # 🔍 SEARCH (solo por nombre, ordenado por relevancia)
+        search = self.request.query_params.get("search")
+        if search:
+            queryset = search_products(queryset, search, fields=("name",))
+
+        ordering = self.public_orderings.get(
+            self.request.query_params.get("ordering")
+        )
+        if ordering:
+            return queryset.order_by(*ordering)
+        if search:
+            return queryset
+
+        return queryset.order_by("-created_at", "-id")
 
     def get_serializer_context(self):
         return {"request": self.request}
 
+    @action(detail=False, methods=["get"], url_path="facets")
+    def facets(self, request):
+        """
+        Conteos por subárbol de categoría, proveedor y rango de precio
+        para los mismos filtros del listado. Tres consultas agrupadas,
+        cacheadas por combinación de filtros.
+        """
+        return self.cached_response(request, self.build_facets)
+
+    def build_facets(self, request):
+        products = Product.objects.filter(
+            id__in=self.get_queryset().order_by().values("id")
+        )
+
+        categories = (
+            products
+            .filter(category__isnull=False)
+            .values(
+                facet_id=F("category__ancestor_links__ancestor_id"),
+                facet_name=F("category__ancestor_links__ancestor__name"),
+                facet_slug=F("category__ancestor_links__ancestor__slug"),
+                facet_parent=F("category__ancestor_links__ancestor__parent_id"),
+            )
+            .annotate(count=Count("id"))
+            .order_by("-count", "facet_name")
+        )
+
+        vendors = (
+            products
+            .filter(vendor__isnull=False)
+            .values(facet_id=F("vendor_id"), facet_name=F("vendor__name"))
+            .annotate(count=Count("id"))
+            .order_by("-count", "facet_name")
+        )
+
+        bounds = [None, *self.price_facet_bounds, None]
+        ranges = list(zip(bounds, bounds[1:]))
+
+        def price_range(low, high):
+            condition = Q()
+            if low is not None:
+                condition &= Q(effective_price__gte=low)
+            if high is not None:
+                condition &= Q(effective_price__lt=high)
+            return condition
+
+        price_counts = products.aggregate(**{
+            f"bucket_{index}": Count("id", filter=price_range(low, high))
+            for index, (low, high) in enumerate(ranges)
+        })
+
+        return Response({
+            "categories": [
+                {
+                    "id": item["facet_id"],
+                    "name": item["facet_name"],
+                    "slug": item["facet_slug"],
+                    "parent": item["facet_parent"],
+                    "count": item["count"],
+                }
+                for item in categories
+            ],
+            "vendors": [
+                {"id": item["facet_id"], "name": item["facet_name"], "count": item["count"]}
+                for item in vendors
+            ],
+            "price_ranges": [
+                {
+                    "min": low,
+                    "max": high,
+                    "count": price_counts[f"bucket_{index}"],
+                }
+                for index, (low, high) in enumerate(ranges)
+            ],
+        })
 
 
-class ProductAdminViewSet(ModelViewSet):
+
+class ProductAdminViewSet(SparseFieldsViewMixin, ModelViewSet):
     serializer_class = ProductAdminSerializer
     permission_classes = [IsStaff]
     protected_delete_message = (
@@ -156,22 +429,10 @@ class ProductAdminViewSet(ModelViewSet):
     )
 
     def get_queryset(self):
-        qs = Product.objects.select_related(
-            "category", "vendor"
-        )
+        qs = self.optimize_queryset(Product.objects.all())
 
         params = self.request.query_params
 
-        # 🔍 SEARCH
-        search = params.get("search")
-        if search:
-            qs = qs.filter(
-                Q(sku__icontains=search) |
-                Q(name__icontains=search) |
-                Q(description__icontains=search) |
-                Q(vendor__name__icontains=search)
-            )
-
         # 📂 CATEGORY
         category = params.get("category")
         if category:
@@ -192,19 +453,18 @@ class ProductAdminViewSet(ModelViewSet):
         if is_featured in ["true", "false"]:
             qs = qs.filter(is_featured=is_featured == "true")
 
-        # 💰 PRICE RANGE
-        min_price = params.get("min_price")
-        if min_price:
-            qs = qs.filter(price__gte=min_price)
+        # 💰 PRICE RANGE (precio efectivo: promo o normal)
+        qs = filter_price_range(qs, params)
+
+        # 🔍 SEARCH (sku, nombre, proveedor y descripción)
+        search = params.get("search")
+        if search:
+            qs = search_products(qs, search)
 
-        max_price = params.get("max_price")
-        if max_price:
-            qs = qs.filter(price__lte=max_price)
-        
         ordering = params.get("ordering")
         if ordering:
             qs = qs.order_by(ordering)
-        else:
+        elif not search:
             qs = qs.order_by("-created_at")
 
         return qs
@@ -227,12 +487,7 @@ class ProductAdminViewSet(ModelViewSet):
         try:
             instance.delete()
         except ProtectedError:
-            raise ValidationError({
-                "detail": (
-                    "No se puede eliminar este producto porque "
-                    "está siendo utilizado en pedidos o carritos."
-                )
-            })
+            raise ValidationError({"detail": self.protected_delete_message})
 
     @action(detail=False, methods=["post"], url_path="bulk-delete")
     def bulk_delete(self, request):
@@ -243,30 +498,15 @@ class ProductAdminViewSet(ModelViewSet):
                 "detail": "Debes enviar una lista de IDs para eliminar."
             })
 
-        products = Product.objects.filter(id__in=ids)
-        products_by_id = {str(product.id): product for product in products}
-
-        deleted = 0
-        failed = []
-        missing = []
-
-        for raw_id in ids:
-            product_id = str(raw_id)
-            product = products_by_id.get(product_id)
-
-            if not product:
-                missing.append(product_id)
-                continue
-
-            try:
-                product.delete()
-                deleted += 1
-            except ProtectedError:
-                failed.append({
-                    "id": product_id,
-                    "name": product.name,
-                    "detail": self.protected_delete_message,
-                })
+        deleted, protected, missing = delete_products(ids)
+        failed = [
+            {
+                "id": product_id,
+                "name": name,
+                "detail": self.protected_delete_message,
+            }
+            for product_id, name in protected
+        ]
 
         return Response({
             "detail": (
@@ -308,26 +548,34 @@ class CartViewSet(ModelViewSet):
     permission_classes = [AllowAny]
     pagination_class = None
 
-    def get_cart(self, request):
-        if request.user.is_authenticated:
-            cart, _ = Cart.objects.get_or_create(user=request.user)
-            return cart
+    # Carrito invitado aún no persistido: sin sesión ni carrito guardado
+    EMPTY_CART = {"id": None, "user": None, "items": [], "created_at": None}
 
-        # 🔥 USUARIO INVITADO
-        if not request.session.session_key:
-            request.session.create()
+    def get_cart(self, request):
+        cart, _ = Cart.objects.get_or_create(user=request.user)
+        return cart
 
-        cart, _ = Cart.objects.get_or_create(
-            session_key=request.session.session_key,
-            user=None
+    def serialize_cart(self, cart):
+        prefetch_related_objects(
+            [cart], *product_related_lookups("cartitem_set__product__")
         )
-        return cart
+        return CartSerializer(cart, context={"request": self.request}).data
+
+    def serialize_guest_cart(self, cart):
+        if cart is None:
+            return dict(self.EMPTY_CART)
+        return GuestCartSerializer(cart, context={"request": self.request}).data
 
     def list(self, request):
-        cart = self.get_cart(request)
-        return Response(
-            CartSerializer(cart, context={"request": request}).data
-        )
+        if request.user.is_authenticated:
+            return Response(self.serialize_cart(self.get_cart(request)))
+
+        # 🔥 USUARIO INVITADO
+        # Las lecturas anónimas (incluidos los crawlers) no crean sesión
+        # ni carrito; ver app/guest_carts.py
+        session_key = request.session.session_key
+        cart = get_guest_cart_store().get(session_key) if session_key else None
+        return Response(self.serialize_guest_cart(cart))
 
     def get_queryset(self):
         return Cart.objects.none()
@@ -341,6 +589,19 @@ class CartViewSet(ModelViewSet):
 
         product = Product.objects.get(id=product_id)
 
+        if not request.user.is_authenticated:
+            # La sesión se crea recién al agregar el primer producto
+            if not request.session.session_key:
+                request.session.create()
+
+            cart = get_guest_cart_store().add(
+                request.session.session_key, product, quantity
+            )
+            return Response(
+                self.serialize_guest_cart(cart),
+                status=status.HTTP_201_CREATED
+            )
+
         cart = self.get_cart(request)
 
         item, created = CartItem.objects.get_or_create(
@@ -348,7 +609,7 @@ class CartViewSet(ModelViewSet):
             product=product,
             defaults={
                 "quantity": quantity,
-                "price_snapshot": product.promo_price or product.price
+                "price_snapshot": product.effective_price
             }
         )
 
@@ -359,7 +620,7 @@ class CartViewSet(ModelViewSet):
         cart.save(update_fields=["updated_at"])
 
         return Response(
-            CartSerializer(cart, context={"request": request}).data,
+            self.serialize_cart(cart),
             status=status.HTTP_201_CREATED
         )
 
@@ -368,7 +629,13 @@ class OrderViewSet(ModelViewSet):
     permission_classes = [IsClient]
 
     def get_queryset(self):
-        return Order.objects.filter(user=self.request.user)
+        return (
+            Order.objects
+            .filter(user=self.request.user)
+            .prefetch_related(
+                *product_related_lookups("orderitem_set__product__")
+            )
+        )
 
     def create(self, request, *args, **kwargs):
         # 1️⃣ Obtener carrito del usuario
@@ -402,6 +669,10 @@ class OrderViewSet(ModelViewSet):
         # 5️⃣ Vaciar carrito
         cart.cartitem_set.all().delete()
 
+        prefetch_related_objects(
+            [order], *product_related_lookups("orderitem_set__product__")
+        )
+
         return Response(
             OrderSerializer(order, context={"request": request}).data,
             status=status.HTTP_201_CREATED,
@@ -411,16 +682,25 @@ class OrderViewSet(ModelViewSet):
 # ORDER ADMIN / STAFF
 # ======================
 class OrderAdminViewSet(ModelViewSet):
-    queryset = Order.objects.select_related("user").prefetch_related("orderitem_set")
+    queryset = (
+        Order.objects
+        .select_related("user")
+        .prefetch_related(*product_related_lookups("orderitem_set__product__"))
+    )
     serializer_class = OrderAdminSerializer
     permission_classes = [IsStaff]
 
 # ======================
 # BANNERS / CONTENT
 # ======================
-class BannerViewSet(ModelViewSet):
+class BannerViewSet(CachedResponseMixin, ModelViewSet):
     permission_classes = [IsStaffOrReadOnly]
     parser_classes = [MultiPartParser, FormParser]
+    cache_versions = ("banner",)
+
+    def get_cache_key_parts(self, request):
+        # Los banners vigentes cambian con la fecha
+        return [timezone.now().date().isoformat()]
 
     def get_queryset(self):
         today = timezone.now().date()
@@ -438,10 +718,11 @@ class BannerViewSet(ModelViewSet):
     def get_serializer_context(self):
         return {"request": self.request}
 
-class ContentBlockViewSet(ReadOnlyModelViewSet):
-    queryset = ContentBlock.objects.all()
+class ContentBlockViewSet(CachedResponseMixin, ReadOnlyModelViewSet):
+    queryset = ContentBlock.objects.order_by("key")
     serializer_class = ContentBlockSerializer
     permission_classes = [IsStaffOrReadOnly]
+    cache_versions = ("contentblock",)
 
 # ======================
 # AUTH JWT
@@ -535,24 +816,82 @@ class CartItemViewSet(ModelViewSet):
     permission_classes = [AllowAny]
 
     def get_queryset(self):
+        queryset = (
+            CartItem.objects
+            .select_related("product__category", "product__vendor")
+            .prefetch_related("product__productimage_set")
+        )
+
         if self.request.user.is_authenticated:
-            return CartItem.objects.filter(cart__user=self.request.user)
+            return queryset.filter(cart__user=self.request.user)
 
-        if not self.request.session.session_key:
-            self.request.session.create()
+        # Los ítems de invitados se leen del store de carritos invitados
+        return queryset.none()
+
+    # ======================
+    # INVITADOS
+    # ======================
+    def guest_session_key(self):
+        if self.request.user.is_authenticated:
+            return None
+        return self.request.session.session_key
+
+    def guest_item_id(self):
+        try:
+            return int(self.kwargs[self.lookup_url_kwarg or self.lookup_field])
+        except (TypeError, ValueError):
+            raise NotFound()
+
+    def guest_items(self, session_key):
+        cart = get_guest_cart_store().get(session_key) if session_key else None
+        return cart.items if cart else []
+
+    def list(self, request, *args, **kwargs):
+        if request.user.is_authenticated:
+            return super().list(request, *args, **kwargs)
+
+        items = self.guest_items(self.guest_session_key())
+        page = self.paginate_queryset(items)
+        if page is not None:
+            return self.get_paginated_response(
+                self.get_serializer(page, many=True).data
+            )
+        return Response(self.get_serializer(items, many=True).data)
 
-        return CartItem.objects.filter(
-            cart__session_key=self.request.session.session_key,
-            cart__user__isnull=True
+    def retrieve(self, request, *args, **kwargs):
+        if request.user.is_authenticated:
+            return super().retrieve(request, *args, **kwargs)
+
+        item_id = self.guest_item_id()
+        item = next(
+            (
+                item for item in self.guest_items(self.guest_session_key())
+                if item.id == item_id
+            ),
+            None,
         )
+        if item is None:
+            raise NotFound()
+        return Response(self.get_serializer(item).data)
 
     def partial_update(self, request, *args, **kwargs):
-        item = self.get_object()
         quantity = request.data.get("quantity")
 
         if quantity is None or int(quantity) < 1:
             raise ValidationError("Cantidad inválida")
 
+        if not request.user.is_authenticated:
+            session_key = self.guest_session_key()
+            item = session_key and get_guest_cart_store().update_item(
+                session_key, self.guest_item_id(), int(quantity)
+            )
+            if not item:
+                raise NotFound()
+            return Response(
+                CartItemSerializer(item, context={"request": request}).data
+            )
+
+        item = self.get_object()
         item.quantity = quantity
         item.save()
         item.cart.save(update_fields=["updated_at"])
@@ -561,6 +900,18 @@ class CartItemViewSet(ModelViewSet):
             CartItemSerializer(item, context={"request": request}).data
         )
 
+    def destroy(self, request, *args, **kwargs):
+        if request.user.is_authenticated:
+            return super().destroy(request, *args, **kwargs)
+
+        session_key = self.guest_session_key()
+        removed = session_key and get_guest_cart_store().remove_item(
+            session_key, self.guest_item_id()
+        )
+        if not removed:
+            raise NotFound()
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
     def perform_destroy(self, instance):
         cart = instance.cart
         instance.delete()
@@ -691,6 +1042,7 @@ class AdminDashboardView(APIView):
             "orders": orders_data,
             "catalog": catalog_data,
             "cart": cart_data,
+            "response_cache": response_cache_stats(),
         })
 
 class CulqiChargeView(APIView):
@@ -774,10 +1126,11 @@ class CulqiChargeView(APIView):
             status=status.HTTP_201_CREATED
         )
 
-class VendorPublicViewSet(ReadOnlyModelViewSet):
+class VendorPublicViewSet(CachedResponseMixin, ReadOnlyModelViewSet):
     queryset = Vendor.objects.filter(is_active=True)
     serializer_class = VendorSerializer
     permission_classes = [AllowAny]
+    cache_versions = ("vendor",)
 
 # ======================
 # CART ADMIN
@@ -792,7 +1145,7 @@ class CartAdminViewSet(ModelViewSet):
         qs = (
             Cart.objects
             .select_related("user")
-            .prefetch_related("cartitem_set__product")
+            .prefetch_related(*product_related_lookups("cartitem_set__product__"))
             .annotate(last_item_activity_at=Max("cartitem__updated_at"))
             .order_by("-updated_at", "-created_at")
         )
@@ -867,23 +1220,7 @@ class CartAdminViewSet(ModelViewSet):
                 "detail": "Debes enviar una lista de IDs para eliminar."
             })
 
-        carts = Cart.objects.filter(id__in=ids).prefetch_related("cartitem_set")
-        carts_by_id = {str(cart.id): cart for cart in carts}
-
-        deleted = 0
-        missing = []
-
-        for raw_id in ids:
-            cart_id = str(raw_id)
-            cart = carts_by_id.get(cart_id)
-
-            if not cart:
-                missing.append(cart_id)
-                continue
-
-            cart.cartitem_set.all().delete()
-            cart.delete()
-            deleted += 1
+        deleted, missing = delete_carts(ids)
 
         return Response({
             "detail": "Carritos eliminados correctamente.",
@@ -4,6 +4,7 @@ from importlib.util import find_spec
 from pathlib import Path
 
 import dj_database_url
+from django.core.exceptions import ImproperlyConfigured
 
 try:
     from dotenv import load_dotenv
@@ -175,6 +176,53 @@ REST_FRAMEWORK = {
     "PAGE_SIZE": 10,
 }
 
+# Cache: memoria local en desarrollo; en produccion conviene REDIS_URL para
+# que todos los workers compartan respuestas y versiones de invalidacion.
+REDIS_URL = os.getenv("REDIS_URL", "").strip()
+
+if REDIS_URL and find_spec("redis") is None:
+    # Sin el cliente, cada worker tendria su propia cache y las versiones
+    # de invalidacion no llegarian a los demas procesos
+    raise ImproperlyConfigured(
+        "REDIS_URL esta configurado pero el paquete 'redis' no esta instalado."
+    )
+
+if REDIS_URL:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": REDIS_URL,
+        }
+    }
+else:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+            "OPTIONS": {"MAX_ENTRIES": 5000},
+        }
+    }
+
+# Carritos invitados: "cache" (sin filas en SQL hasta el login, expiran
+# solos) o "database". Con varios workers la cache debe ser compartida
+# (REDIS_URL); sin ella, en produccion se usa la base de datos.
+SHARED_CACHE = CACHES["default"]["BACKEND"].endswith("RedisCache")
+GUEST_CART_BACKEND = os.getenv(
+    "GUEST_CART_BACKEND", "cache" if SHARED_CACHE or DEBUG else "database"
+)
+GUEST_CART_CACHE_ALIAS = os.getenv("GUEST_CART_CACHE_ALIAS", "default")
+GUEST_CART_TIMEOUT = int(os.getenv("GUEST_CART_TIMEOUT", str(60 * 60 * 24 * 7)))
+
+# Alias de CACHES donde se guardan las respuestas publicas del catalogo
+RESPONSE_CACHE_ALIAS = os.getenv("RESPONSE_CACHE_ALIAS", "default")
+RESPONSE_CACHE_TIMEOUT = int(os.getenv("RESPONSE_CACHE_TIMEOUT", "600"))
+
+# Segundos que se reutiliza el total de productos del catálogo público
+CATALOG_COUNT_CACHE_TIMEOUT = int(os.getenv("CATALOG_COUNT_CACHE_TIMEOUT", "300"))
+
+# Filas por bloque al importar CSV/XLSX: cada bloque se procesa y confirma
+# por separado, así la memoria no crece con el tamaño del archivo
+IMPORT_CHUNK_SIZE = int(os.getenv("IMPORT_CHUNK_SIZE", "5000"))
+
 
 SIMPLE_JWT = {
     "ACCESS_TOKEN_LIFETIME": timedelta(minutes=60),
@@ -243,6 +291,24 @@ STATIC_ROOT = BASE_DIR / "staticfiles"
 MEDIA_URL = "/media/"
 MEDIA_ROOT = BASE_DIR / "media"
 
+# Archivos subidos para importaciones en segundo plano (siempre en disco local)
+IMPORT_JOBS_ROOT = Path(os.getenv("IMPORT_JOBS_ROOT", BASE_DIR / "import_jobs"))
+IMPORT_JOB_WORKERS = int(os.getenv("IMPORT_JOB_WORKERS", "2"))
+# Segundos sin avance tras los que un trabajo RUNNING se da por abandonado
+IMPORT_JOB_STALE_AFTER = int(os.getenv("IMPORT_JOB_STALE_AFTER", "900"))
+
+# Carga de imágenes desde ZIP: hilos que validan/suben y tamaño máximo por archivo
+IMAGE_IMPORT_WORKERS = int(os.getenv("IMAGE_IMPORT_WORKERS", "4"))
+IMAGE_IMPORT_MAX_FILE_SIZE = int(os.getenv("IMAGE_IMPORT_MAX_FILE_SIZE", str(15 * 1024 * 1024)))
+
+# Variantes responsivas (WebP/JPEG) generadas al subir una imagen
+IMAGE_VARIANT_WIDTHS = [
+    int(width) for width in os.getenv("IMAGE_VARIANT_WIDTHS", "320,640,1024,1600").split(",")
+    if width.strip()
+]
+IMAGE_VARIANT_DEFAULT_WIDTH = int(os.getenv("IMAGE_VARIANT_DEFAULT_WIDTH", "1024"))
+IMAGE_VARIANT_QUALITY = int(os.getenv("IMAGE_VARIANT_QUALITY", "82"))
+
 
 AUTH_USER_MODEL = "app.User"
 AUTHENTICATION_BACKENDS = [
@@ -254,6 +320,10 @@ STORAGES = {
     "default": {
         "BACKEND": "django.core.files.storage.FileSystemStorage",
     },
+    "imports": {
+        "BACKEND": "django.core.files.storage.FileSystemStorage",
+        "OPTIONS": {"location": IMPORT_JOBS_ROOT},
+    },
     "staticfiles": {
         "BACKEND": (
             "whitenoise.storage.CompressedManifestStaticFilesStorage"